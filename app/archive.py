@@ -0,0 +1,220 @@
+"""
+Cold storage for finished events
+
+Archiving moves an event's access requests and QR tokens out of the main
+database into a SQLite file of its own (ARCHIVE_DIR/event-<id>-<slug>.db), so
+the tables and indexes the open events are served from don't grow with every
+past party. The file has the same tables, without the search index or the
+email outbox, and is opened read-only on demand: the admin list, counters and
+exports run the usual crud queries against it.
+
+Usage:
+    python -m app.archive               list events
+    python -m app.archive EVENT_ID      archive an event
+"""
+
+from sqlalchemy import create_engine, delete, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+from app.models import Event, AccessRequest, QRToken, EmailOutbox
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import os
+import sys
+import threading
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "data/archive")
+# Archive files kept open at once; older ones are closed and reopened on demand
+ARCHIVE_MAX_OPEN = int(os.getenv("ARCHIVE_MAX_OPEN", "4"))
+# Created in the archive file, in this order
+ARCHIVED_TABLES = (Event.__table__, AccessRequest.__table__, QRToken.__table__)
+
+class EventArchive:
+    """Moves events to their archive files and opens those files for reading"""
+    def __init__(self, directory: str = ARCHIVE_DIR, max_open: int = ARCHIVE_MAX_OPEN):
+        self.directory = directory
+        self.max_open = max_open
+        self._engines: "OrderedDict[str, Engine]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path_for(self, event: Event) -> str:
+        return os.path.join(self.directory, f"event-{event.id}-{event.slug}.db")
+
+    def archive(self, engine, event_id: int, batch_size: int = 5000, read_engine=None) -> Optional[Dict[str, int]]:
+        """Move an open event's requests and tokens to its archive file
+
+        The rows are first copied from read_engine (the engine itself by
+        default) without holding the write lock. They then leave the main
+        database by DELETE ... RETURNING, a batch of requests with their tokens
+        and queued invitations per short write transaction, and any row a scan
+        or approval changed since the copy is written again, so the file holds
+        each row as it was deleted. A scan or approval racing the archive either
+        lands first and is archived with the row, or finds no row. The event is
+        marked archived in the last transaction, once the file is complete; an
+        interrupted run leaves it open and is finished by running it again.
+        Returns how many requests and tokens were moved, or None if the event
+        isn't open.
+        """
+        read_engine = read_engine or engine
+        with Session(read_engine) as session:
+            event = session.get(Event, event_id)
+            if event is None or event.status != "open":
+                return None
+        path = self.path_for(event)
+        archived_at = datetime.utcnow()
+        event_row = {column.name: getattr(event, column.name) for column in Event.__table__.columns}
+        event_row.update(status="archived", archive_path=path, archived_at=archived_at)
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Nothing reads the file until the event is marked archived
+        cold = create_engine(f"sqlite:///{path}")
+        try:
+            with cold.begin() as cold_connection:
+                for table in ARCHIVED_TABLES:
+                    table.create(cold_connection, checkfirst=True)
+                cold_connection.execute(Event.__table__.insert().prefix_with("OR REPLACE"), [event_row])
+            for table in ARCHIVED_TABLES[1:]:
+                self._copy(read_engine, cold, table, event_id, batch_size)
+
+            moved = {"tokens": 0, "requests": 0}
+            last_id = 0
+            while True:
+                with Session(engine) as session:
+                    ids = list(session.exec(
+                        select(AccessRequest.id)
+                        .where(AccessRequest.event_id == event_id, AccessRequest.id > last_id)
+                        .order_by(AccessRequest.id).limit(batch_size)
+                    ))
+                    if not ids:
+                        break
+                    self._move(session, cold, moved, AccessRequest.id.in_(ids))
+                    session.commit()
+                last_id = ids[-1]
+
+            with Session(engine) as session:
+                # Stragglers committed behind the batches, then the flip
+                self._move(session, cold, moved, AccessRequest.event_id == event_id)
+                result = session.connection().execute(
+                    update(Event).where(Event.id == event_id, Event.status == "open")
+                    .values(status="archived", archive_path=path, archived_at=archived_at)
+                )
+                if result.rowcount != 1:
+                    session.rollback()
+                    return None
+                session.commit()
+        finally:
+            cold.dispose()
+        return moved
+
+    @staticmethod
+    def _copy(read_engine, cold: Engine, table, event_id: int, batch_size: int):
+        """Copy an event's rows of a table to the archive file, a keyset batch per read"""
+        last_id = 0
+        while True:
+            with read_engine.connect() as connection:
+                rows = connection.execute(
+                    select(table).where(table.c.event_id == event_id, table.c.id > last_id)
+                    .order_by(table.c.id).limit(batch_size)
+                ).all()
+            if not rows:
+                return
+            with cold.begin() as cold_connection:
+                cold_connection.execute(table.insert().prefix_with("OR REPLACE"), [dict(row._mapping) for row in rows])
+            last_id = rows[-1].id
+
+    @staticmethod
+    def _move(session: Session, cold: Engine, moved: Dict[str, int], which):
+        """Delete the requests matching `which` with their tokens and invitations
+
+        Returned rows that differ from the archive file's copy are written to
+        it before the caller commits.
+        """
+        connection = session.connection()
+        request_ids = select(AccessRequest.id).where(which)
+        connection.execute(delete(EmailOutbox).where(EmailOutbox.request_id.in_(request_ids)))
+        # Tokens first: they reference the requests
+        batches = (
+            ("tokens", QRToken.__table__, QRToken.__table__.c.request_id.in_(request_ids)),
+            ("requests", AccessRequest.__table__, which),
+        )
+        for name, table, where in batches:
+            rows = [dict(row._mapping) for row in connection.execute(table.delete().where(where).returning(*table.c))]
+            if not rows:
+                continue
+            moved[name] += len(rows)
+            with cold.begin() as cold_connection:
+                copied = {
+                    row.id: dict(row._mapping)
+                    for row in cold_connection.execute(select(table).where(table.c.id.in_([row["id"] for row in rows])))
+                }
+                changed = [row for row in rows if copied.get(row["id"]) != row]
+                if changed:
+                    cold_connection.execute(table.insert().prefix_with("OR REPLACE"), changed)
+
+    def engine_for(self, event: Event) -> Engine:
+        """Read-only engine on an archived event's file, opened on first use"""
+        path = event.archive_path
+        with self._lock:
+            engine = self._engines.get(path)
+            if engine is not None:
+                self._engines.move_to_end(path)
+                return engine
+            if not path or not os.path.exists(path):
+                raise FileNotFoundError(f"No archive file for event {event.id}: {path}")
+            engine = create_engine(
+                f"sqlite:///file:{path}?mode=ro&uri=true", connect_args={"check_same_thread": False}
+            )
+            self._engines[path] = engine
+            while len(self._engines) > self.max_open:
+                _, oldest = self._engines.popitem(last=False)
+                oldest.dispose()
+            return engine
+
+    def run(self, event: Event, fn: Callable[..., Any], *args) -> Any:
+        """fn(session, *args) on a session over an archived event's file"""
+        with Session(self.engine_for(event)) as session:
+            return fn(session, *args)
+
+    def close(self):
+        """Close every open archive file"""
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+
+# Global event archive instance
+event_archive = EventArchive()
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("event_id", nargs="?", type=int, help="event to archive (default: list events)")
+    args = parser.parse_args(argv)
+
+    from app import crud
+    from app.models import create_db_and_tables, engine, read_engine
+    create_db_and_tables()
+
+    if args.event_id is None:
+        with Session(engine) as session:
+            current = crud.get_current_event(session)
+            for event in crud.list_events(session):
+                counts = crud.count_requests(session, event.id) if event.status == "open" else None
+                print(
+                    f"{event.id:>4}  {event.slug:<30} {event.status:<9}"
+                    + (f" {counts['total']:,} requests" if counts else f" {event.archive_path}")
+                    + ("  (current)" if event.id == current.id else "")
+                )
+        return
+
+    with Session(engine) as session:
+        if args.event_id == crud.get_current_event(session).id:
+            sys.exit(f"Event {args.event_id} is the current one: open the next event before archiving it")
+    moved = event_archive.archive(engine, args.event_id, read_engine=read_engine)
+    if moved is None:
+        sys.exit(f"Event {args.event_id} doesn't exist or is already archived")
+    print(f"{moved['requests']:,} requests and {moved['tokens']:,} tokens moved", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
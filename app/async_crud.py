@@ -0,0 +1,182 @@
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app import crud
+from app.models import User, Event, AccessRequest, QRToken, EmailOutbox
+from app.schemas import AccessRequestCreate
+from app.metrics import PASSWORD_VERIFY, PASSWORD_HASH
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, List, Tuple, Dict
+import asyncio
+import os
+import time
+
+# Async equivalents of app.crud. Each query function runs the sync implementation
+# through AsyncSession.run_sync, so the SQL is written once and the database I/O
+# happens on the driver's thread while the event loop serves other requests.
+
+async def run_sync(session: AsyncSession, fn: Callable[..., Any], *args) -> Any:
+    """Run fn(sync_session, *args) and end any transaction it leaves open
+
+    crud functions refresh rows after committing, which starts a new transaction
+    that would otherwise hold a pooled connection (and, on a BEGIN IMMEDIATE
+    writer, the SQLite write lock) until the request finishes. Sessions don't
+    expire on commit, so returned objects stay loaded.
+    """
+    result = await session.run_sync(fn, *args)
+    if session.in_transaction():
+        await session.commit()
+    return result
+
+# bcrypt releases the GIL, so a few threads hash in parallel; the cap keeps a
+# burst of logins from taking every core away from the rest of the app
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+def _timed(histogram, fn: Callable[..., Any], *args) -> Any:
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        histogram.observe(time.perf_counter() - started)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify password against hash"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _password_executor, _timed, PASSWORD_VERIFY, crud.verify_password, plain_password, hashed_password
+    )
+
+async def get_password_hash(password: str) -> str:
+    """Generate password hash"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, _timed, PASSWORD_HASH, crud.get_password_hash, password)
+
+def shutdown():
+    """Stop the password hashing threads"""
+    _password_executor.shutdown(wait=False, cancel_futures=True)
+
+async def get_user_by_username(session: AsyncSession, username: str) -> Optional[User]:
+    """Get user by username"""
+    return await run_sync(session, crud.get_user_by_username, username)
+
+async def authenticate_user(session: AsyncSession, username: str, password: str) -> Optional[User]:
+    """Authenticate user"""
+    user = await get_user_by_username(session, username)
+    if not user or not await verify_password(password, user.hashed_password):
+        return None
+    return user
+
+async def get_current_event(session: AsyncSession) -> Event:
+    """The event new sign-ups go to"""
+    return await run_sync(session, crud.get_current_event)
+
+async def get_event(session: AsyncSession, event_id: int) -> Optional[Event]:
+    """Get event by ID"""
+    return await run_sync(session, crud.get_event, event_id)
+
+async def list_events(session: AsyncSession) -> List[Event]:
+    """All events, newest first"""
+    return await run_sync(session, crud.list_events)
+
+async def create_event(session: AsyncSession, name: str, starts_at: Optional[datetime] = None) -> Event:
+    """Open a new event, which becomes the current one"""
+    return await run_sync(session, crud.create_event, name, starts_at)
+
+async def create_access_request(
+    session: AsyncSession, request: AccessRequestCreate, event_id: Optional[int] = None
+) -> AccessRequest:
+    """Create new access request"""
+    return await run_sync(session, crud.create_access_request, request, event_id)
+
+async def insert_access_requests(
+    session: AsyncSession, requests: List[AccessRequestCreate], event_id: Optional[int] = None
+) -> List[Optional[int]]:
+    """Insert several access requests, skipping duplicates"""
+    return await run_sync(session, crud.insert_access_requests, requests, event_id)
+
+async def backfill_signup_keys(session: AsyncSession) -> int:
+    """Fill in dedupe keys for requests created before they existed"""
+    return await run_sync(session, crud.backfill_signup_keys)
+
+async def get_pending_requests(session: AsyncSession, event_id: Optional[int] = None) -> List[AccessRequest]:
+    """Get all pending access requests"""
+    return await run_sync(session, crud.get_pending_requests, event_id)
+
+async def get_all_requests(session: AsyncSession, event_id: Optional[int] = None) -> List[AccessRequest]:
+    """Get all access requests"""
+    return await run_sync(session, crud.get_all_requests, event_id)
+
+async def list_requests(
+    session: AsyncSession,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    event_id: Optional[int] = None
+) -> Tuple[List[Tuple[AccessRequest, bool, Optional[datetime]]], Optional[str]]:
+    """One page of the admin list, see crud.list_requests"""
+    return await run_sync(session, crud.list_requests, status, search, cursor, limit, event_id)
+
+async def count_requests(session: AsyncSession, event_id: Optional[int] = None) -> Dict[str, int]:
+    """Totals for the admin dashboard"""
+    return await run_sync(session, crud.count_requests, event_id)
+
+async def approve_request(
+    session: AsyncSession, request_id: int, token: Optional[str] = None
+) -> Optional[AccessRequest]:
+    """Approve access request and queue its invitation"""
+    return await run_sync(session, crud.approve_request, request_id, token)
+
+async def approve_requests(
+    session: AsyncSession, request_ids: List[int], tokens: Optional[Dict[int, str]] = None
+) -> List[Tuple[AccessRequest, Optional[QRToken]]]:
+    """Approve several access requests in one transaction"""
+    return await run_sync(session, crud.approve_requests, request_ids, tokens)
+
+async def get_qr_token(session: AsyncSession, token: str) -> Optional[QRToken]:
+    """Get QR token by token string"""
+    return await run_sync(session, crud.get_qr_token, token)
+
+async def use_qr_token(session: AsyncSession, token: str) -> Optional[QRToken]:
+    """Mark QR token as used"""
+    return await run_sync(session, crud.use_qr_token, token)
+
+async def redeem_qr_token(session: AsyncSession, token: str):
+    """Mark a token used and return the guest, or None"""
+    return await run_sync(session, crud.redeem_qr_token, token)
+
+async def reconcile_offline_scans(session: AsyncSession, scans: List[Tuple[str, datetime]]) -> List[Dict]:
+    """Apply scans made offline, earliest scan of each token wins"""
+    return await run_sync(session, crud.reconcile_offline_scans, scans)
+
+async def get_request_by_id(session: AsyncSession, request_id: int) -> Optional[AccessRequest]:
+    """Get access request by ID"""
+    return await run_sync(session, crud.get_request_by_id, request_id)
+
+async def resend_invitation(session: AsyncSession, request_id: int) -> Optional[EmailOutbox]:
+    """Queue an approved guest's invitation again"""
+    return await run_sync(session, crud.resend_invitation, request_id)
+
+async def claim_outbox_batch(session: AsyncSession, limit: int) -> List[EmailOutbox]:
+    """Claim due outbox messages for sending"""
+    return await run_sync(session, crud.claim_outbox_batch, limit)
+
+async def mark_outbox_sent(session: AsyncSession, entry_ids: List[int]):
+    """Record delivered outbox messages"""
+    await run_sync(session, crud.mark_outbox_sent, entry_ids)
+
+async def mark_outbox_failed(session: AsyncSession, entry_id: int, error: str, retry_at: Optional[datetime]):
+    """Record a failed delivery; no retry_at dead-letters the message"""
+    await run_sync(session, crud.mark_outbox_failed, entry_id, error, retry_at)
+
+async def reset_stale_outbox(session: AsyncSession, lease: timedelta) -> int:
+    """Return messages stuck in sending past their lease to the queue"""
+    return await run_sync(session, crud.reset_stale_outbox, lease)
+
+async def retry_outbox_message(session: AsyncSession, entry_id: int) -> Optional[EmailOutbox]:
+    """Move a dead-lettered message back to the queue"""
+    return await run_sync(session, crud.retry_outbox_message, entry_id)
+
+async def get_outbox_stats(session: AsyncSession, latency_sample: int = 500) -> Dict:
+    """Outbox queue depth, send latency and recent dead letters"""
+    return await run_sync(session, crud.get_outbox_stats, latency_sample)
@@ -1,12 +1,22 @@
 from fastapi import Request, HTTPException, status
 from itsdangerous import URLSafeTimedSerializer, BadSignature
+from collections import OrderedDict
+import hmac
 import os
-from typing import Optional
+import threading
+import time
+from typing import Dict, Optional, Tuple
 
 # Secret key for signing cookies
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 serializer = URLSafeTimedSerializer(SECRET_KEY)
 
+# Session cookies are valid for 24 hours
+SESSION_MAX_AGE = 86400
+
+# Shared key door scanners send in the X-Scanner-Key header (disabled when unset)
+SCANNER_API_KEY = os.getenv("SCANNER_API_KEY")
+
 def create_session_token(username: str) -> str:
     """Create signed session token"""
     return serializer.dumps(username)
@@ -15,17 +25,80 @@ def verify_session_token(token: str) -> Optional[str]:
     """Verify and decode session token"""
     try:
         # Token expires after 24 hours (86400 seconds)
-        username = serializer.loads(token, max_age=86400)
+        username = serializer.loads(token, max_age=SESSION_MAX_AGE)
         return username
     except BadSignature:
         return None
 
+class SessionCache:
+    """Recently verified session tokens, so admin polling skips the HMAC check
+
+    Entries live for at most ttl seconds and never past the token's own expiry.
+    Logging out revokes the token in this process until it would have expired,
+    which also stops a copied cookie from being replayed.
+    """
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 1024):
+        if ttl is None:
+            ttl = float(os.getenv("SESSION_CACHE_TTL", "60"))
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # token -> (username, monotonic deadline)
+        self._verified: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        # token -> wall-clock time the token expires anyway
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def verify(self, token: str) -> Optional[str]:
+        """Username for a valid, unrevoked token, from the cache when possible"""
+        now = time.monotonic()
+        with self._lock:
+            if token in self._revoked:
+                return None
+            entry = self._verified.get(token)
+            if entry is not None:
+                if entry[1] > now:
+                    return entry[0]
+                del self._verified[token]
+
+        try:
+            username, signed_at = serializer.loads(token, max_age=SESSION_MAX_AGE, return_timestamp=True)
+        except BadSignature:
+            return None
+        remaining = signed_at.timestamp() + SESSION_MAX_AGE - time.time()
+
+        with self._lock:
+            self._verified[token] = (username, now + min(self.ttl, remaining))
+            while len(self._verified) > self.max_entries:
+                self._verified.popitem(last=False)
+        return username
+
+    def revoke(self, token: str):
+        """Forget a token and reject it until it expires"""
+        try:
+            _, signed_at = serializer.loads(token, max_age=SESSION_MAX_AGE, return_timestamp=True)
+        except BadSignature:
+            signed_at = None
+        with self._lock:
+            self._verified.pop(token, None)
+            if signed_at is not None:
+                wall_now = time.time()
+                self._revoked = {t: exp for t, exp in self._revoked.items() if exp > wall_now}
+                self._revoked[token] = signed_at.timestamp() + SESSION_MAX_AGE
+
+    def clear(self):
+        with self._lock:
+            self._verified.clear()
+            self._revoked.clear()
+
+# Global session cache instance
+session_cache = SessionCache()
+
 def get_current_user(request: Request) -> Optional[str]:
     """Get current user from session cookie"""
     session_token = request.cookies.get("session")
     if not session_token:
         return None
-    return verify_session_token(session_token)
+    return session_cache.verify(session_token)
 
 def require_auth(request: Request) -> str:
     """Require authentication, raise exception if not authenticated"""
@@ -36,3 +109,10 @@ def require_auth(request: Request) -> str:
             detail="Authentication required"
         )
     return username
+
+def require_scanner(request: Request) -> str:
+    """Require a door scanner key or an admin session"""
+    scanner_key = request.headers.get("x-scanner-key")
+    if SCANNER_API_KEY and scanner_key and hmac.compare_digest(scanner_key, SCANNER_API_KEY):
+        return "scanner"
+    return require_auth(request)
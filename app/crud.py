@@ -1,10 +1,17 @@
 from sqlmodel import Session, select
-from app.models import User, AccessRequest, QRToken
+from app.models import User, Event, AccessRequest, QRToken, EmailOutbox
 from app.schemas import AccessRequestCreate
+from app.events import event_bus
+from app.tokens import token_signer
 from passlib.context import CryptContext
-from datetime import datetime
-from typing import Optional, List
-import uuid
+from datetime import datetime, timedelta
+from typing import Optional, List, Tuple, Dict
+from sqlalchemy import func, update, case, exists, or_, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+import base64
+import os
+import re
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -28,52 +35,489 @@ def authenticate_user(session: Session, username: str, password: str) -> Optiona
         return None
     return user
 
-def create_access_request(session: Session, request: AccessRequestCreate) -> AccessRequest:
-    """Create new access request"""
+# Name of the event created when there is no open one (first start, or after
+# the last open event was archived)
+DEFAULT_EVENT_NAME = os.getenv("DEFAULT_EVENT_NAME", "Terrace After-Party")
+
+_NON_SLUG = re.compile(r"[^a-z0-9]+")
+
+def slugify(name: str) -> str:
+    """URL-safe identifier for an event name ("Summer Party 2025" -> "summer-party-2025")"""
+    return _NON_SLUG.sub("-", name.lower()).strip("-")[:60] or "event"
+
+def create_event(session: Session, name: str, starts_at: Optional[datetime] = None) -> Event:
+    """Open a new event; being the newest open one, it becomes the current event"""
+    base = slugify(name)
+    taken = set(session.exec(select(Event.slug).where(Event.slug.startswith(base))))
+    slug, suffix = base, 1
+    while slug in taken:
+        suffix += 1
+        slug = f"{base}-{suffix}"
+    event = Event(slug=slug, name=name.strip(), starts_at=starts_at)
+    session.add(event)
+    session.commit()
+    session.refresh(event)
+    return event
+
+def get_current_event(session: Session) -> Event:
+    """The event new sign-ups go to: the newest open one, created if there is none"""
+    statement = select(Event).where(Event.status == "open").order_by(Event.id.desc()).limit(1)
+    event = session.exec(statement).first()
+    if event is None:
+        try:
+            event = create_event(session, DEFAULT_EVENT_NAME)
+        except IntegrityError:
+            # Another worker created it first
+            session.rollback()
+            event = session.exec(statement).one()
+    return event
+
+def get_event(session: Session, event_id: int) -> Optional[Event]:
+    """Get event by ID"""
+    return session.get(Event, event_id)
+
+def list_events(session: Session) -> List[Event]:
+    """All events, newest first"""
+    return list(session.exec(select(Event).order_by(Event.id.desc())).all())
+
+def backfill_event_ids(session: Session, event_id: int) -> int:
+    """Move requests and tokens written before events existed into an event
+
+    Returns how many requests were moved.
+    """
+    result = session.execute(
+        update(AccessRequest).where(AccessRequest.event_id == None).values(event_id=event_id)
+    )
+    session.execute(
+        update(QRToken)
+        .where(QRToken.event_id == None)
+        .values(event_id=select(AccessRequest.event_id).where(AccessRequest.id == QRToken.request_id).scalar_subquery())
+    )
+    session.commit()
+    return result.rowcount
+
+_INSTAGRAM_PREFIX = re.compile(r"^(?:https?://)?(?:www\.)?instagram\.com/", re.IGNORECASE)
+
+def normalize_email(email: str) -> str:
+    """Dedupe key for an email address"""
+    return email.strip().lower()
+
+def normalize_instagram(handle: str) -> str:
+    """Dedupe key for an Instagram handle, which may be typed as @name or a profile URL"""
+    handle = _INSTAGRAM_PREFIX.sub("", handle.strip())
+    return handle.strip("/").lstrip("@").lower()
+
+def create_access_request(
+    session: Session, request: AccessRequestCreate, event_id: Optional[int] = None
+) -> AccessRequest:
+    """Create new access request, for the current event unless event_id is given"""
     db_request = AccessRequest(
+        event_id=event_id or get_current_event(session).id,
         first_name=request.first_name,
         last_name=request.last_name,
         email=request.email,
-        instagram=request.instagram
+        instagram=request.instagram,
+        email_key=normalize_email(request.email),
+        instagram_key=normalize_instagram(request.instagram),
+        locale=request.locale
     )
     session.add(db_request)
     session.commit()
     session.refresh(db_request)
+    event_bus.signed_up([
+        (db_request.event_id, db_request.id, db_request.first_name, db_request.last_name, db_request.instagram)
+    ])
     return db_request
 
-def get_pending_requests(session: Session) -> List[AccessRequest]:
-    """Get all pending access requests"""
+def insert_access_requests(
+    session: Session, requests: List[AccessRequestCreate], event_id: Optional[int] = None
+) -> List[Optional[int]]:
+    """Insert several access requests in one statement, skipping duplicates
+
+    A request is a duplicate when its normalized email or Instagram handle is
+    already taken for the event, in the table or earlier in the same batch.
+    Requests go to the current event unless event_id is given. Returns the new
+    ID for each request, or None for duplicates.
+    """
+    if not requests:
+        return []
+    now = datetime.utcnow()
+    event_id = event_id or get_current_event(session).id
+    rows = [
+        {
+            "event_id": event_id,
+            "first_name": request.first_name,
+            "last_name": request.last_name,
+            "email": request.email,
+            "instagram": request.instagram,
+            "email_key": normalize_email(request.email),
+            "instagram_key": normalize_instagram(request.instagram),
+            "locale": request.locale,
+            "approved": False,
+            "created_at": now,
+        }
+        for request in requests
+    ]
+    dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+    table = AccessRequest.__table__
+    statement = (
+        dialect.insert(table)
+        .on_conflict_do_nothing()
+        .returning(table.c.id, table.c.email_key, table.c.instagram_key)
+    )
+    # executemany: the statement compiles once (and is cached), and SQLAlchemy
+    # batches the rows into multi-row INSERTs with RETURNING
+    result = session.connection().execute(statement, rows)
+    inserted = {(email_key, instagram_key): request_id for request_id, email_key, instagram_key in result}
+    session.commit()
+
+    # Only the first request with a given pair of keys can have produced the row
+    ids = [inserted.pop((row["email_key"], row["instagram_key"]), None) for row in rows]
+    event_bus.signed_up([
+        (event_id, request_id, row["first_name"], row["last_name"], row["instagram"])
+        for request_id, row in zip(ids, rows) if request_id is not None
+    ])
+    return ids
+
+def backfill_signup_keys(session: Session) -> int:
+    """Fill in dedupe keys for requests created before they existed
+
+    Rows are visited oldest first; a row whose key is already taken in its event
+    keeps NULL so the unique indexes hold. Returns how many rows got keys.
+    """
+    pending = list(session.exec(
+        select(AccessRequest).where(AccessRequest.email_key == None).order_by(AccessRequest.id)
+    ))
+    if not pending:
+        return 0
+    emails = {tuple(row) for row in session.exec(
+        select(AccessRequest.event_id, AccessRequest.email_key).where(AccessRequest.email_key != None)
+    )}
+    handles = {tuple(row) for row in session.exec(
+        select(AccessRequest.event_id, AccessRequest.instagram_key).where(AccessRequest.instagram_key != None)
+    )}
+
+    filled = 0
+    for request in pending:
+        email_key = (request.event_id, normalize_email(request.email))
+        instagram_key = (request.event_id, normalize_instagram(request.instagram))
+        if email_key in emails or instagram_key in handles:
+            continue
+        request.email_key, request.instagram_key = email_key[1], instagram_key[1]
+        emails.add(email_key)
+        handles.add(instagram_key)
+        session.add(request)
+        filled += 1
+    session.commit()
+    return filled
+
+def upsert_legacy_requests(session: Session, rows: List[Dict], event_id: Optional[int] = None) -> int:
+    """Insert or update requests imported from the old JSON store, keyed on legacy_id
+
+    Rows hold AccessRequest columns, legacy_id included, and new ones go to
+    event_id (the current event by default). Dedupe keys are filled in here; a
+    row whose email or handle is already taken by another request of the event
+    gets none, as in backfill_signup_keys. Updating never revokes an approval or
+    moves a request to another event. Returns the number of rows written.
+    """
+    if not rows:
+        return 0
+    # PostgreSQL refuses to update a row twice in one statement: last one wins
+    rows = list({row["legacy_id"]: row for row in rows}.values())
+    event_id = event_id or get_current_event(session).id
+    for row in rows:
+        row["event_id"] = event_id
+        row["email_key"] = normalize_email(row["email"])
+        row["instagram_key"] = normalize_instagram(row["instagram"])
+
+    # Owner (legacy ID, or None for requests made in this app) of each key in play
+    emails: Dict[str, Optional[str]] = {}
+    handles: Dict[str, Optional[str]] = {}
+    for legacy_id, email_key, instagram_key in session.exec(
+        select(AccessRequest.legacy_id, AccessRequest.email_key, AccessRequest.instagram_key).where(
+            AccessRequest.event_id == event_id,
+            or_(
+                AccessRequest.email_key.in_([row["email_key"] for row in rows]),
+                AccessRequest.instagram_key.in_([row["instagram_key"] for row in rows])
+            )
+        )
+    ):
+        emails[email_key] = legacy_id
+        handles[instagram_key] = legacy_id
+    for row in rows:
+        legacy_id = row["legacy_id"]
+        if emails.get(row["email_key"], legacy_id) != legacy_id or handles.get(row["instagram_key"], legacy_id) != legacy_id:
+            row["email_key"] = row["instagram_key"] = None
+            continue
+        emails[row["email_key"]] = handles[row["instagram_key"]] = legacy_id
+
+    dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+    table = AccessRequest.__table__
+    statement = dialect.insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.legacy_id],
+        set_={
+            "first_name": statement.excluded.first_name,
+            "last_name": statement.excluded.last_name,
+            "email": statement.excluded.email,
+            "instagram": statement.excluded.instagram,
+            "approved": or_(table.c.approved, statement.excluded.approved),
+            "approved_at": func.coalesce(table.c.approved_at, statement.excluded.approved_at),
+        }
+    )
+    session.connection().execute(statement, rows)
+    session.commit()
+    return len(rows)
+
+def upsert_legacy_tokens(session: Session, rows: List[Dict]) -> Tuple[int, int]:
+    """Insert or update QR tokens imported from the old JSON store, keyed on the token
+
+    Rows hold QRToken columns, with legacy_request_id (the request's legacy_id)
+    in place of request_id. A token already marked used stays used. Returns
+    (rows written, rows skipped because their request isn't in the database).
+    """
+    if not rows:
+        return 0, 0
+    requests = {
+        legacy_id: (request_id, event_id)
+        for legacy_id, request_id, event_id in session.exec(
+            select(AccessRequest.legacy_id, AccessRequest.id, AccessRequest.event_id)
+            .where(AccessRequest.legacy_id.in_({row["legacy_request_id"] for row in rows}))
+        )
+    }
+    # Keyed on the token: PostgreSQL refuses to update a row twice in one statement
+    values: Dict[str, Dict] = {}
+    skipped = 0
+    for row in rows:
+        request = requests.get(row["legacy_request_id"])
+        if request is None:
+            skipped += 1
+            continue
+        values[row["token"]] = {
+            "token": row["token"], "request_id": request[0], "event_id": request[1], "used": row["used"],
+            "used_at": row["used_at"], "created_at": row["created_at"]
+        }
+    if values:
+        dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+        table = QRToken.__table__
+        statement = dialect.insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.token],
+            set_={
+                "used": or_(table.c.used, statement.excluded.used),
+                "used_at": func.coalesce(table.c.used_at, statement.excluded.used_at),
+            }
+        )
+        session.connection().execute(statement, list(values.values()))
+        session.commit()
+    return len(values), skipped
+
+def get_pending_requests(session: Session, event_id: Optional[int] = None) -> List[AccessRequest]:
+    """Get all pending access requests, of every event unless event_id is given"""
     statement = select(AccessRequest).where(AccessRequest.approved == False)
+    if event_id is not None:
+        statement = statement.where(AccessRequest.event_id == event_id)
     return list(session.exec(statement).all())
 
-def get_all_requests(session: Session) -> List[AccessRequest]:
-    """Get all access requests"""
+def get_pending_page(session: Session, after_id: int, limit: int) -> List[AccessRequest]:
+    """Pending access requests with IDs above after_id, oldest first"""
+    statement = (
+        select(AccessRequest)
+        .where(AccessRequest.approved == False, AccessRequest.id > after_id)
+        .order_by(AccessRequest.id)
+        .limit(limit)
+    )
+    return list(session.exec(statement).all())
+
+def get_pending_ids(session: Session, request_ids: List[int]) -> List[int]:
+    """Which of the given access requests are still pending"""
+    statement = select(AccessRequest.id).where(AccessRequest.approved == False, AccessRequest.id.in_(request_ids))
+    return list(session.exec(statement).all())
+
+def get_all_requests(session: Session, event_id: Optional[int] = None) -> List[AccessRequest]:
+    """Get all access requests, of every event unless event_id is given"""
     statement = select(AccessRequest).order_by(AccessRequest.created_at.desc())
+    if event_id is not None:
+        statement = statement.where(AccessRequest.event_id == event_id)
     return list(session.exec(statement).all())
 
-def approve_request(session: Session, request_id: int) -> Optional[AccessRequest]:
-    """Approve access request and generate QR token"""
-    statement = select(AccessRequest).where(AccessRequest.id == request_id)
+def encode_cursor(created_at: datetime, request_id: int) -> str:
+    """Encode a keyset position in the admin list as an opaque string"""
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{request_id}".encode()).decode()
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    """Decode a cursor from encode_cursor; None if it is malformed"""
+    try:
+        created_at, request_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(request_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def list_requests(
+    session: Session,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    event_id: Optional[int] = None
+) -> Tuple[List[Tuple[AccessRequest, bool, Optional[datetime]]], Optional[str]]:
+    """Get one page of access requests, newest first, with their check-in status
+
+    `status` is "pending", "approved" (not yet checked in) or "used" (checked in);
+    `search` is a case-insensitive prefix of the email or Instagram handle;
+    `event_id` limits the list to one event.
+    Returns (rows, next_cursor) where each row is (request, checked_in, checked_in_at).
+    """
+    # Correlated on the indexed qrtoken.request_id, so this stays one query per page
+    checked_in = exists().where(QRToken.request_id == AccessRequest.id, QRToken.used == True)
+    checked_in_at = (
+        select(func.max(QRToken.used_at))
+        .where(QRToken.request_id == AccessRequest.id)
+        .scalar_subquery()
+    )
+    statement = select(AccessRequest, checked_in.label("checked_in"), checked_in_at.label("checked_in_at"))
+    if event_id is not None:
+        # Leads the (event_id, [approved,] created_at, id) indexes
+        statement = statement.where(AccessRequest.event_id == event_id)
+
+    if status == "pending":
+        statement = statement.where(AccessRequest.approved == False)
+    elif status == "approved":
+        statement = statement.where(AccessRequest.approved == True, ~checked_in)
+    elif status == "used":
+        statement = statement.where(checked_in)
+
+    if search:
+        # Range scans on lower(email) / lower(instagram) can use their indexes
+        prefix = search.strip().lstrip("@").lower()
+        upper = prefix + "\uffff"
+        statement = statement.where(or_(
+            (func.lower(AccessRequest.email) >= prefix) & (func.lower(AccessRequest.email) < upper),
+            (func.lower(AccessRequest.instagram) >= prefix) & (func.lower(AccessRequest.instagram) < upper),
+        ))
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        statement = statement.where(tuple_(AccessRequest.created_at, AccessRequest.id) < position)
+
+    statement = statement.order_by(AccessRequest.created_at.desc(), AccessRequest.id.desc()).limit(limit + 1)
+    rows = [tuple(row) for row in session.exec(statement).all()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
+
+def count_requests(session: Session, event_id: Optional[int] = None) -> Dict[str, int]:
+    """Count access requests by status, of every event unless event_id is given"""
+    totals = (
+        select(func.count(), func.coalesce(func.sum(case((AccessRequest.approved == True, 1), else_=0)), 0))
+        .select_from(AccessRequest)
+    )
+    checked_in = select(func.count(func.distinct(QRToken.request_id))).where(QRToken.used == True)
+    if event_id is not None:
+        totals = totals.where(AccessRequest.event_id == event_id)
+        checked_in = checked_in.where(QRToken.event_id == event_id)
+    total, approved = session.exec(totals).one()
+    used = session.exec(checked_in).one()
+    return {"total": total, "approved": approved, "pending": total - approved, "used": used}
+
+def approve_request(session: Session, request_id: int, token: Optional[str] = None) -> Optional[AccessRequest]:
+    """Approve access request and generate QR token, or use a pre-generated one
+
+    Approving a request that is already approved (a double click, a retry)
+    changes nothing: it keeps its token and gets no second invitation.
+    """
+    # Locks the row on PostgreSQL, so a concurrent approval waits and sees it approved
+    statement = select(AccessRequest).where(AccessRequest.id == request_id).with_for_update()
     request = session.exec(statement).first()
     
     if not request:
         return None
+    if request.approved:
+        session.commit()
+        return request
     
     # Mark as approved
     request.approved = True
     request.approved_at = datetime.utcnow()
     
-    # Generate unique QR token
-    token = str(uuid.uuid4())
-    qr_token = QRToken(token=token, request_id=request.id)
+    # Generate a signed QR token
+    token = token or token_signer.issue(request.id)
+    qr_token = QRToken(token=token, request_id=request.id, event_id=request.event_id)
     
     session.add(qr_token)
+    # Queue the invitation in the same transaction so it can't be lost
+    session.add(_new_outbox_entry(request, token))
     session.commit()
     session.refresh(request)
     session.refresh(qr_token)
+    event_bus.approved([(request.event_id, request.id, request.first_name, request.last_name)])
     
     return request
 
+def approve_requests(
+    session: Session, request_ids: List[int], tokens: Optional[Dict[int, str]] = None
+) -> List[Tuple[AccessRequest, Optional[QRToken]]]:
+    """Approve several access requests in one transaction
+
+    Returns a (request, token) pair for every request that exists, in the order
+    the IDs were given. The token is None for requests that were already approved.
+    Invitations for newly approved requests are queued in the email outbox.
+    `tokens` maps request IDs to pre-generated tokens; others get a new one.
+    """
+    tokens = tokens or {}
+    # Locked in ID order (on PostgreSQL; SQLite's writer already holds the database
+    # lock), so overlapping bulk approvals queue instead of deadlocking or both
+    # issuing tokens
+    statement = (
+        select(AccessRequest)
+        .where(AccessRequest.id.in_(request_ids))
+        .order_by(AccessRequest.id)
+        .with_for_update()
+    )
+    requests = {request.id: request for request in session.exec(statement).all()}
+
+    approved_at = datetime.utcnow()
+    results = []
+    seen = set()
+    for request_id in request_ids:
+        request = requests.get(request_id)
+        if not request or request_id in seen:
+            continue
+        seen.add(request_id)
+
+        if request.approved:
+            results.append((request, None))
+            continue
+
+        request.approved = True
+        request.approved_at = approved_at
+        qr_token = QRToken(
+            token=tokens.get(request.id) or token_signer.issue(request.id),
+            request_id=request.id,
+            event_id=request.event_id
+        )
+        session.add(qr_token)
+        session.add(_new_outbox_entry(request, qr_token.token))
+        results.append((request, qr_token))
+
+    new_tokens = [qr_token.token for _, qr_token in results if qr_token]
+    session.commit()
+
+    # Reload the expired rows with two queries rather than one refresh per row
+    session.exec(select(AccessRequest).where(AccessRequest.id.in_(list(seen)))).all()
+    if new_tokens:
+        session.exec(select(QRToken).where(QRToken.token.in_(new_tokens))).all()
+    event_bus.approved([
+        (request.event_id, request.id, request.first_name, request.last_name)
+        for request, qr_token in results if qr_token
+    ])
+
+    return results
+
 def get_qr_token(session: Session, token: str) -> Optional[QRToken]:
     """Get QR token by token string"""
     statement = select(QRToken).where(QRToken.token == token)
@@ -81,18 +525,241 @@ def get_qr_token(session: Session, token: str) -> Optional[QRToken]:
 
 def use_qr_token(session: Session, token: str) -> Optional[QRToken]:
     """Mark QR token as used"""
-    qr_token = get_qr_token(session, token)
-    if not qr_token or qr_token.used:
-        return None
-    
-    qr_token.used = True
-    qr_token.used_at = datetime.utcnow()
+    # Conditional update so two scanners can't both admit the same code
+    statement = (
+        update(QRToken)
+        .where(QRToken.token == token, QRToken.used == False)
+        .values(used=True, used_at=datetime.utcnow())
+        .returning(QRToken)
+        .execution_options(synchronize_session=False)
+    )
+    qr_token = session.exec(statement).scalars().first()
     session.commit()
-    session.refresh(qr_token)
+    if qr_token:
+        event_bus.checked_in([(qr_token.event_id, qr_token.request_id, None, None, qr_token.used_at)])
     
     return qr_token
 
+def redeem_qr_token(session: Session, token: str):
+    """Mark an unused QR token as used and return the guest's details in one statement
+
+    Returns a row with event_id, request_id, first_name, last_name, instagram and used_at,
+    or None if the token doesn't exist or was already used.
+    """
+    def guest_field(column):
+        return select(column).where(AccessRequest.id == QRToken.request_id).scalar_subquery()
+
+    statement = (
+        update(QRToken)
+        .where(QRToken.token == token, QRToken.used == False)
+        .values(used=True, used_at=datetime.utcnow())
+        .returning(
+            QRToken.event_id,
+            QRToken.request_id,
+            guest_field(AccessRequest.first_name).label("first_name"),
+            guest_field(AccessRequest.last_name).label("last_name"),
+            guest_field(AccessRequest.instagram).label("instagram"),
+            QRToken.used_at
+        )
+        .execution_options(synchronize_session=False)
+    )
+    guest = session.execute(statement).first()
+    session.commit()
+    if guest:
+        event_bus.checked_in([
+            (guest.event_id, guest.request_id, f"{guest.first_name} {guest.last_name}", guest.instagram, guest.used_at)
+        ])
+    return guest
+
+def reconcile_offline_scans(session: Session, scans: List[Tuple[str, datetime]]) -> List[Dict]:
+    """Apply scans made offline, earliest scan of each token wins
+
+    Scans are replayed in time order with a conditional update that only succeeds
+    if the token is unused or was recorded as used *later* than this scan. Returns
+    one result per scan, in the order given.
+    """
+    # Forged tokens are reported invalid without being looked up
+    tokens = list({token for token, _ in scans if token_signer.is_plausible(token)})
+    known = {}
+    guests = {}
+    for token, used_at, event_id, request_id in session.exec(
+        select(QRToken.token, QRToken.used_at, QRToken.event_id, QRToken.request_id).where(QRToken.token.in_(tokens))
+    ):
+        known[token] = used_at
+        guests[token] = (event_id, request_id)
+
+    results: List[Optional[Dict]] = [None] * len(scans)
+    order = sorted(range(len(scans)), key=lambda i: scans[i][1])
+    for i in order:
+        token, scanned_at = scans[i]
+        if token not in known:
+            results[i] = {"token": token, "status": "invalid"}
+            continue
+
+        statement = (
+            update(QRToken)
+            .where(
+                QRToken.token == token,
+                (QRToken.used == False) | (QRToken.used_at > scanned_at)
+            )
+            .values(used=True, used_at=scanned_at)
+            .execution_options(synchronize_session=False)
+        )
+        previous = known[token]
+        if session.execute(statement).rowcount:
+            known[token] = scanned_at
+            # A later scan had already been recorded: both got in, flag it
+            results[i] = {"token": token, "status": "admitted", "conflict": previous is not None}
+        else:
+            results[i] = {"token": token, "status": "duplicate", "conflict": True, "first_scanned_at": previous}
+
+    session.commit()
+    event_bus.checked_in([
+        (*guests[result["token"]], None, None, known[result["token"]])
+        for result in results if result["status"] == "admitted" and not result["conflict"]
+    ])
+    return results
+
 def get_request_by_id(session: Session, request_id: int) -> Optional[AccessRequest]:
     """Get access request by ID"""
     statement = select(AccessRequest).where(AccessRequest.id == request_id)
     return session.exec(statement).first()
+
+def _new_outbox_entry(request: AccessRequest, token: str) -> EmailOutbox:
+    """Build an outbox row for a guest's invitation"""
+    return EmailOutbox(
+        request_id=request.id,
+        token=token,
+        to_email=request.email,
+        guest_name=f"{request.first_name} {request.last_name}",
+        locale=request.locale
+    )
+
+def resend_invitation(session: Session, request_id: int) -> Optional[EmailOutbox]:
+    """Queue the invitation of an approved request again"""
+    statement = (
+        select(AccessRequest, QRToken)
+        .join(QRToken, QRToken.request_id == AccessRequest.id)
+        .where(AccessRequest.id == request_id)
+        .order_by(QRToken.created_at.desc())
+    )
+    row = session.exec(statement).first()
+    if not row:
+        return None
+
+    request, qr_token = row
+    entry = _new_outbox_entry(request, qr_token.token)
+    session.add(entry)
+    session.commit()
+    session.refresh(entry)
+    return entry
+
+def claim_outbox_batch(session: Session, limit: int) -> List[EmailOutbox]:
+    """Mark up to `limit` due outbox messages as sending and return them"""
+    now = datetime.utcnow()
+    # Workers on other processes or nodes skip the rows this one is claiming
+    # instead of waiting for them and sending them again (PostgreSQL)
+    statement = (
+        select(EmailOutbox)
+        .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    entries = list(session.exec(statement).all())
+    entry_ids = [entry.id for entry in entries]
+    for entry in entries:
+        entry.status = "sending"
+        entry.attempts += 1
+        entry.claimed_at = now
+    session.commit()
+
+    if not entry_ids:
+        return []
+    return list(session.exec(select(EmailOutbox).where(EmailOutbox.id.in_(entry_ids))).all())
+
+def mark_outbox_sent(session: Session, entry_ids: List[int]):
+    """Record successful delivery of outbox messages"""
+    if not entry_ids:
+        return
+    session.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(entry_ids))
+        .values(status="sent", sent_at=datetime.utcnow(), last_error=None)
+    )
+    session.commit()
+
+def mark_outbox_failed(session: Session, entry_id: int, error: str, retry_at: Optional[datetime]):
+    """Record a failed delivery; without a retry time the message is dead-lettered"""
+    values = {"last_error": error[:500]}
+    if retry_at is None:
+        values["status"] = "dead"
+    else:
+        values["status"] = "pending"
+        values["next_attempt_at"] = retry_at
+    session.execute(update(EmailOutbox).where(EmailOutbox.id == entry_id).values(**values))
+    session.commit()
+
+def reset_stale_outbox(session: Session, lease: timedelta) -> int:
+    """Return messages left in `sending` by a crashed worker to the queue
+
+    Only claims older than `lease` count as abandoned: younger ones may belong
+    to a worker in another process or on another node that is still sending.
+    """
+    result = session.execute(
+        update(EmailOutbox)
+        .where(
+            EmailOutbox.status == "sending",
+            or_(EmailOutbox.claimed_at == None, EmailOutbox.claimed_at < datetime.utcnow() - lease)
+        )
+        .values(status="pending", claimed_at=None)
+    )
+    session.commit()
+    return result.rowcount
+
+def retry_outbox_message(session: Session, entry_id: int) -> Optional[EmailOutbox]:
+    """Move a dead-lettered message back to the queue"""
+    entry = session.get(EmailOutbox, entry_id)
+    if not entry or entry.status != "dead":
+        return None
+    entry.status = "pending"
+    entry.attempts = 0
+    entry.next_attempt_at = datetime.utcnow()
+    session.commit()
+    session.refresh(entry)
+    return entry
+
+def get_outbox_stats(session: Session, latency_sample: int = 500) -> Dict:
+    """Get outbox queue depth per status and recent send latency"""
+    counts = dict(
+        session.exec(select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)).all()
+    )
+    recent = session.exec(
+        select(EmailOutbox.created_at, EmailOutbox.sent_at)
+        .where(EmailOutbox.status == "sent")
+        .order_by(EmailOutbox.sent_at.desc())
+        .limit(latency_sample)
+    ).all()
+    latencies = sorted((sent_at - created_at).total_seconds() for created_at, sent_at in recent)
+
+    def pct(p: float) -> Optional[float]:
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3)
+
+    dead = session.exec(
+        select(EmailOutbox)
+        .where(EmailOutbox.status == "dead")
+        .order_by(EmailOutbox.id.desc())
+        .limit(20)
+    ).all()
+
+    return {
+        "pending": counts.get("pending", 0),
+        "sending": counts.get("sending", 0),
+        "sent": counts.get("sent", 0),
+        "dead": counts.get("dead", 0),
+        "latency_p50": pct(0.50),
+        "latency_p95": pct(0.95),
+        "recent_dead": list(dead)
+    }
@@ -0,0 +1,307 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.util import await_only
+from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import AsyncIterator, Dict, Optional, Tuple, Union
+import asyncio
+import os
+import threading
+import time
+
+# SQLite by default; a postgresql:// URL runs several workers (or nodes) on one database
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./terrace_party.db")
+
+# Sized for FastAPI's threadpool (40 threads): sync routes block on a pooled
+# connection instead of opening one per request
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# A server database has a connection limit shared by every worker process on
+# every node: each worker's pools get an equal share of DB_MAX_CONNECTIONS
+# (keep it below the server's max_connections) unless DB_POOL_SIZE is set.
+# WEB_CONCURRENCY is the worker count uvicorn and gunicorn read.
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "80"))
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Replace connections older than this, and test them on checkout, so a server
+# restart or failover costs a reconnect instead of failed requests
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# Applied to every new SQLite connection
+BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", str(64 * 1024)))
+
+# With a split, writes go through a single connection that takes the write lock
+# up front (BEGIN IMMEDIATE) and reads use their own read-only pool. The sync
+# writer (background workers, imports, archiving) and the async one (routes)
+# share a per-file WriteGate, so every writer in the process queues in order
+# instead of racing the others in SQLite's busy handler, where some can starve
+# past busy_timeout under load.
+SPLIT_READ_WRITE = os.getenv("DB_SPLIT_READ_WRITE", "true").lower() in ("1", "true", "yes")
+WRITER_POOL_SIZE = int(os.getenv("DB_WRITER_POOL_SIZE", "1"))
+
+def sqlite_pragmas(
+    busy_timeout_ms: int = BUSY_TIMEOUT_MS,
+    mmap_size: int = MMAP_SIZE,
+    cache_size_kb: int = CACHE_SIZE_KB,
+    query_only: bool = False
+) -> Dict[str, Union[int, str]]:
+    """Pragmas for a file-backed SQLite connection
+
+    WAL lets readers run alongside the single writer, and synchronous=NORMAL only
+    syncs at checkpoints (still durable against application crashes). Waiting on
+    busy_timeout replaces immediate "database is locked" errors.
+    """
+    pragmas: Dict[str, Union[int, str]] = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": busy_timeout_ms,
+        "mmap_size": mmap_size,
+        # Negative values are KiB rather than pages
+        "cache_size": -cache_size_kb,
+        "temp_store": "MEMORY",
+    }
+    if query_only:
+        pragmas["query_only"] = "ON"
+    return pragmas
+
+class WriteGate:
+    """One write transaction at a time on a SQLite file, across sync and async engines
+
+    Taken before BEGIN IMMEDIATE and given back as the transaction commits or
+    rolls back. Threads block on it; async sessions poll it from their greenlet,
+    leaving the event loop free. The next writer's BEGIN may still wait on
+    busy_timeout for the COMMIT in flight, which is short.
+    """
+    POLL_SECONDS = 0.002
+
+    def __init__(self, timeout: float = POOL_TIMEOUT):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+    def acquire(self, is_async: bool = False):
+        if not is_async:
+            if not self._lock.acquire(timeout=self.timeout):
+                raise PoolTimeoutError(f"No SQLite write slot after {self.timeout:.0f}s")
+            return
+        deadline = time.monotonic() + self.timeout
+        while not self._lock.acquire(blocking=False):
+            if time.monotonic() > deadline:
+                raise PoolTimeoutError(f"No SQLite write slot after {self.timeout:.0f}s")
+            await_only(asyncio.sleep(self.POLL_SECONDS))
+
+    def release(self):
+        self._lock.release()
+
+_write_gates: Dict[str, WriteGate] = {}
+_write_gates_lock = threading.Lock()
+
+def write_gate(url: str) -> WriteGate:
+    """The WriteGate shared by every writer engine on this database file"""
+    path = os.path.realpath(make_url(url).database)
+    with _write_gates_lock:
+        return _write_gates.setdefault(path, WriteGate())
+
+def create_sqlite_engine(
+    url: str,
+    pragmas: Optional[Dict[str, Union[int, str]]] = None,
+    begin_immediate: bool = False,
+    pool_size: int = POOL_SIZE,
+    max_overflow: int = MAX_OVERFLOW,
+    pool_timeout: float = POOL_TIMEOUT,
+    echo: bool = False
+) -> Engine:
+    """Create a pooled SQLite engine that sets pragmas on every new connection
+
+    begin_immediate makes each transaction take the write lock when it starts.
+    A deferred transaction that reads and then writes can fail with "database is
+    locked" without waiting when another writer committed in between; an
+    immediate one waits on the file's WriteGate, then on busy_timeout.
+    """
+    if pragmas is None:
+        pragmas = sqlite_pragmas()
+    if make_url(url).database in (None, "", ":memory:"):
+        # In-memory databases have no journal to tune and can't be shared by a pool
+        return create_engine(url, echo=echo, connect_args={"check_same_thread": False})
+
+    engine = create_engine(
+        url,
+        echo=echo,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        connect_args={"check_same_thread": False, "timeout": BUSY_TIMEOUT_MS / 1000}
+    )
+    _tune_sqlite(engine, pragmas, begin_immediate)
+    return engine
+
+def _tune_sqlite(engine: Engine, pragmas: Dict[str, Union[int, str]], begin_immediate: bool, is_async: bool = False):
+    # Works for both pysqlite and the aiosqlite adapter (pass async_engine.sync_engine)
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        if begin_immediate:
+            # Leave transaction control to the "begin" hook below
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    if begin_immediate:
+        gate = write_gate(str(engine.url))
+
+        @event.listens_for(engine, "begin")
+        def begin(conn):
+            gate.acquire(is_async)
+            try:
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+            except BaseException:
+                gate.release()
+                raise
+            conn.info["write_gate"] = gate
+
+        @event.listens_for(engine, "commit")
+        @event.listens_for(engine, "rollback")
+        def end(conn):
+            held = conn.info.pop("write_gate", None)
+            if held is not None:
+                held.release()
+
+def server_pool_size(
+    workers: int = WORKERS, max_connections: int = DB_MAX_CONNECTIONS, engines: int = 2
+) -> Tuple[int, int]:
+    """(pool_size, max_overflow) for each of a worker's engines on a server database
+
+    Each worker has a sync and an async engine; half of an engine's share is
+    kept open and the rest is overflow, opened under load and closed after.
+    """
+    if "DB_POOL_SIZE" in os.environ:
+        return POOL_SIZE, MAX_OVERFLOW
+    share = max(2, max_connections // max(1, workers) // engines)
+    return share // 2, share - share // 2
+
+def create_server_engine(url: str, echo: bool = False, is_async: bool = False) -> Union[Engine, AsyncEngine]:
+    """Pooled engine for a server database such as PostgreSQL"""
+    pool_size, max_overflow = server_pool_size()
+    create = create_async_engine if is_async else create_engine
+    return create(
+        url,
+        echo=echo,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=True
+    )
+
+def create_engines(url: str = DATABASE_URL, split: bool = SPLIT_READ_WRITE, echo: bool = False):
+    """Build the (writer, reader) engine pair; without a split both are the same engine"""
+    if not url.startswith("sqlite"):
+        # The server handles concurrent writers itself
+        engine = create_server_engine(url, echo)
+        return engine, engine
+    if not split:
+        engine = create_sqlite_engine(url, echo=echo)
+        return engine, engine
+
+    writer = create_sqlite_engine(
+        url, begin_immediate=True, pool_size=WRITER_POOL_SIZE, max_overflow=0, echo=echo
+    )
+    reader = create_sqlite_engine(url, pragmas=sqlite_pragmas(query_only=True), echo=echo)
+    return writer, reader
+
+engine, read_engine = create_engines()
+
+# asyncio driver for each backend
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+def async_url(url: str) -> str:
+    """The same database through an asyncio driver (aiosqlite for SQLite, asyncpg for PostgreSQL)"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver and parsed.get_driver_name() != driver:
+        return parsed.set(drivername=f"{parsed.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+    return url
+
+def create_async_sqlite_engine(
+    url: str,
+    pragmas: Optional[Dict[str, Union[int, str]]] = None,
+    begin_immediate: bool = False,
+    pool_size: int = POOL_SIZE,
+    max_overflow: int = MAX_OVERFLOW,
+    pool_timeout: float = POOL_TIMEOUT,
+    echo: bool = False
+) -> AsyncEngine:
+    """aiosqlite counterpart of create_sqlite_engine
+
+    Queries run on aiosqlite's connection thread, so awaiting them leaves the
+    event loop free for other requests.
+    """
+    url = async_url(url)
+    if pragmas is None:
+        pragmas = sqlite_pragmas()
+    if make_url(url).database in (None, "", ":memory:"):
+        return create_async_engine(url, echo=echo)
+
+    async_engine = create_async_engine(
+        url,
+        echo=echo,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        connect_args={"timeout": BUSY_TIMEOUT_MS / 1000}
+    )
+    _tune_sqlite(async_engine.sync_engine, pragmas, begin_immediate, is_async=True)
+    return async_engine
+
+def create_async_engines(url: str = DATABASE_URL, split: bool = SPLIT_READ_WRITE, echo: bool = False):
+    """Build the async (writer, reader) engine pair, mirroring create_engines"""
+    url = async_url(url)
+    if not url.startswith("sqlite"):
+        async_engine = create_server_engine(url, echo, is_async=True)
+        return async_engine, async_engine
+    if not split:
+        async_engine = create_async_sqlite_engine(url, echo=echo)
+        return async_engine, async_engine
+
+    writer = create_async_sqlite_engine(
+        url, begin_immediate=True, pool_size=WRITER_POOL_SIZE, max_overflow=0, echo=echo
+    )
+    reader = create_async_sqlite_engine(url, pragmas=sqlite_pragmas(query_only=True), echo=echo)
+    return writer, reader
+
+def make_async_sessionmaker(bind: AsyncEngine) -> async_sessionmaker:
+    """Session factory for an async engine
+
+    Objects stay usable after commit: expiring them would make the next attribute
+    access lazy-load outside the session's greenlet and fail.
+    """
+    return async_sessionmaker(bind, class_=AsyncSession, expire_on_commit=False)
+
+async_engine, async_read_engine = create_async_engines()
+AsyncSessionLocal = make_async_sessionmaker(async_engine)
+AsyncReadSessionLocal = make_async_sessionmaker(async_read_engine)
+
+def get_session():
+    """Get database session"""
+    with Session(engine) as session:
+        yield session
+
+def get_read_session():
+    """Get a database session for read-only routes (the reader pool when split)"""
+    with Session(read_engine) as session:
+        yield session
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """Get an async database session"""
+    async with AsyncSessionLocal() as session:
+        yield session
+
+async def get_async_read_session() -> AsyncIterator[AsyncSession]:
+    """Get an async database session for read-only routes"""
+    async with AsyncReadSessionLocal() as session:
+        yield session
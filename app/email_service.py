@@ -1,14 +1,19 @@
-import aiosmtplib
-from email.message import EmailMessage
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.image import MIMEImage
+from app.email_templates import InvitationTemplates
+from app.smtp_pool import SMTPConnectionPool
+from app.metrics import SMTP_SENT, SMTP_FAILED
+import asyncio
 import os
-from typing import Optional
+import time
+from typing import NamedTuple, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+class OutgoingEmail(NamedTuple):
+    """A serialized message and its recipient"""
+    to_email: str
+    data: bytes
+
 class EmailService:
     def __init__(self):
         self.smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
@@ -16,93 +21,100 @@ class EmailService:
         self.smtp_username = os.getenv("SMTP_USERNAME")
         self.smtp_password = os.getenv("SMTP_PASSWORD")
         self.from_email = os.getenv("FROM_EMAIL", self.smtp_username)
-        
-    async def send_invitation_email(
-        self, 
-        to_email: str, 
-        guest_name: str, 
-        qr_code_bytes: bytes,
-        fallback_url: str
-    ) -> bool:
-        """Send invitation email with QR code attachment"""
-        try:
-            # Create multipart message
-            msg = MIMEMultipart()
-            msg["From"] = self.from_email
-            msg["To"] = to_email
-            msg["Subject"] = "🌊 Terrace After-Party Invitation - You're Approved! ✨"
-            
-            # Email body
-            body = f"""
-            <html>
-            <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-                <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; text-align: center; color: white;">
-                    <h1 style="margin: 0; font-size: 28px;">🌊 You're Invited! ✨</h1>
-                    <p style="margin: 10px 0 0 0; font-size: 18px;">Terrace After-Party by the Sea</p>
-                </div>
-                
-                <div style="padding: 30px; background: #f8f9fa;">
-                    <h2 style="color: #333;">Hey {guest_name}! 👋</h2>
-                    
-                    <p style="font-size: 16px; line-height: 1.6; color: #555;">
-                        Your request has been <strong>approved</strong>! Get ready for an unforgettable night 
-                        on our seaside terrace starting at <strong>midnight (00:00)</strong>.
-                    </p>
-                    
-                    <div style="background: white; padding: 20px; border-radius: 10px; margin: 20px 0; text-align: center; border: 2px dashed #667eea;">
-                        <h3 style="color: #667eea; margin-top: 0;">Your Personal QR Code</h3>
-                        <p style="color: #666; margin-bottom: 15px;">
-                            Show this QR code at the entrance. <strong>One-time use only!</strong>
-                        </p>
-                        <p style="font-size: 14px; color: #999;">
-                            QR code is attached to this email as an image.
-                        </p>
-                    </div>
-                    
-                    <div style="background: #e3f2fd; padding: 15px; border-radius: 8px; margin: 20px 0;">
-                        <h4 style="color: #1976d2; margin-top: 0;">Backup Access Link:</h4>
-                        <a href="{fallback_url}" style="color: #1976d2; text-decoration: none; font-weight: bold;">
-                            {fallback_url}
-                        </a>
-                        <p style="font-size: 14px; color: #666; margin-bottom: 0;">
-                            Use this link if you can't scan the QR code.
-                        </p>
-                    </div>
-                    
-                    <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd;">
-                        <p style="color: #666; font-size: 14px; margin: 0;">
-                            🌊 See you at midnight on the terrace! 🥂<br>
-                            Questions? Just reply to this email.
-                        </p>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            
-            msg.attach(MIMEText(body, "html"))
-            
-            # Attach QR code image
-            qr_attachment = MIMEImage(qr_code_bytes)
-            qr_attachment.add_header("Content-Disposition", "attachment", filename="invitation-qr-code.png")
-            msg.attach(qr_attachment)
-            
-            # Send email
-            await aiosmtplib.send(
-                msg,
+        self.start_tls = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+        # Persistent connection pool settings
+        self.pool_size = int(os.getenv("SMTP_POOL_SIZE", "4"))
+        self.pool_max_messages = int(os.getenv("SMTP_POOL_MAX_MESSAGES", "100"))
+        self.pool_max_idle = float(os.getenv("SMTP_POOL_MAX_IDLE", "30"))
+        self._pool: Optional[SMTPConnectionPool] = None
+        # Invitation templates, compiled on first use
+        self.templates = InvitationTemplates(
+            os.getenv("EMAIL_TEMPLATE_DIR", "templates/email"),
+            os.getenv("EMAIL_DEFAULT_LOCALE", "en")
+        )
+        # Readiness probe settings and last result
+        self.health_ttl = float(os.getenv("SMTP_HEALTH_TTL", "30"))
+        self.health_timeout = float(os.getenv("SMTP_HEALTH_TIMEOUT", "5"))
+        self._ready_until = 0.0
+        self._ready_error: Optional[str] = None
+
+    @property
+    def pool(self) -> SMTPConnectionPool:
+        """SMTP connection pool, created on first use from the current settings"""
+        if self._pool is None:
+            self._pool = SMTPConnectionPool(
                 hostname=self.smtp_server,
                 port=self.smtp_port,
-                start_tls=True,
                 username=self.smtp_username,
                 password=self.smtp_password,
+                start_tls=self.start_tls,
+                size=self.pool_size,
+                max_messages=self.pool_max_messages,
+                max_idle=self.pool_max_idle
             )
-            
-            logger.info(f"Invitation email sent successfully to {to_email}")
-            return True
-            
+        return self._pool
+
+    async def close(self):
+        """Close pooled SMTP connections; the pool is rebuilt on the next send"""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def check_ready(self) -> Optional[str]:
+        """None if the SMTP server answers NOOP, otherwise the error
+
+        The result is reused for SMTP_HEALTH_TTL seconds so frequent health
+        probes don't each cost an SMTP round trip.
+        """
+        now = time.monotonic()
+        if now < self._ready_until:
+            return self._ready_error
+        try:
+            await asyncio.wait_for(self.pool.ping(), self.health_timeout)
+            self._ready_error = None
         except Exception as e:
-            logger.error(f"Failed to send email to {to_email}: {str(e)}")
-            return False
+            self._ready_error = f"{type(e).__name__}: {e}"
+        self._ready_until = time.monotonic() + self.health_ttl
+        return self._ready_error
+
+    def build_invitation_message(
+        self,
+        to_email: str,
+        guest_name: str,
+        qr_code_bytes: bytes,
+        fallback_url: str,
+        locale: Optional[str] = None
+    ) -> OutgoingEmail:
+        """Build the invitation email with QR code attachment in the guest's locale"""
+        data = self.templates.build_message(
+            locale, self.from_email or "", to_email, guest_name, fallback_url, qr_code_bytes
+        )
+        return OutgoingEmail(to_email, data)
+
+    async def deliver_invitation_email(
+        self,
+        to_email: str,
+        guest_name: str,
+        qr_code_bytes: bytes,
+        fallback_url: str,
+        locale: Optional[str] = None
+    ):
+        """Send invitation email, raising on failure so callers can retry"""
+        msg = self.build_invitation_message(to_email, guest_name, qr_code_bytes, fallback_url, locale)
+        await self.deliver_message(msg)
+
+    async def deliver_message(self, msg: OutgoingEmail):
+        """Send an already built message, raising on failure"""
+        # Send email over a pooled connection
+        started = time.perf_counter()
+        try:
+            await self.pool.send_raw(self.from_email or "", [msg.to_email], msg.data)
+        except BaseException:
+            SMTP_FAILED.observe(time.perf_counter() - started)
+            raise
+        SMTP_SENT.observe(time.perf_counter() - started)
+
+        logger.info(f"Invitation email sent successfully to {msg.to_email}")
 
 # Global email service instance
 email_service = EmailService()
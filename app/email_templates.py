@@ -0,0 +1,184 @@
+from email.header import Header
+from email.utils import formatdate, make_msgid
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import escape
+from typing import Dict, List, Optional, Tuple
+import base64
+import os
+import re
+import secrets
+import threading
+
+# Per-guest values an invitation template may print. They are substituted into
+# pre-rendered text, so templates can output them but not filter or test them.
+FIELDS = ("guest_name", "fallback_url")
+_MARKER = re.compile("\x00(\\d+)\x00")
+
+class CompiledTemplate:
+    """A template rendered once with placeholders and split around them
+
+    Rendering for a guest is then a join of the static segments with the
+    guest's values, with no template evaluation.
+    """
+    def __init__(self, source: str, autoescape: bool):
+        self.autoescape = autoescape
+        parts = _MARKER.split(source)
+        self.segments: List[str] = parts[0::2]
+        self.fields: List[str] = [FIELDS[int(index)] for index in parts[1::2]]
+
+    def render(self, values: Dict[str, str]) -> str:
+        """The template's output for these field values"""
+        out = [self.segments[0]]
+        for field, segment in zip(self.fields, self.segments[1:]):
+            value = values[field]
+            out.append(str(escape(value)) if self.autoescape else value)
+            out.append(segment)
+        return "".join(out)
+
+class LocaleTemplates:
+    """Subject, plain-text and HTML invitation for one locale"""
+    def __init__(self, locale: str, subject: str, text: CompiledTemplate, html: CompiledTemplate):
+        self.locale = locale
+        self.subject = subject
+        self.text = text
+        self.html = html
+
+class InvitationTemplates:
+    """Invitation emails from templates/email/<locale>/
+
+    Each locale directory holds subject.txt, invitation.txt and invitation.html.
+    Templates are compiled on first use and kept; the MIME structure around
+    them (headers, boundaries, part headers) is serialized once per locale, so
+    building a message only encodes the per-guest parts.
+    """
+    def __init__(self, directory: str = "templates/email", default_locale: str = "en"):
+        self.directory = directory
+        self.default_locale = default_locale
+        self.environment = Environment(
+            loader=FileSystemLoader(directory),
+            autoescape=select_autoescape(["html"]),
+            keep_trailing_newline=True
+        )
+        self._available: Optional[List[str]] = None
+        self._locales: Dict[str, LocaleTemplates] = {}
+        self._skeletons: Dict[Tuple[str, str, str], Tuple[bytes, ...]] = {}
+        self._lock = threading.Lock()
+        # Can't occur in base64 output, which is all the parts contain
+        self._boundary = f"=_terrace-{secrets.token_hex(12)}"
+
+    @property
+    def locales(self) -> List[str]:
+        """Locales with a template directory"""
+        if self._available is None:
+            self._available = sorted(
+                name for name in os.listdir(self.directory)
+                if os.path.isfile(os.path.join(self.directory, name, "invitation.html"))
+            )
+        return self._available
+
+    def resolve(self, locale: Optional[str]) -> str:
+        """Closest available locale ("it-IT" -> "it"), else the default"""
+        if locale:
+            language = locale.replace("_", "-").split("-", 1)[0].lower()
+            if language in self.locales:
+                return language
+        return self.default_locale
+
+    def get(self, locale: Optional[str]) -> LocaleTemplates:
+        """Compiled templates for a locale, loading them on first use"""
+        locale = self.resolve(locale)
+        templates = self._locales.get(locale)
+        if templates is None:
+            with self._lock:
+                templates = self._locales.get(locale)
+                if templates is None:
+                    templates = self._locales[locale] = self._compile(locale)
+        return templates
+
+    def render(self, locale: Optional[str], guest_name: str, fallback_url: str) -> Tuple[str, str, str]:
+        """Subject, plain text and HTML of an invitation"""
+        templates = self.get(locale)
+        values = {"guest_name": guest_name, "fallback_url": fallback_url}
+        return templates.subject, templates.text.render(values), templates.html.render(values)
+
+    def build_message(
+        self,
+        locale: Optional[str],
+        from_email: str,
+        to_email: str,
+        guest_name: str,
+        fallback_url: str,
+        qr_code_bytes: bytes
+    ) -> bytes:
+        """A complete multipart/mixed invitation, ready for SMTP DATA
+
+        The body is a multipart/alternative of the plain-text and HTML
+        invitation, followed by the QR code attachment (PNG, or SVG when
+        QR_BACKEND=svg).
+        """
+        templates = self.get(locale)
+        image = "svg+xml" if qr_code_bytes.startswith(b"<svg") else "png"
+        head, middle, html_head, attachment_head, tail = self._skeleton(templates, from_email, image)
+        values = {"guest_name": guest_name, "fallback_url": fallback_url}
+        to_email = to_email.replace("\r", "").replace("\n", "")
+        return b"".join((
+            head,
+            f"To: {to_email}\nDate: {formatdate()}\nMessage-ID: {make_msgid(domain=_domain(from_email))}\n".encode(),
+            middle,
+            base64.encodebytes(templates.text.render(values).encode()),
+            html_head,
+            base64.encodebytes(templates.html.render(values).encode()),
+            attachment_head,
+            base64.encodebytes(qr_code_bytes),
+            tail
+        ))
+
+    def _compile(self, locale: str) -> LocaleTemplates:
+        markers = {field: f"\x00{index}\x00" for index, field in enumerate(FIELDS)}
+        subject = self.environment.get_template(f"{locale}/subject.txt").render().strip()
+        text = self.environment.get_template(f"{locale}/invitation.txt").render(**markers)
+        html = self.environment.get_template(f"{locale}/invitation.html").render(**markers)
+        return LocaleTemplates(locale, subject, CompiledTemplate(text, False), CompiledTemplate(html, True))
+
+    def _skeleton(self, templates: LocaleTemplates, from_email: str, image: str) -> Tuple[bytes, ...]:
+        key = (templates.locale, from_email, image)
+        skeleton = self._skeletons.get(key)
+        if skeleton is None:
+            outer, inner = self._boundary + "-m", self._boundary + "-a"
+            filename = "invitation-qr-code.svg" if image == "svg+xml" else "invitation-qr-code.png"
+            part = 'Content-Type: {}; charset="utf-8"\nContent-Transfer-Encoding: base64\n\n'
+            skeleton = self._skeletons[key] = (
+                f"From: {from_email}\n"
+                f"Subject: {Header(templates.subject, 'utf-8').encode()}\n"
+                "MIME-Version: 1.0\n"
+                f'Content-Type: multipart/mixed; boundary="{outer}"\n'.encode(),
+                f'\n--{outer}\nContent-Type: multipart/alternative; boundary="{inner}"\n\n'
+                f"--{inner}\n{part.format('text/plain')}".encode(),
+                f"--{inner}\n{part.format('text/html')}".encode(),
+                f"--{inner}--\n\n--{outer}\n"
+                f"Content-Type: image/{image}\nContent-Transfer-Encoding: base64\n"
+                f'Content-Disposition: attachment; filename="{filename}"\n\n'.encode(),
+                f"--{outer}--\n".encode()
+            )
+        return skeleton
+
+def _domain(address: str) -> str:
+    return address.rsplit("@", 1)[-1] if address and "@" in address else "localhost"
+
+def pick_locale(accept_language: Optional[str], supported: List[str]) -> Optional[str]:
+    """Best supported language from an Accept-Language header, or None"""
+    if not accept_language:
+        return None
+    choices = []
+    for position, item in enumerate(accept_language.split(",")):
+        tag, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        language = tag.strip().split("-", 1)[0].lower()
+        if language in supported and quality > 0:
+            choices.append((-quality, position, language))
+    return min(choices)[2] if choices else None
@@ -0,0 +1,223 @@
+from sqlmodel import Session
+from app.models import read_engine as default_engine
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("total", "approved", "pending", "used")
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+class EventBus:
+    """In-process pub/sub feeding the live admin dashboard over SSE
+
+    crud publishes sign-ups, approvals and check-ins as they commit, from the
+    event loop or from worker threads. The bus keeps running counters and
+    encodes each event once as a server-sent event frame carrying the counters;
+    every connected screen gets the same bytes pushed onto its queue, so
+    clients cost no queries. A screen that falls queue_size events behind is
+    disconnected; its EventSource reconnects and starts from a fresh snapshot.
+
+    Counters and frames are the current event's: guests of other open events
+    change neither. They only see events from this process, so with several
+    workers they are recounted from the database every resync_interval seconds
+    (one query per process, not per screen), and right away when a new event
+    becomes current.
+    """
+    def __init__(self, engine=None):
+        self.engine = engine or default_engine
+        self.queue_size = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+        self.resync_interval = float(os.getenv("EVENTS_RESYNC_INTERVAL", "60"))
+        self.heartbeat = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+        self.counts: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        # The event counted, once known; until then every guest counts
+        self.event_id: Optional[int] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._task: Optional[asyncio.Task] = None
+
+        self.published = 0
+        self.dropped = 0
+
+    def start(self, counts: Optional[Dict[str, int]] = None, event_id: Optional[int] = None):
+        """Deliver events to subscribers on the running loop, starting from event_id's counts"""
+        self._loop = asyncio.get_running_loop()
+        if counts is not None:
+            self.reset(counts, event_id)
+        if self._task is None and self.resync_interval > 0:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop resyncing and end every open stream"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for queue in list(self._subscribers):
+            self._close(queue)
+        self._loop = None
+
+    def reset(self, counts: Dict[str, int], event_id: Optional[int] = None):
+        """Replace the counters (event_id's, when given), telling subscribers if they changed"""
+        with self._lock:
+            changed = any(self.counts[name] != counts[name] for name in COUNTERS)
+            self.counts = {name: counts[name] for name in COUNTERS}
+            if event_id is not None:
+                self.event_id = event_id
+        if changed:
+            self.publish("counts", {})
+
+    def publish(self, kind: str, data: Dict, **deltas: int):
+        """Apply deltas to the counters and push an event to every subscriber"""
+        with self._lock:
+            for name, delta in deltas.items():
+                self.counts[name] += delta
+            self._sequence += 1
+            self.published += 1
+            frame = self._frame(kind, data)
+            # Scheduled under the lock so frames reach queues in sequence order,
+            # whichever thread published them
+            if self._loop is not None and self._subscribers:
+                try:
+                    self._loop.call_soon_threadsafe(self._dispatch, frame)
+                except RuntimeError:  # loop closed
+                    pass
+
+    def signed_up(self, guests):
+        """New access requests, as (event_id, id, first_name, last_name, instagram)"""
+        guests = self._current(guests)
+        if guests:
+            self.publish(
+                "signup",
+                {"guests": [
+                    {"id": request_id, "name": f"{first_name} {last_name}", "instagram": instagram}
+                    for request_id, first_name, last_name, instagram in guests
+                ]},
+                total=len(guests), pending=len(guests)
+            )
+
+    def approved(self, guests):
+        """Newly approved requests, as (event_id, id, first_name, last_name)"""
+        guests = self._current(guests)
+        if guests:
+            self.publish(
+                "approved",
+                {"guests": [
+                    {"id": request_id, "name": f"{first_name} {last_name}"}
+                    for request_id, first_name, last_name in guests
+                ]},
+                approved=len(guests), pending=-len(guests)
+            )
+
+    def checked_in(self, guests):
+        """First use of guests' tokens, as (event_id, request id, name or None, instagram or None, used_at)"""
+        guests = self._current(guests)
+        if guests:
+            self.publish(
+                "checked_in",
+                {"guests": [
+                    {"id": request_id, "name": name, "instagram": instagram, "used_at": used_at}
+                    for request_id, name, instagram, used_at in guests
+                ]},
+                used=len(guests)
+            )
+
+    def _current(self, guests) -> List[Tuple]:
+        """The current event's guests, without their leading event ID"""
+        event_id = self.event_id
+        return [guest[1:] for guest in guests if event_id is None or guest[0] == event_id]
+
+    def subscribe(self) -> Tuple[asyncio.Queue, bytes]:
+        """A queue of event frames, and a snapshot frame to send first
+
+        Must be called on the event loop. Events already queued for delivery
+        when this is called can arrive after the snapshot; their IDs are lower,
+        which is how clients recognise and skip them.
+        """
+        queue = asyncio.Queue(self.queue_size)
+        with self._lock:
+            snapshot = self._frame("snapshot", {})
+            self._subscribers.add(queue)
+        return queue, snapshot
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """Server-sent events for one client: a snapshot, then live events"""
+        queue, snapshot = self.subscribe()
+        try:
+            yield b"retry: 3000\n" + snapshot
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield b": ping\n\n"
+                    continue
+                if frame is None:
+                    break
+                yield frame
+        finally:
+            self.unsubscribe(queue)
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+            "counts": dict(self.counts)
+        }
+
+    async def resync(self):
+        """Recount the current event's requests from the database"""
+        self.reset(*await asyncio.to_thread(self._count))
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.resync_interval)
+            try:
+                await self.resync()
+            except Exception:
+                logger.exception("Recounting requests for the live dashboard failed")
+
+    def _count(self) -> Tuple[Dict[str, int], int]:
+        from app import crud
+        with Session(self.engine) as session:
+            event_id = crud.get_current_event(session).id
+            return crud.count_requests(session, event_id), event_id
+
+    def _frame(self, kind: str, data: Dict) -> bytes:
+        payload = json.dumps({**data, "counts": self.counts}, default=_default, separators=(",", ":"))
+        return f"id: {self._sequence}\nevent: {kind}\ndata: {payload}\n\n".encode()
+
+    def _dispatch(self, frame: bytes):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                self._close(queue)
+
+    def _close(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+# Global event bus instance
+event_bus = EventBus()
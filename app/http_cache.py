@@ -0,0 +1,236 @@
+"""
+HTTP caching for pages that are the same for every visitor, and for static files
+
+PageCache renders such a template once per context and keeps the body and
+its gzip and brotli encodings, each with its own ETag, so a hit is a dictionary
+lookup: no Jinja, no compression, and a 304 when the browser already has it.
+CompressedStaticFiles serves /static with precompressed encodings too.
+
+Bodies and encodings are kept for the life of the process: a new template or
+asset takes a restart, which a deploy does anyway.
+"""
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from fastapi.staticfiles import StaticFiles
+from starlette.staticfiles import NotModifiedResponse
+from jinja2 import Environment
+from starlette.datastructures import Headers
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+import gzip
+import hashlib
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; responses are then gzip or identity
+    brotli = None
+
+# Browsers and shared caches may reuse a page this long before revalidating
+PAGE_MAX_AGE = int(os.getenv("PAGE_CACHE_MAX_AGE", "60"))
+# Static files are revalidated after this long
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "3600"))
+
+# Smaller bodies aren't worth compressing; larger static files aren't kept in memory
+MIN_COMPRESS_SIZE = 256
+MAX_STATIC_COMPRESS_SIZE = int(os.getenv("STATIC_COMPRESS_MAX_BYTES", str(1024 * 1024)))
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".mjs", ".html", ".svg", ".json", ".txt", ".xml", ".map", ".ico", ".webmanifest"}
+
+# Each encoding of a page or file is its own representation, so it gets its own strong ETag
+ETAG_SUFFIXES = {"br": "-br", "gzip": "-gz"}
+
+def compress(body: bytes) -> Dict[str, bytes]:
+    """Brotli and gzip encodings of a body, where they make it smaller"""
+    if len(body) < MIN_COMPRESS_SIZE:
+        return {}
+    encodings = {}
+    if brotli is not None:
+        encodings["br"] = brotli.compress(body, quality=11)
+    # mtime=0 keeps the output, and so the encoding, the same from run to run
+    encodings["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+    return {name: data for name, data in encodings.items() if len(data) < len(body)}
+
+def pick_encoding(accept_encoding: str, available: Mapping[str, bytes]) -> Optional[str]:
+    """The best of the available encodings the client accepts (br over gzip), or None"""
+    if not available or not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    for name in ("br", "gzip"):
+        if name in available and accepted.get(name, accepted.get("*", 0.0)) > 0:
+            return name
+    return None
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """The ETag of a body's encoding, from the identity body's ETag
+
+    Starlette's FileResponse leaves its ETags unquoted; the suffix goes inside
+    the quotes when there are some.
+    """
+    if not encoding:
+        return etag
+    if etag.endswith('"'):
+        return f'{etag[:-1]}{ETAG_SUFFIXES[encoding]}"'
+    return f"{etag}{ETAG_SUFFIXES[encoding]}"
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers the ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+class CachedPage(NamedTuple):
+    body: bytes
+    etag: str
+    encodings: Dict[str, bytes]
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        """ETag of the body in an encoding (None for identity)"""
+        return encoded_etag(self.etag, encoding)
+
+class PageCache:
+    """Rendered template pages that don't depend on the visitor, kept with their encodings
+
+    Only for pages whose context is a handful of fixed values (a message, a
+    flag): the context is part of the key, so user input must never be in it.
+    """
+    def __init__(self, env: Environment, max_age: int = PAGE_MAX_AGE):
+        self.env = env
+        self.max_age = max_age
+        self._pages: Dict[Tuple, CachedPage] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, template_name: str, context: Optional[Dict] = None) -> CachedPage:
+        """The page for a template and context, rendered and compressed on first use"""
+        key = (template_name, tuple(sorted((context or {}).items())))
+        page = self._pages.get(key)
+        if page is not None:
+            self.hits += 1
+            return page
+        self.misses += 1
+        body = self.env.get_template(template_name).render(context or {}).encode()
+        page = CachedPage(body, f'"{hashlib.sha256(body).hexdigest()[:32]}"', compress(body))
+        with self._lock:
+            return self._pages.setdefault(key, page)
+
+    def response(
+        self, request: Request, template_name: str, context: Optional[Dict] = None,
+        status_code: int = 200, max_age: Optional[int] = None
+    ) -> Response:
+        """HTML response for a cached page: 304, or the best encoding the client takes
+
+        max_age=0 makes clients revalidate every time, for pages served by
+        URLs whose answer can change (a QR code that has since been used).
+        """
+        page = self.get(template_name, context)
+        max_age = self.max_age if max_age is None else max_age
+        encoding = pick_encoding(request.headers.get("accept-encoding", ""), page.encodings)
+        headers = {
+            "ETag": page.etag_for(encoding),
+            "Cache-Control": f"public, max-age={max_age}" if max_age else "no-cache",
+        }
+        if page.encodings:
+            headers["Vary"] = "Accept-Encoding"
+        if (
+            status_code == 200 and request.method in ("GET", "HEAD")
+            and etag_matches(request.headers.get("if-none-match"), headers["ETag"])
+        ):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        body = page.encodings[encoding] if encoding else page.body
+        return Response(body, status_code=status_code, headers=headers, media_type="text/html; charset=utf-8")
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+class StaticAsset(NamedTuple):
+    mtime: float
+    size: int
+    encodings: Dict[str, bytes]
+
+class CompressedStaticFiles(StaticFiles):
+    """StaticFiles with precompressed encodings and cache headers
+
+    precompress() compresses the text-like files; run it at startup, as files
+    it hasn't seen, or that changed since, are served as StaticFiles would.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._assets: Dict[str, StaticAsset] = {}
+
+    def precompress(self) -> int:
+        """Compress every file under the directories; returns how many were looked at"""
+        count = 0
+        for directory in self.all_directories:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    relative = os.path.relpath(os.path.join(root, name), directory)
+                    full_path, stat_result = self.lookup_path(relative)
+                    if stat_result is not None:
+                        self._load(full_path, stat_result)
+                        count += 1
+        return count
+
+    def _load(self, full_path: str, stat_result: os.stat_result) -> StaticAsset:
+        with open(full_path, "rb") as f:
+            content = f.read()
+        compressible = (
+            os.path.splitext(full_path)[1].lower() in COMPRESSIBLE_SUFFIXES
+            and len(content) <= MAX_STATIC_COMPRESS_SIZE
+        )
+        asset = StaticAsset(stat_result.st_mtime, stat_result.st_size, compress(content) if compressible else {})
+        self._assets[full_path] = asset
+        return asset
+
+    def _fresh(self, full_path: str, stat_result: os.stat_result) -> Optional[StaticAsset]:
+        asset = self._assets.get(full_path)
+        if asset is None or (asset.mtime, asset.size) != (stat_result.st_mtime, stat_result.st_size):
+            return None
+        return asset
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        asset = self._fresh(str(full_path), stat_result)
+        request_headers = Headers(scope=scope)
+        encoding = None
+        if asset is not None and status_code == 200 and scope["method"] == "GET":
+            encoding = pick_encoding(request_headers.get("accept-encoding", ""), asset.encodings)
+
+        if encoding is None:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+        else:
+            identity = FileResponse(full_path, status_code=status_code, stat_result=stat_result, method=scope["method"])
+            headers = {name: value for name, value in identity.headers.items() if name != "content-length"}
+            headers["etag"] = encoded_etag(identity.headers["etag"], encoding)
+            headers["content-encoding"] = encoding
+            if self.is_not_modified(Headers(headers), request_headers):
+                response = NotModifiedResponse(Headers(headers))
+            else:
+                response = Response(asset.encodings[encoding], status_code=status_code, headers=headers)
+
+        response.headers["Cache-Control"] = f"public, max-age={STATIC_MAX_AGE}"
+        if asset is not None and asset.encodings:
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        # If-None-Match, when sent, decides on its own (RFC 9110), with weak comparison
+        if "if-none-match" in request_headers:
+            return etag_matches(request_headers["if-none-match"], response_headers["etag"])
+        return super().is_not_modified(response_headers, request_headers)
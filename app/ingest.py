@@ -0,0 +1,121 @@
+from sqlmodel import Session
+from app import crud
+from app.models import engine as default_engine
+from app.schemas import AccessRequestCreate
+from typing import List, Optional, Tuple
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+class SignupIngestor:
+    """Groups public sign-ups into batched inserts
+
+    submit() queues a validated request and waits until the batch holding it
+    is committed, so a response still means the request is stored. The writer
+    flushes once batch_size requests are waiting or flush_interval seconds after
+    the first one arrived; while one batch is being written the next fills up.
+    Duplicates (same normalized email or Instagram handle) are dropped by the
+    insert itself.
+    """
+    def __init__(self, engine=None):
+        self.engine = engine or default_engine
+        self.batch_size = int(os.getenv("SIGNUP_BATCH_SIZE", "200"))
+        self.flush_interval = float(os.getenv("SIGNUP_FLUSH_INTERVAL", "0.02"))
+        # Submitters wait for room once this many requests are queued
+        self.max_queue = int(os.getenv("SIGNUP_MAX_QUEUE", "10000"))
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.inserted = 0
+        self.duplicates = 0
+        self.batches = 0
+
+    def start(self):
+        """Start the writer task"""
+        if self._task is None:
+            self._queue = asyncio.Queue(self.max_queue)
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Write everything already queued, then stop the writer"""
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+
+    async def submit(self, request: AccessRequestCreate) -> Optional[int]:
+        """Store a sign-up; returns its ID, or None if it was a duplicate"""
+        if self._task is None:
+            # Not started (scripts, tests): write it on its own
+            return (await asyncio.to_thread(self._insert, [request]))[0]
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((request, future))
+        return await future
+
+    def stats(self):
+        """Ingestion counters and current queue depth"""
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "batches": self.batches
+        }
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                # Take whatever is already waiting before sleeping on the queue
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch: List[Tuple[AccessRequestCreate, asyncio.Future]]):
+        try:
+            ids = await asyncio.to_thread(self._insert, [request for request, _ in batch])
+        except Exception as e:
+            logger.exception(f"Failed to store {len(batch)} sign-ups")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        for (_, future), request_id in zip(batch, ids):
+            if request_id is None:
+                self.duplicates += 1
+            else:
+                self.inserted += 1
+            if not future.done():
+                future.set_result(request_id)
+
+    def _insert(self, requests: List[AccessRequestCreate]) -> List[Optional[int]]:
+        with Session(self.engine) as session:
+            return crud.insert_access_requests(session, requests)
+
+# Global sign-up ingestor instance
+signup_ingestor = SignupIngestor()
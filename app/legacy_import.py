@@ -0,0 +1,182 @@
+"""
+Import the old Node app's data/database.json
+
+The file is read with a streaming JSON parser (ijson), one record at a time,
+so memory use stays flat however large the dump. Requests are upserted on
+their legacy ID ("req_1753814319510_3win3") and tokens on the token string,
+in batches of --batch-size rows per transaction, so the import can be re-run
+(after an interruption, or against a newer dump) without creating duplicates.
+The admin password and sessions in the file are not imported.
+
+Usage:
+    python -m app.legacy_import [data/database.json] [--batch-size 5000]
+"""
+
+from sqlmodel import Session
+from app import crud
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+import argparse
+import ijson
+import sys
+import time
+
+REQUEST_SECTION = "requests"
+TOKEN_SECTION = "tokens"
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    """Naive UTC datetime from an ISO 8601 string such as "2025-07-29T18:38:39.510Z" """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def request_row(record: Dict) -> Dict:
+    """AccessRequest columns for a record of the "requests" array"""
+    approved_at = parse_time(record.get("approvedAt"))
+    return {
+        "legacy_id": str(record["id"]),
+        "first_name": record["firstName"].strip(),
+        "last_name": record["lastName"].strip(),
+        "email": record["email"].strip(),
+        "instagram": record["instagram"].strip(),
+        "approved": bool(record.get("approved")) or approved_at is not None,
+        "created_at": parse_time(record.get("createdAt")) or datetime.utcnow(),
+        "approved_at": approved_at,
+    }
+
+def token_row(record: Dict) -> Dict:
+    """QRToken columns for a record of the "tokens" array, keyed by legacy request ID"""
+    used_at = parse_time(record.get("usedAt"))
+    return {
+        "token": str(record["token"]),
+        "legacy_request_id": str(record["requestId"]),
+        "used": bool(record.get("used")) or used_at is not None,
+        "used_at": used_at,
+        "created_at": parse_time(record.get("createdAt")) or datetime.utcnow(),
+    }
+
+class MigrationReport:
+    """Counters of an import"""
+    def __init__(self):
+        self.requests = 0
+        self.tokens = 0
+        self.orphaned_tokens = 0
+        self.skipped = 0
+        self.errors: List[str] = []
+        self.seconds = 0.0
+
+    def to_dict(self) -> Dict:
+        records = self.requests + self.tokens + self.orphaned_tokens + self.skipped
+        return {
+            "requests": self.requests,
+            "tokens": self.tokens,
+            "orphaned_tokens": self.orphaned_tokens,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 2),
+            "records_per_second": round(records / self.seconds) if self.seconds else 0
+        }
+
+def iter_records(path: str, section: str) -> Iterator[Dict]:
+    """Records of one top-level array, parsed incrementally"""
+    with open(path, "rb") as file:
+        yield from ijson.items(file, f"{section}.item")
+
+def migrate(
+    engine,
+    path: str,
+    batch_size: int = 5000,
+    progress: Optional[Callable[[str, int, float], None]] = None,
+    max_errors: int = 100,
+    event_id: Optional[int] = None
+) -> MigrationReport:
+    """Upsert every request, then every token, of a database.json dump
+
+    The file is streamed twice, once per array, so tokens can refer to any
+    request whatever the order of the arrays. New requests go to event_id, the
+    current event by default. progress(section, records so far, seconds so
+    far) is called after each batch. Records missing a required field are
+    skipped and reported; tokens whose request isn't in the database are
+    counted as orphaned.
+    """
+    report = MigrationReport()
+    started = time.perf_counter()
+    if event_id is None:
+        with Session(engine) as session:
+            event_id = crud.get_current_event(session).id
+
+    def run(section: str, to_row: Callable[[Dict], Dict], flush: Callable[[Session, List[Dict]], None]):
+        batch: List[Dict] = []
+        seen = 0
+        with Session(engine) as session:
+            for record in iter_records(path, section):
+                seen += 1
+                try:
+                    batch.append(to_row(record))
+                except (KeyError, TypeError, ValueError, AttributeError) as e:
+                    report.skipped += 1
+                    if len(report.errors) < max_errors:
+                        report.errors.append(f"{section}[{seen - 1}]: {type(e).__name__}: {e}")
+                    continue
+                if len(batch) >= batch_size:
+                    flush(session, batch)
+                    batch = []
+                    if progress:
+                        progress(section, seen, time.perf_counter() - started)
+            if batch:
+                flush(session, batch)
+            if progress:
+                progress(section, seen, time.perf_counter() - started)
+
+    def flush_requests(session: Session, rows: List[Dict]):
+        report.requests += crud.upsert_legacy_requests(session, rows, event_id)
+
+    def flush_tokens(session: Session, rows: List[Dict]):
+        written, orphaned = crud.upsert_legacy_tokens(session, rows)
+        report.tokens += written
+        report.orphaned_tokens += orphaned
+
+    run(REQUEST_SECTION, request_row, flush_requests)
+    run(TOKEN_SECTION, token_row, flush_tokens)
+    report.seconds = time.perf_counter() - started
+    return report
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", nargs="?", default="data/database.json")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per transaction")
+    args = parser.parse_args(argv)
+
+    from app.models import create_db_and_tables, engine
+    create_db_and_tables()
+
+    state = {"section": None, "started": 0.0, "seconds": 0.0}
+
+    def progress(section: str, count: int, seconds: float):
+        if section != state["section"]:
+            if state["section"] is not None:
+                print(file=sys.stderr)
+            # A section starts where the previous one ended
+            state["section"], state["started"] = section, state["seconds"]
+        state["seconds"] = seconds
+        elapsed = seconds - state["started"]
+        rate = count / elapsed if elapsed else 0
+        print(f"\r{section}: {count:,} records, {rate:,.0f}/s", end="", file=sys.stderr, flush=True)
+
+    report = migrate(engine, args.file, args.batch_size, progress)
+    print(file=sys.stderr)
+    for error in report.errors:
+        print(f"skipped {error}", file=sys.stderr)
+    summary = report.to_dict()
+    print(
+        f"{summary['requests']:,} requests and {summary['tokens']:,} tokens imported in {summary['seconds']}s"
+        f" ({summary['records_per_second']:,} records/s); {summary['orphaned_tokens']:,} tokens without"
+        f" a request, {summary['skipped']:,} invalid records skipped",
+        file=sys.stderr
+    )
+
+if __name__ == "__main__":
+    main()
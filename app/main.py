@@ -1,35 +1,107 @@
-from fastapi import FastAPI, Request, Form, Depends, HTTPException, status
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import FastAPI, Request, Form, Depends, File, HTTPException, Path, Query, UploadFile, status
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
-from sqlmodel import Session
-from app.models import create_db_and_tables, get_session
-from app.schemas import AccessRequestCreate
-from app import crud
-from app.auth import create_session_token, get_current_user, require_auth
+from sqlmodel import Session, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models import (
+    create_db_and_tables, get_async_session, get_async_read_session, engine, read_engine, async_engine, async_read_engine
+)
+from app.schemas import (
+    AccessRequestCreate, AccessRequestResponse, BulkApproveRequest, BulkApproveResponse, BulkApproveResult,
+    OutboxStatsResponse, ScanResult, OfflineScanBatch, OfflineSyncResponse
+)
+from app import async_crud, crud
+from app.auth import create_session_token, get_current_user, require_auth, require_scanner, session_cache
 from app.email_service import email_service
+from app.email_templates import pick_locale
 from app.qr_service import qr_service
+from app.outbox import outbox_worker
+from app.ingest import signup_ingestor
+from app.prerender import invitation_prerenderer
+from app.events import event_bus
+from app.metrics import MetricsMiddleware, render_metrics
+from app.ratelimit import RateLimitMiddleware, rate_limiter, SIGNUP_EMAIL_LIMIT, LOGIN_USER_LIMIT
+from app.token_index import token_index, redeem, ADMITTED, USED
+from app import scanner
+from app.search import search_requests
+from app import transfer
+from app.archive import event_archive
+from app.http_cache import CompressedStaticFiles, PageCache
+from pydantic import ValidationError
+import asyncio
+import io
 import os
-from typing import Annotated
+from datetime import datetime
+from typing import Annotated, AsyncIterator, Dict, List, Optional
 
 # Create FastAPI app
 app = FastAPI(title="Terrace Party Invites", version="1.0.0")
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Per-IP limits on sign-up, login and QR pages, checked before routing
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+# Added last so it is outermost and also times rejected requests; the dashboard
+# stream stays open, so it would count as in flight forever (and the app never idle)
+app.add_middleware(MetricsMiddleware, skip_paths=("/admin/events",))
+
+# Mount static files, precompressed
+static_files = CompressedStaticFiles(directory="static")
+app.mount("/static", static_files, name="static")
 
 # Templates
 templates = Jinja2Templates(directory="templates")
+# Pages that are the same for every visitor, rendered once
+page_cache = PageCache(templates.env)
+
+async def render_stream(template_name: str, context: Dict, chunk_size: int = 16384) -> AsyncIterator[str]:
+    """Stream a template in chunks of about chunk_size characters
+
+    Jinja yields a piece per template node; handing those to StreamingResponse
+    one by one costs a threadpool hop each. The data is already loaded, so
+    rendering on the event loop and flushing a few large chunks is cheaper.
+    """
+    buffer: List[str] = []
+    size = 0
+    for piece in templates.get_template(template_name).generate(context):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
 
 # Create database tables on startup
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     create_db_and_tables()
+    static_files.precompress()
+    with Session(engine) as session:
+        current_event = crud.get_current_event(session)
+        crud.backfill_event_ids(session, current_event.id)
+        crud.backfill_signup_keys(session)
+        token_index.load(session)
+        event_bus.start(crud.count_requests(session, current_event.id), current_event.id)
+    outbox_worker.start()
+    signup_ingestor.start()
+    invitation_prerenderer.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await event_bus.stop()
+    await invitation_prerenderer.stop()
+    await signup_ingestor.stop()
+    await outbox_worker.stop()
+    qr_service.shutdown()
+    await email_service.close()
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+    event_archive.close()
+    async_crud.shutdown()
 
 @app.get("/", response_class=HTMLResponse)
 async def request_access_page(request: Request):
     """Public page to request access"""
-    return templates.TemplateResponse("request_access.html", {"request": request})
+    return page_cache.response(request, "request_access.html")
 
 @app.post("/request-access")
 async def submit_access_request(
@@ -37,8 +109,7 @@ async def submit_access_request(
     first_name: Annotated[str, Form()],
     last_name: Annotated[str, Form()],
     email: Annotated[str, Form()],
-    instagram: Annotated[str, Form()],
-    session: Session = Depends(get_session)
+    instagram: Annotated[str, Form()]
 ):
     """Submit access request"""
     try:
@@ -46,27 +117,36 @@ async def submit_access_request(
             first_name=first_name,
             last_name=last_name,
             email=email,
-            instagram=instagram
+            instagram=instagram,
+            # Invitations go out in the browser's language when we have it
+            locale=pick_locale(request.headers.get("accept-language"), email_service.templates.locales)
         )
         
-        crud.create_access_request(session, access_request)
+        if await rate_limiter.hit(f"signup-email:{crud.normalize_email(email)}", SIGNUP_EMAIL_LIMIT):
+            return page_cache.response(
+                request,
+                "request_access.html",
+                {"error": True, "message": "Too many requests for this email. Please try again later."},
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                max_age=0
+            )
         
-        return templates.TemplateResponse(
-            "request_access.html", 
-            {
-                "request": request, 
-                "success": True,
-                "message": "Your request has been submitted! You'll receive an email if approved."
-            }
+        # Batched with other sign-ups; duplicates get the same answer so the
+        # form doesn't reveal who has already signed up
+        await signup_ingestor.submit(access_request)
+        
+        return page_cache.response(
+            request,
+            "request_access.html",
+            {"success": True, "message": "Your request has been submitted! You'll receive an email if approved."},
+            max_age=0
         )
     except Exception as e:
-        return templates.TemplateResponse(
-            "request_access.html", 
-            {
-                "request": request, 
-                "error": True,
-                "message": "Something went wrong. Please try again."
-            }
+        return page_cache.response(
+            request,
+            "request_access.html",
+            {"error": True, "message": "Something went wrong. Please try again."},
+            max_age=0
         )
 
 @app.get("/admin/login", response_class=HTMLResponse)
@@ -79,10 +159,17 @@ async def admin_login(
     request: Request,
     username: Annotated[str, Form()],
     password: Annotated[str, Form()],
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Admin login"""
-    user = crud.authenticate_user(session, username, password)
+    # Per account as well as per IP, so spreading guesses over addresses doesn't help
+    if await rate_limiter.hit(f"login-user:{username.lower()}", LOGIN_USER_LIMIT):
+        return templates.TemplateResponse(
+            "admin_login.html",
+            {"request": request, "error": "Too many attempts, please try again later"},
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS
+        )
+    user = await async_crud.authenticate_user(session, username, password)
     if not user:
         return templates.TemplateResponse(
             "admin_login.html", 
@@ -106,68 +193,272 @@ async def admin_login(
 @app.get("/admin", response_class=HTMLResponse)
 async def admin_panel(
     request: Request,
-    session: Session = Depends(get_session)
+    status_filter: Annotated[Optional[str], Query(alias="status", pattern="^(pending|approved|used)?$")] = None,
+    q: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+    event_id: Annotated[Optional[int], Query(alias="event")] = None,
+    session: AsyncSession = Depends(get_async_read_session)
 ):
     """Admin panel - requires authentication"""
     username = require_auth(request)
+
+    # The current event unless another one is picked; archived ones are read from their file
+    events = await async_crud.list_events(session)
+    current_event = next((event for event in events if event.status == "open"), None)
+    event = next((event for event in events if event.id == event_id), None) if event_id else current_event
+    if event_id and event is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    archived = event is not None and event.status == "archived"
     
-    # Get all requests
-    requests = crud.get_all_requests(session)
+    # One page of requests with check-in status, plus the totals
+    if archived:
+        rows, next_cursor = await asyncio.to_thread(
+            event_archive.run, event, crud.list_requests, status_filter, q, cursor, limit, event.id
+        )
+        counts = await asyncio.to_thread(event_archive.run, event, crud.count_requests, event.id)
+    else:
+        scope = event.id if event else None
+        rows, next_cursor = await async_crud.list_requests(session, status_filter, q, cursor, limit, scope)
+        counts = await async_crud.count_requests(session, scope)
+    outbox = await async_crud.get_outbox_stats(session)
     
-    return templates.TemplateResponse(
-        "admin_panel.html", 
-        {
-            "request": request, 
-            "requests": requests,
-            "username": username
-        }
+    # Stream the page out as Jinja renders it instead of buffering the whole document
+    context = {
+        "request": request, 
+        "rows": rows,
+        "counts": counts,
+        "outbox": outbox,
+        "status": status_filter,
+        "q": q or "",
+        "limit": limit,
+        "cursor": cursor,
+        "next_cursor": next_cursor,
+        "events": events,
+        "event": event,
+        "archived": archived,
+        # Live updates follow the current event's counters
+        "live": event is not None and event is current_event,
+        "username": username
+    }
+    return StreamingResponse(render_stream("admin_panel.html", context), media_type="text/html")
+
+@app.get("/admin/events")
+async def admin_events(request: Request):
+    """Live sign-ups, approvals, check-ins and counters as server-sent events"""
+    require_auth(request)
+    return StreamingResponse(
+        event_bus.stream(),
+        media_type="text/event-stream",
+        # No caching, and no buffering in nginx, or events arrive in lumps
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
+@app.post("/admin/events/new")
+async def create_event(
+    request: Request,
+    name: Annotated[str, Form(min_length=1, max_length=120)],
+    starts_at: Annotated[Optional[datetime], Form()] = None,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Open a new event; sign-ups go to it from now on"""
+    require_auth(request)
+    await async_crud.create_event(session, name, starts_at)
+    # The live counters follow the new event
+    await event_bus.resync()
+    return RedirectResponse(url="/admin", status_code=status.HTTP_302_FOUND)
+
+@app.post("/admin/events/{event_id}/archive")
+async def archive_event(
+    event_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Move a finished event's guests and tokens to its archive file"""
+    require_auth(request)
+
+    event = await async_crud.get_event(session, event_id)
+    if not event or event.status != "open":
+        raise HTTPException(status_code=404, detail="No open event with that ID")
+    if event.id == (await async_crud.get_current_event(session)).id:
+        raise HTTPException(status_code=409, detail="Open the next event before archiving the current one")
+
+    if await asyncio.to_thread(event_archive.archive, engine, event_id, read_engine=read_engine) is None:
+        raise HTTPException(status_code=404, detail="No open event with that ID")
+    # Forget the archived tokens; scanning one now finds nothing
+    await async_crud.run_sync(session, token_index.load)
+
+    return RedirectResponse(url=f"/admin?event={event_id}", status_code=status.HTTP_302_FOUND)
+
+@app.get("/admin/export/{kind}")
+async def export_guests(
+    kind: Annotated[str, Path(pattern="^(guests|redemptions)$")],
+    request: Request,
+    export_format: Annotated[str, Query(alias="format", pattern="^(csv|jsonl)$")] = "csv",
+    event_id: Annotated[Optional[int], Query(alias="event")] = None,
+    session: AsyncSession = Depends(get_async_read_session)
+):
+    """Download the guest list or the redemption log as CSV or JSON Lines
+
+    Every open event's by default, or one event's, archived or not.
+    """
+    require_auth(request)
+    source = read_engine
+    if event_id is not None:
+        event = await async_crud.get_event(session, event_id)
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+        if event.status == "archived":
+            source = event_archive.engine_for(event)
+    filename = f"{kind}-{datetime.utcnow():%Y%m%d-%H%M%S}.{export_format}"
+    return StreamingResponse(
+        transfer.stream_export(source, kind, export_format, event_id=event_id),
+        media_type=transfer.FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.post("/admin/import")
+async def import_guests(
+    request: Request,
+    file: UploadFile = File(...),
+    import_format: Annotated[Optional[str], Query(alias="format", pattern="^(csv|jsonl)$")] = None
+):
+    """Add access requests from a partner's CSV or JSON Lines file"""
+    require_auth(request)
+    fmt = import_format or transfer.format_from_name(file.filename)
+    # The upload is spooled to disk; read it as text without loading it whole
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report = await asyncio.to_thread(transfer.import_guests, engine, text, fmt)
+    finally:
+        text.detach()
+    return report.to_dict()
+
+@app.get("/admin/search", response_model=List[AccessRequestResponse])
+async def search_guests(
+    request: Request,
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    event_id: Annotated[Optional[int], Query(alias="event")] = None,
+    session: AsyncSession = Depends(get_async_read_session)
+):
+    """Search requests by partial, accent-insensitive name, email or Instagram handle
+
+    In the current event unless another one is picked, like the admin panel.
+    """
+    require_auth(request)
+    if event_id is None:
+        event_id = (await async_crud.get_current_event(session)).id
+    return await async_crud.run_sync(session, search_requests, q, limit, event_id)
+
 @app.post("/admin/approve/{request_id}")
 async def approve_request(
     request_id: int,
     request: Request,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Approve access request and send invitation email"""
+    """Approve access request and queue the invitation email"""
     require_auth(request)
     
-    # Approve request and generate QR token
-    approved_request = crud.approve_request(session, request_id)
+    # Approve request, generate QR token and queue the invitation
+    approved_request = await async_crud.approve_request(
+        session, request_id, invitation_prerenderer.claim_token(request_id)
+    )
     if not approved_request:
         raise HTTPException(status_code=404, detail="Request not found")
+    await async_crud.run_sync(session, token_index.refresh)
+    outbox_worker.wake()
     
-    # Get QR token
-    qr_token = crud.get_qr_token(session, approved_request.id)  # This needs to be fixed
-    
-    # Actually, let's get the QR token properly
-    from sqlmodel import select
-    from app.models import QRToken
-    statement = select(QRToken).where(QRToken.request_id == approved_request.id)
-    qr_token = session.exec(statement).first()
-    
-    if qr_token:
-        # Generate QR code
-        qr_code_bytes = qr_service.generate_qr_code(qr_token.token)
-        
-        # Create fallback URL
-        base_url = os.getenv("BASE_URL", "http://localhost:8000")
-        fallback_url = f"{base_url}/q/{qr_token.token}"
-        
-        # Send invitation email
-        guest_name = f"{approved_request.first_name} {approved_request.last_name}"
-        await email_service.send_invitation_email(
-            approved_request.email,
-            guest_name,
-            qr_code_bytes,
-            fallback_url
-        )
-    
     return RedirectResponse(url="/admin", status_code=status.HTTP_302_FOUND)
 
+@app.post("/admin/approve-bulk", response_model=BulkApproveResponse)
+async def approve_requests_bulk(
+    payload: BulkApproveRequest,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Approve several access requests at once and queue their invitations"""
+    require_auth(request)
+
+    # Approve everything in a single transaction; the outbox worker renders and sends
+    approved = await async_crud.approve_requests(
+        session, payload.request_ids, invitation_prerenderer.claim_tokens(payload.request_ids)
+    )
+    found = {access_request.id: qr_token for access_request, qr_token in approved}
+    newly_approved = sum(1 for qr_token in found.values() if qr_token)
+    if newly_approved:
+        await async_crud.run_sync(session, token_index.refresh)
+        outbox_worker.wake()
+
+    results = []
+    for request_id in dict.fromkeys(payload.request_ids):
+        if request_id not in found:
+            results.append(BulkApproveResult(request_id=request_id, status="not_found"))
+        elif found[request_id] is None:
+            results.append(BulkApproveResult(request_id=request_id, status="already_approved"))
+        else:
+            results.append(BulkApproveResult(request_id=request_id, status="approved", email_queued=True))
+
+    return BulkApproveResponse(approved=newly_approved, results=results)
+
+@app.post("/admin/resend/{request_id}")
+async def resend_invitation(
+    request_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Queue an approved guest's invitation email again"""
+    require_auth(request)
+
+    if not await async_crud.resend_invitation(session, request_id):
+        raise HTTPException(status_code=404, detail="No approved request with that ID")
+    outbox_worker.wake()
+
+    return RedirectResponse(url="/admin", status_code=status.HTTP_302_FOUND)
+
+@app.get("/admin/outbox", response_model=OutboxStatsResponse)
+async def outbox_stats(
+    request: Request,
+    session: AsyncSession = Depends(get_async_read_session)
+):
+    """Email outbox queue depth, send latency and recent dead letters"""
+    require_auth(request)
+    return await async_crud.get_outbox_stats(session)
+
+@app.post("/admin/outbox/{entry_id}/retry")
+async def retry_outbox_entry(
+    entry_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Move a dead-lettered invitation back to the queue"""
+    require_auth(request)
+
+    entry = await async_crud.retry_outbox_message(session, entry_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="No dead-lettered message with that ID")
+    outbox_worker.wake()
+
+    return RedirectResponse(url="/admin", status_code=status.HTTP_302_FOUND)
+
+@app.get("/admin/qr-cache")
+async def qr_cache_stats(request: Request):
+    """QR code cache hit, miss and eviction counters"""
+    require_auth(request)
+    return qr_service.cache.stats()
+
+@app.get("/admin/prerender")
+async def prerender_stats(request: Request):
+    """Invitations prepared ahead of approval"""
+    require_auth(request)
+    return invitation_prerenderer.stats()
+
 @app.get("/admin/logout")
-async def admin_logout():
+async def admin_logout(request: Request):
     """Admin logout"""
+    session_token = request.cookies.get("session")
+    if session_token:
+        session_cache.revoke(session_token)
     response = RedirectResponse(url="/admin/login", status_code=status.HTTP_302_FOUND)
     response.delete_cookie("session")
     return response
@@ -176,43 +467,126 @@ async def admin_logout():
 async def validate_qr_token(
     token: str,
     request: Request,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Validate QR token - one-time use"""
-    qr_token = crud.get_qr_token(session, token)
+    outcome, guest = await async_crud.run_sync(session, redeem, token)
     
-    if not qr_token:
-        return templates.TemplateResponse(
-            "invalid_qr.html", 
-            {"request": request, "message": "Invalid QR code"}
-        )
+    # The same URL can be admitted, then used: revalidated on every visit
+    if outcome == USED:
+        return page_cache.response(request, "invalid_qr.html", {"message": "QR code already used"}, max_age=0)
     
-    if qr_token.used:
-        return templates.TemplateResponse(
-            "invalid_qr.html", 
-            {"request": request, "message": "QR code already used"}
-        )
-    
-    # Mark as used
-    crud.use_qr_token(session, token)
-    
-    # Get guest info
-    guest_request = crud.get_request_by_id(session, qr_token.request_id)
-    guest_name = f"{guest_request.first_name} {guest_request.last_name}"
+    if outcome != ADMITTED:
+        return page_cache.response(request, "invalid_qr.html", {"message": "Invalid QR code"}, max_age=0)
     
     return templates.TemplateResponse(
         "approved.html", 
         {
             "request": request, 
-            "guest_name": guest_name,
-            "instagram": guest_request.instagram
+            "guest_name": f"{guest.first_name} {guest.last_name}",
+            "instagram": guest.instagram
         }
     )
 
+@app.post("/api/scan/redeem/{token}", response_model=ScanResult)
+async def scan_token(
+    token: str,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Redeem a QR token for a door scanner; JSON or msgpack, no HTML"""
+    require_scanner(request)
+
+    outcome, guest = await async_crud.run_sync(session, redeem, token)
+    if outcome == ADMITTED:
+        result = ScanResult(
+            status="admitted",
+            guest_name=f"{guest.first_name} {guest.last_name}",
+            instagram=guest.instagram,
+            used_at=guest.used_at
+        )
+    else:
+        result = ScanResult(status="used" if outcome == USED else "invalid")
+
+    return scanner.scanner_response(request, result.model_dump(exclude_none=True))
+
+@app.get("/api/scan/snapshot")
+async def scan_snapshot(request: Request):
+    """Stream the token to guest list so scanners can keep working offline"""
+    require_scanner(request)
+
+    as_msgpack = scanner.wants_msgpack(request)
+    return StreamingResponse(
+        scanner.iter_snapshot(as_msgpack),
+        media_type=scanner.MSGPACK_TYPES[0] if as_msgpack else "application/x-ndjson"
+    )
+
+@app.post("/api/scan/sync", response_model=OfflineSyncResponse)
+async def sync_offline_scans(
+    request: Request,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Reconcile scans a device made while offline; the earliest scan of a token wins"""
+    require_scanner(request)
+
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith(scanner.MSGPACK_TYPES) and scanner.msgpack:
+            batch = OfflineScanBatch.model_validate(scanner.msgpack.unpackb(body))
+        else:
+            batch = OfflineScanBatch.model_validate_json(body)
+    except (ValidationError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    results = await async_crud.reconcile_offline_scans(session, [(scan.token, scan.scanned_at) for scan in batch.scans])
+    for result in results:
+        if result["status"] == "admitted":
+            token_index.mark_used(result["token"])
+
+    response = OfflineSyncResponse(
+        admitted=sum(1 for result in results if result["status"] == "admitted"),
+        duplicates=sum(1 for result in results if result["status"] == "duplicate"),
+        results=results
+    )
+    return scanner.scanner_response(request, response.model_dump(exclude_none=True))
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+async def check_database() -> Optional[str]:
+    """None if the database answers a trivial query, otherwise the error"""
+    try:
+        async with async_read_engine.connect() as connection:
+            await asyncio.wait_for(connection.execute(text("SELECT 1")), 5)
+        return None
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy"}
+    """Health check endpoint
+
+    Unhealthy (503) without the database; without SMTP only degraded, since the
+    outbox keeps invitations until the server is back.
+    """
+    database_error, smtp_error = await asyncio.gather(check_database(), email_service.check_ready())
+    if database_error:
+        health_status = "unhealthy"
+    elif smtp_error:
+        health_status = "degraded"
+    else:
+        health_status = "healthy"
+    return JSONResponse(
+        {
+            "status": health_status,
+            "database": database_error or "ok",
+            "smtp": smtp_error or "ok"
+        },
+        status_code=503 if database_error else 200
+    )
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,135 @@
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Gauge, Histogram, REGISTRY, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from typing import Dict, Tuple
+import os
+import time
+
+# Metrics are module globals so instrumented code does a plain attribute lookup.
+# Labelled children are bound once, here or on first use, so recording a sample
+# never resolves labels.
+
+# The histogram's _count doubles as the response counter per status
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to serve an HTTP request", ["method", "route", "status"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+# Read from MetricsMiddleware at scrape time rather than locked on every request
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being served")
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Time to execute a database statement",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+)
+
+QR_RENDER_SECONDS = Histogram(
+    "qr_render_duration_seconds", "Time to render a QR code image that wasn't cached",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+
+_smtp_send = Histogram(
+    "smtp_send_duration_seconds", "Time to hand an email to the SMTP server", ["outcome"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+SMTP_SENT = _smtp_send.labels("sent")
+SMTP_FAILED = _smtp_send.labels("failed")
+
+_password_hash = Histogram(
+    "password_hash_duration_seconds", "Time spent in bcrypt", ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 1, 2)
+)
+PASSWORD_VERIFY = _password_hash.labels("verify")
+PASSWORD_HASH = _password_hash.labels("hash")
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    DB_QUERY_SECONDS.observe(time.perf_counter() - context._metrics_started)
+
+class _RouteMetrics:
+    """Latency histograms for one route and method, one per status code"""
+    __slots__ = ("method", "route", "by_status")
+
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.by_status: Dict[int, Histogram] = {}
+
+    def record(self, status_code: int, seconds: float):
+        histogram = self.by_status.get(status_code)
+        if histogram is None:
+            histogram = self.by_status[status_code] = HTTP_LATENCY.labels(self.method, self.route, str(status_code))
+        histogram.observe(seconds)
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and in-flight requests
+
+    Requests are labelled by route template ("/q/{token}", not the token), found
+    from the endpoint the router matched. Requests no route matched, including
+    those rejected by middleware further in, share the route "other". Paths in
+    skip_paths (long-lived streams) are neither timed nor counted in flight.
+    """
+    # Requests in flight in this process, across instances
+    in_progress = 0
+
+    def __init__(self, app, skip_paths: Tuple[str, ...] = ()):
+        self.app = app
+        self.skip_paths = frozenset(skip_paths)
+        self._routes: Dict[Tuple[object, str], _RouteMetrics] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        MetricsMiddleware.in_progress += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            MetricsMiddleware.in_progress -= 1
+            self._route_metrics(scope).record(status_code, elapsed)
+
+    def _route_metrics(self, scope) -> _RouteMetrics:
+        key = (scope.get("endpoint"), scope["method"])
+        metrics = self._routes.get(key)
+        if metrics is None:
+            metrics = self._routes[key] = _RouteMetrics(scope["method"], route_template(scope))
+        return metrics
+
+HTTP_IN_PROGRESS.set_function(lambda: MetricsMiddleware.in_progress)
+
+def route_template(scope) -> str:
+    """Path template of the route that handled a request, or "other" """
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is not None and app is not None:
+        for route in app.routes:
+            # Mounts (static files) record their app as the endpoint
+            if getattr(route, "endpoint", None) is endpoint or getattr(route, "app", None) is endpoint:
+                return route.path
+    return "other"
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposition body and content type for /metrics
+
+    With PROMETHEUS_MULTIPROC_DIR set (several uvicorn workers), samples from
+    every worker are merged.
+    """
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,22 @@
+"""Bring a database created before migrations existed up to the models
+
+Such databases were made by create_all, with new columns and indexes added on
+startup; this does the same one last time: creates missing tables, adds
+missing (nullable) columns and creates missing indexes.
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn, CreateIndex
+from sqlmodel import SQLModel
+
+def upgrade(connection):
+    SQLModel.metadata.create_all(connection)
+    inspector = inspect(connection)
+    for table in SQLModel.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}"))
+        for index in table.indexes:
+            connection.execute(CreateIndex(index, if_not_exists=True))
@@ -0,0 +1,18 @@
+"""Drop the admin list and dedupe indexes replaced by per-event ones
+
+The dedupe keys were unique across all events, which would stop a guest from
+signing up for the next party.
+"""
+
+from sqlalchemy import text
+
+OBSOLETE_INDEXES = [
+    "ix_accessrequest_created_at_id",
+    "ix_accessrequest_approved_created_at_id",
+    "ux_accessrequest_email_key",
+    "ux_accessrequest_instagram_key",
+]
+
+def upgrade(connection):
+    for name in OBSOLETE_INDEXES:
+        connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
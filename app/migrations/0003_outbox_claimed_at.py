@@ -0,0 +1,15 @@
+"""Add emailoutbox.claimed_at, the lease on a claimed message
+
+Messages claimed before this have none, and are requeued by the next worker
+to start, as they always were.
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from app.models import EmailOutbox
+
+def upgrade(connection):
+    existing = {column["name"] for column in inspect(connection).get_columns("emailoutbox")}
+    if "claimed_at" not in existing:
+        column_ddl = CreateColumn(EmailOutbox.__table__.c.claimed_at).compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE emailoutbox ADD COLUMN {column_ddl}"))
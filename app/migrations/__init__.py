@@ -0,0 +1,64 @@
+"""
+Versioned schema migrations
+
+Each module here named NNNN_description.py has an upgrade(connection) function.
+run_migrations applies the ones a database hasn't had yet, in order, in one
+transaction, and records them in schema_migrations. A new database is instead
+created from the models and every migration marked as applied (alembic's
+"create_all, then stamp"), so migrations only ever upgrade existing databases.
+
+Workers starting together don't race: on PostgreSQL the run holds an advisory
+lock, on SQLite the write lock. With several nodes, run it once before
+starting them:
+
+    python -m app.migrations
+"""
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text
+from datetime import datetime
+from types import ModuleType
+from typing import List, Tuple
+import importlib
+import pkgutil
+
+_history = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _history,
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime, nullable=False)
+)
+
+# Key of the PostgreSQL advisory lock held while migrating
+LOCK_KEY = 710420250
+
+def available() -> List[Tuple[str, ModuleType]]:
+    """(version, module) of every migration, oldest first"""
+    names = sorted(name for _, name, _ in pkgutil.iter_modules(__path__) if name[:4].isdigit())
+    return [(name, importlib.import_module(f"{__name__}.{name}")) for name in names]
+
+def run_migrations(engine) -> List[str]:
+    """Create or upgrade the database's schema; returns the versions applied"""
+    from sqlmodel import SQLModel
+    import app.models  # noqa: F401 (registers the tables)
+
+    migrations = available()
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+        fresh = not inspect(connection).has_table("accessrequest")
+        schema_migrations.create(connection, checkfirst=True)
+        applied = set(connection.execute(select(schema_migrations.c.version)).scalars())
+        pending = [(version, module) for version, module in migrations if version not in applied]
+
+        if fresh:
+            SQLModel.metadata.create_all(connection)
+        else:
+            for _, module in pending:
+                module.upgrade(connection)
+        if pending:
+            now = datetime.utcnow()
+            connection.execute(
+                schema_migrations.insert(), [{"version": version, "applied_at": now} for version, _ in pending]
+            )
+    return [version for version, _ in pending]
@@ -0,0 +1,6 @@
+from app.migrations import run_migrations
+from app.models import engine
+import sys
+
+applied = run_migrations(engine)
+print(f"applied {', '.join(applied)}" if applied else "schema is up to date", file=sys.stderr)
@@ -1,4 +1,9 @@
-from sqlmodel import SQLModel, Field, create_engine, Session
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index, event, func, text
+from app.database import (
+    DATABASE_URL, engine, read_engine, async_engine, async_read_engine,
+    get_session, get_read_session, get_async_session, get_async_read_session
+)
 from typing import Optional
 from datetime import datetime
 import os
@@ -10,35 +15,135 @@ class User(SQLModel, table=True):
     hashed_password: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class Event(SQLModel, table=True):
+    """A party; access requests and QR tokens belong to one"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    slug: str = Field(unique=True, index=True)
+    name: str
+    starts_at: Optional[datetime] = None
+    # "open", or "archived" once its guests have moved to archive_path
+    status: str = Field(default="open", index=True)
+    archive_path: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    archived_at: Optional[datetime] = None
+
 class AccessRequest(SQLModel, table=True):
     """Guest access request model"""
+    __table_args__ = (
+        # Keyset pagination of one event's admin list, optionally filtered by status
+        Index("ix_accessrequest_event_created_at_id", "event_id", "created_at", "id"),
+        Index("ix_accessrequest_event_approved_created_at_id", "event_id", "approved", "created_at", "id"),
+        # One request per person and event; NULL keys (rows that predate them,
+        # or lost a dedupe during backfill) don't conflict
+        Index("ux_accessrequest_event_email_key", "event_id", "email_key", unique=True),
+        Index("ux_accessrequest_event_instagram_key", "event_id", "instagram_key", unique=True),
+        # Re-running the legacy import updates rows instead of duplicating them
+        Index("ux_accessrequest_legacy_id", "legacy_id", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
+    # None only for rows written before events existed, until backfill_event_ids
+    event_id: Optional[int] = Field(default=None, foreign_key="event.id")
     first_name: str
     last_name: str
     email: str = Field(index=True)
     instagram: str
+    # Normalized email and Instagram handle used to reject duplicate sign-ups
+    email_key: Optional[str] = None
+    instagram_key: Optional[str] = None
+    # Language for the invitation email ("it"); None uses the default
+    locale: Optional[str] = None
     approved: bool = Field(default=False)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     approved_at: Optional[datetime] = None
+    # ID in the old Node app's data/database.json ("req_1753814319510_3win3")
+    legacy_id: Optional[str] = None
 
 class QRToken(SQLModel, table=True):
     """QR code token model"""
+    __table_args__ = (
+        # Check-in counts of one event
+        Index("ix_qrtoken_event_used_request_id", "event_id", "used", "request_id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     token: str = Field(unique=True, index=True)
-    request_id: int = Field(foreign_key="accessrequest.id")
+    request_id: int = Field(foreign_key="accessrequest.id", index=True)
+    # Copied from the request so per-event counts don't need a join
+    event_id: Optional[int] = Field(default=None, foreign_key="event.id")
     used: bool = Field(default=False)
     used_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
-# Database setup
-DATABASE_URL = "sqlite:///./terrace_party.db"
-engine = create_engine(DATABASE_URL, echo=False)
+class EmailOutbox(SQLModel, table=True):
+    """Queued invitation email model"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    request_id: int = Field(foreign_key="accessrequest.id", index=True)
+    token: str
+    to_email: str
+    guest_name: str
+    locale: Optional[str] = None
+    status: str = Field(default="pending", index=True)  # pending, sending, sent or dead
+    attempts: int = Field(default=0)
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    # When a worker took the message; a `sending` row past its lease is requeued
+    claimed_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = None
 
-def create_db_and_tables():
-    """Create database and tables"""
-    SQLModel.metadata.create_all(engine)
+# Case-insensitive prefix search on the admin list
+Index("ix_accessrequest_email_lower", func.lower(AccessRequest.email))
+Index("ix_accessrequest_instagram_lower", func.lower(AccessRequest.instagram))
+
+# Full-text search over guest names, emails and handles (SQLite FTS5). The index
+# is an external-content table over accessrequest, kept in sync by triggers so
+# every writer (the app, scripts, manual SQL) updates it. remove_diacritics folds
+# accents ("Nicolò" matches "nicolo") and the prefix option indexes 2- and
+# 3-character prefixes so short search-as-you-type queries stay cheap.
+SEARCH_TABLE = "accessrequest_fts"
+
+SEARCH_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        first_name, last_name, email, instagram,
+        content='accessrequest', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS accessrequest_fts_insert AFTER INSERT ON accessrequest BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, first_name, last_name, email, instagram)
+        VALUES (new.id, new.first_name, new.last_name, new.email, new.instagram);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS accessrequest_fts_delete AFTER DELETE ON accessrequest BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, first_name, last_name, email, instagram)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.instagram);
+    END""",
+    # Only fires when a searchable column changes, so approvals don't touch the index
+    f"""CREATE TRIGGER IF NOT EXISTS accessrequest_fts_update
+    AFTER UPDATE OF first_name, last_name, email, instagram ON accessrequest BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, first_name, last_name, email, instagram)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.instagram);
+        INSERT INTO {SEARCH_TABLE}(rowid, first_name, last_name, email, instagram)
+        VALUES (new.id, new.first_name, new.last_name, new.email, new.instagram);
+    END""",
+]
 
-def get_session():
-    """Get database session"""
-    with Session(engine) as session:
-        yield session
+@event.listens_for(SQLModel.metadata, "after_create")
+def create_search_index(target, connection, **kw):
+    """Create the FTS index and its triggers after create_all (SQLite only)"""
+    if connection.dialect.name != "sqlite":
+        return
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": SEARCH_TABLE}
+    ).first()
+    for statement in SEARCH_DDL:
+        connection.execute(text(statement))
+    if not exists:
+        # Index rows written before the search table existed
+        connection.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"))
+
+# Database setup
+def create_db_and_tables():
+    """Create the database, or upgrade its schema (see app.migrations)"""
+    from app.migrations import run_migrations
+    run_migrations(engine)
@@ -0,0 +1,174 @@
+from sqlmodel import Session
+from app import crud
+from app.email_service import OutgoingEmail, email_service as default_email_service
+from app.models import EmailOutbox, engine as default_engine
+from app.qr_service import qr_service as default_qr_service
+from app.prerender import invitation_prerenderer as default_prerenderer
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import os
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+class DomainRateLimiter:
+    """Spaces out sends to the same recipient domain
+
+    Each domain gets the next free slot `1 / rate` seconds after the previous one,
+    so bursts to e.g. gmail.com are smoothed instead of tripping provider throttling.
+    """
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+
+    async def wait(self, email: str):
+        """Sleep until the recipient's domain may receive another message"""
+        if not self.interval:
+            return
+        domain = email.rsplit("@", 1)[-1].lower()
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(domain, now))
+        self._next_slot[domain] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+class OutboxWorker:
+    """Background task that drains the email outbox
+
+    Claimed messages get their QR codes rendered in one batch and are sent with
+    bounded concurrency. Failures are retried with exponential backoff and
+    dead-lettered after `max_attempts`.
+    """
+    def __init__(self, engine=None, email_service=None, qr_service=None, prerenderer=None):
+        self.engine = engine or default_engine
+        self.email_service = email_service or default_email_service
+        self.qr_service = qr_service or default_qr_service
+        self.prerenderer = prerenderer or default_prerenderer
+        self.concurrency = int(os.getenv("OUTBOX_CONCURRENCY", "8"))
+        self.batch_size = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+        self.poll_interval = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+        self.max_attempts = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+        self.backoff_base = float(os.getenv("OUTBOX_BACKOFF_BASE", "30"))
+        self.backoff_max = float(os.getenv("OUTBOX_BACKOFF_MAX", "3600"))
+        # A claimed message not sent or failed within this long is requeued;
+        # keep it well above the time a batch takes to send
+        self.lease = timedelta(seconds=float(os.getenv("OUTBOX_LEASE", "600")))
+        self.domain_limiter = DomainRateLimiter(float(os.getenv("OUTBOX_DOMAIN_RATE", "5")))
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self):
+        """Start draining the outbox in the background"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop the background task, leaving unsent messages queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """Tell the worker new messages were queued"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def recover(self) -> int:
+        """Requeue messages whose worker's lease ran out (it crashed or was stopped)"""
+        recovered = await asyncio.to_thread(self._with_session, crud.reset_stale_outbox, self.lease)
+        if recovered:
+            logger.info(f"Requeued {recovered} outbox messages left in flight")
+        return recovered
+
+    async def run(self):
+        # Checked again every lease, for workers on other nodes that died
+        next_recovery = 0.0
+        while True:
+            try:
+                if time.monotonic() >= next_recovery:
+                    next_recovery = time.monotonic() + self.lease.total_seconds()
+                    await self.recover()
+                processed = await self.drain_once()
+            except Exception:
+                logger.exception("Outbox drain failed")
+                processed = 0
+
+            if not processed:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def drain_once(self) -> int:
+        """Claim and send one batch of due messages; returns how many were claimed"""
+        entries = await asyncio.to_thread(self._with_session, crud.claim_outbox_batch, self.batch_size)
+        if not entries:
+            return 0
+
+        # Invitations prepared ahead of approval skip rendering; the rest render in one batch
+        messages = [self.prerenderer.take_message(entry.token) for entry in entries]
+        to_render = [entry for entry, message in zip(entries, messages) if message is None]
+        qr_codes = dict(zip(
+            [entry.token for entry in to_render],
+            await self.qr_service.generate_qr_codes([entry.token for entry in to_render])
+        ))
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(entry: EmailOutbox, message: Optional[OutgoingEmail]) -> Optional[str]:
+            await self.domain_limiter.wait(entry.to_email)
+            async with semaphore:
+                try:
+                    if message is not None:
+                        await self.email_service.deliver_message(message)
+                    else:
+                        await self.email_service.deliver_invitation_email(
+                            entry.to_email,
+                            entry.guest_name,
+                            qr_codes[entry.token],
+                            self.qr_service.build_url(entry.token),
+                            entry.locale
+                        )
+                    return None
+                except Exception as e:
+                    return str(e) or e.__class__.__name__
+
+        errors = await asyncio.gather(*(send(entry, message) for entry, message in zip(entries, messages)))
+        await asyncio.to_thread(self._record_results, entries, errors)
+        return len(entries)
+
+    def _record_results(self, entries: List[EmailOutbox], errors: List[Optional[str]]):
+        with Session(self.engine) as session:
+            crud.mark_outbox_sent(session, [entry.id for entry, error in zip(entries, errors) if error is None])
+            for entry, error in zip(entries, errors):
+                if error is None:
+                    continue
+                retry_at = self._retry_at(entry.attempts)
+                if retry_at is None:
+                    logger.error(f"Giving up on invitation to {entry.to_email}: {error}")
+                else:
+                    logger.warning(f"Invitation to {entry.to_email} failed (attempt {entry.attempts}): {error}")
+                crud.mark_outbox_failed(session, entry.id, error, retry_at)
+
+    def _retry_at(self, attempts: int) -> Optional[datetime]:
+        if attempts >= self.max_attempts:
+            return None
+        delay = min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max)
+        # Jitter so a provider outage doesn't turn into a synchronized retry storm
+        delay *= random.uniform(0.8, 1.2)
+        return datetime.utcnow() + timedelta(seconds=delay)
+
+    def _with_session(self, fn, *args):
+        with Session(self.engine) as session:
+            return fn(session, *args)
+
+# Global outbox worker instance
+outbox_worker = OutboxWorker()
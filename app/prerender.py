@@ -0,0 +1,186 @@
+from sqlmodel import Session
+from app import crud
+from app.email_service import OutgoingEmail, email_service as default_email_service
+from app.metrics import MetricsMiddleware
+from app.models import AccessRequest, engine as default_engine
+from app.qr_service import qr_service as default_qr_service
+from app.tokens import token_signer
+from typing import Dict, List, NamedTuple, Optional
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+class PreparedInvitation(NamedTuple):
+    """Token and ready-to-send invitation for a pending request"""
+    request_id: int
+    token: str
+    message: OutgoingEmail
+    size: int
+
+class InvitationPrerenderer:
+    """Prepares invitations for pending requests while the app is idle
+
+    For each pending request a token is picked, its QR code rendered and the
+    email built ahead of time. Approving then reuses the token, and the outbox
+    sends the prepared message instead of rendering. Prepared invitations live
+    in this process's memory, up to max_bytes of messages; anything without one
+    (budget spent, another worker approved it, restart) takes the normal path.
+    A claimed invitation the outbox doesn't take within claim_ttl seconds (the
+    approval failed, or another process sent it) is dropped.
+    """
+    def __init__(self, engine=None, email_service=None, qr_service=None):
+        self.engine = engine or default_engine
+        self.email_service = email_service or default_email_service
+        self.qr_service = qr_service or default_qr_service
+        self.enabled = os.getenv("PRERENDER_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.max_bytes = int(os.getenv("PRERENDER_MAX_BYTES", str(32 * 1024 * 1024)))
+        self.batch_size = int(os.getenv("PRERENDER_BATCH_SIZE", "20"))
+        self.interval = float(os.getenv("PRERENDER_INTERVAL", "5"))
+        self.claim_ttl = float(os.getenv("PRERENDER_CLAIM_TTL", "600"))
+        self._by_request: Dict[int, PreparedInvitation] = {}
+        self._by_token: Dict[str, PreparedInvitation] = {}
+        # Token -> when it was claimed (time.monotonic())
+        self._claimed: Dict[str, float] = {}
+        self._size = 0
+        # Highest request ID looked at; new sign-ups always get higher IDs
+        self._cursor = 0
+        self._task: Optional[asyncio.Task] = None
+
+        self.prepared = 0
+        self.used = 0
+
+    def start(self):
+        """Start preparing invitations in the background"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop the background task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def claim_token(self, request_id: int) -> Optional[str]:
+        """Token prepared for a pending request that is being approved, if any
+
+        A claimed invitation is kept only for the outbox to take, so approving
+        the same request twice can't hand out its token twice.
+        """
+        prepared = self._by_request.pop(request_id, None)
+        if prepared is None:
+            return None
+        self._claimed[prepared.token] = time.monotonic()
+        return prepared.token
+
+    def claim_tokens(self, request_ids: List[int]) -> Dict[int, str]:
+        """Claim the prepared tokens of whichever of the requests have one"""
+        tokens = {}
+        for request_id in request_ids:
+            token = self.claim_token(request_id)
+            if token:
+                tokens[request_id] = token
+        return tokens
+
+    def take_message(self, token: str) -> Optional[OutgoingEmail]:
+        """Remove and return the invitation prepared with this token"""
+        prepared = self._by_token.get(token)
+        if prepared is None:
+            return None
+        self._discard(prepared)
+        self.used += 1
+        return prepared.message
+
+    def stats(self):
+        """Prepared invitations and memory used"""
+        return {
+            "ready": len(self._by_request),
+            "claimed": len(self._by_token) - len(self._by_request),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "prepared": self.prepared,
+            "used": self.used
+        }
+
+    def is_idle(self) -> bool:
+        """No HTTP requests are being served by this process"""
+        return MetricsMiddleware.in_progress == 0
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.prune()
+                while self.is_idle() and await self.prepare_batch():
+                    # Yield between batches so a request arriving meanwhile is served first
+                    await asyncio.sleep(0)
+            except Exception:
+                logger.exception("Invitation pre-rendering failed")
+
+    async def prepare_batch(self) -> int:
+        """Prepare invitations for the next few pending requests; returns how many"""
+        if self._size >= self.max_bytes:
+            return 0
+        requests = await asyncio.to_thread(self._with_session, crud.get_pending_page, self._cursor, self.batch_size)
+        if not requests:
+            return 0
+        self._cursor = requests[-1].id
+        prepared = await asyncio.to_thread(self._render, [r for r in requests if r.id not in self._by_request])
+        for invitation in prepared:
+            self._by_request[invitation.request_id] = invitation
+            self._by_token[invitation.token] = invitation
+            self._size += invitation.size
+        self.prepared += len(prepared)
+        return len(requests)
+
+    async def prune(self):
+        """Drop invitations for requests approved or removed elsewhere, and stale claims"""
+        expired = time.monotonic() - self.claim_ttl
+        for token, claimed_at in list(self._claimed.items()):
+            if claimed_at < expired:
+                self._discard(self._by_token[token])
+
+        request_ids = list(self._by_request)
+        pending = set()
+        for start in range(0, len(request_ids), 500):
+            chunk = request_ids[start:start + 500]
+            pending.update(await asyncio.to_thread(self._with_session, crud.get_pending_ids, chunk))
+        for request_id in request_ids:
+            # Claimed while the lookup ran: the outbox takes it from here
+            prepared = self._by_request.get(request_id)
+            if prepared is not None and request_id not in pending:
+                self._discard(prepared)
+
+    def _render(self, requests: List[AccessRequest]) -> List[PreparedInvitation]:
+        prepared = []
+        for request in requests:
+            token = token_signer.issue(request.id)
+            message = self.email_service.build_invitation_message(
+                request.email,
+                f"{request.first_name} {request.last_name}",
+                self.qr_service.generate_qr_code(token),
+                self.qr_service.build_url(token),
+                request.locale
+            )
+            prepared.append(PreparedInvitation(request.id, token, message, len(message.data)))
+        return prepared
+
+    def _discard(self, prepared: PreparedInvitation):
+        if self._by_request.get(prepared.request_id) is prepared:
+            del self._by_request[prepared.request_id]
+        self._claimed.pop(prepared.token, None)
+        del self._by_token[prepared.token]
+        self._size -= prepared.size
+
+    def _with_session(self, fn, *args):
+        with Session(self.engine) as session:
+            return fn(session, *args)
+
+# Global invitation pre-renderer instance
+invitation_prerenderer = InvitationPrerenderer()
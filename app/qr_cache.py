@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from typing import Dict, Optional
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+class QRCache:
+    """Content-addressed cache of rendered QR codes
+
+    Entries are keyed by a hash of everything that affects the rendered image.
+    The in-memory tier is an LRU bounded by total bytes; an optional on-disk tier
+    survives restarts and is consulted before re-rendering.
+    """
+    def __init__(self, max_bytes: int, disk_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        # generate_qr_code is also called from the threadpool
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Hash the render inputs into a cache key"""
+        return hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return cached bytes for a key, or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, value)
+        return value
+
+    def put(self, key: str, value: bytes):
+        """Cache bytes for a key in memory and, if configured, on disk"""
+        with self._lock:
+            self._store(key, value)
+        self._write_disk(key, value)
+
+    def clear(self):
+        """Drop the in-memory tier"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Cache counters and current size"""
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes
+        }
+
+    def _store(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        self._entries[key] = value
+        self._size += len(value)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        # Fan out by prefix so no directory grows to hundreds of thousands of files
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Failed to read QR cache entry {key}: {e}")
+            return None
+
+    def _write_disk(self, key: str, value: bytes):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write QR cache entry {key}: {e}")
@@ -0,0 +1,113 @@
+import qrcode
+from qrcode.image.pil import PilImage
+from io import BytesIO
+from typing import Callable, Dict, List, NamedTuple
+import numpy as np
+import struct
+import zlib
+
+ERROR_CORRECTION_LEVELS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+
+# Module matrix as returned by QRCode.get_matrix(), quiet zone included
+Matrix = List[List[bool]]
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Palette index 0 is white (light modules), 1 is black (dark modules)
+PNG_PALETTE = b"\xff\xff\xff\x00\x00\x00"
+
+def build_qr(data: str, border: int, error_correction: str) -> qrcode.QRCode:
+    """Encode data into a QR code with the smallest version that fits"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=ERROR_CORRECTION_LEVELS[error_correction],
+        box_size=1,
+        border=border,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr
+
+def render_pil(matrix: Matrix, box_size: int, compress_level: int) -> bytes:
+    """Draw through qrcode's PilImage and encode with PIL's PNG writer"""
+    # The matrix already includes the quiet zone, so no extra border here
+    img = PilImage(0, len(matrix), box_size, qrcode_modules=matrix, fill_color="black", back_color="white")
+    for r, row in enumerate(matrix):
+        for c, dark in enumerate(row):
+            if dark:
+                img.drawrect(r, c)
+    img_buffer = BytesIO()
+    img.save(img_buffer, format='PNG', compress_level=compress_level)
+    return img_buffer.getvalue()
+
+def render_png(matrix: Matrix, box_size: int, compress_level: int) -> bytes:
+    """Write a 1-bit palette PNG straight from the module matrix"""
+    modules = np.array(matrix, dtype=np.uint8)
+
+    # Scale each module to box_size x box_size pixels, then pack 8 pixels per byte
+    pixels = np.repeat(np.repeat(modules, box_size, axis=0), box_size, axis=1)
+    height, width = pixels.shape
+    rows = np.packbits(pixels, axis=1)
+    # Every scanline starts with filter type 0 (None)
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), rows]).tobytes()
+
+    return b"".join((
+        PNG_SIGNATURE,
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 1, 3, 0, 0, 0)),
+        _png_chunk(b"PLTE", PNG_PALETTE),
+        _png_chunk(b"IDAT", zlib.compress(raw, compress_level)),
+        _png_chunk(b"IEND", b""),
+    ))
+
+def render_svg(matrix: Matrix, box_size: int, compress_level: int) -> bytes:
+    """Describe dark modules as an SVG path; nothing is rasterized"""
+    size = len(matrix)
+
+    # One sub-path per horizontal run of dark modules keeps the path short
+    segments: List[str] = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            segments.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+
+    pixels = size * box_size
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+        f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path fill="#000" d="{"".join(segments)}"/></svg>'
+    ).encode()
+
+def _png_chunk(chunk_type: bytes, payload: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(payload))
+        + chunk_type
+        + payload
+        + struct.pack(">I", zlib.crc32(chunk_type + payload) & 0xFFFFFFFF)
+    )
+
+class Backend(NamedTuple):
+    render: Callable[[Matrix, int, int], bytes]
+    media_type: str
+    extension: str
+
+BACKENDS: Dict[str, Backend] = {
+    "pil": Backend(render_pil, "image/png", "png"),
+    "png": Backend(render_png, "image/png", "png"),
+    "svg": Backend(render_svg, "image/svg+xml", "svg"),
+}
+
+def render(data: str, backend: str, box_size: int, border: int, error_correction: str, compress_level: int) -> bytes:
+    """Encode data as a QR code and render it with the named backend"""
+    matrix = build_qr(data, border, error_correction).get_matrix()
+    return BACKENDS[backend].render(matrix, box_size, compress_level)
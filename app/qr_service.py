@@ -1,36 +1,111 @@
-import qrcode
-from qrcode.image.pil import PilImage
-from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from app.qr_cache import QRCache
+from app.qr_render import BACKENDS, render
+from app.metrics import QR_RENDER_SECONDS
+import asyncio
 import os
+import time
+
+def _render(qr_url: str, backend: str, box_size: int, border: int, error_correction: str, compress_level: int) -> bytes:
+    """Render a QR code URL (module level so worker processes can pickle it)"""
+    return render(qr_url, backend, box_size, border, error_correction, compress_level)
+
+def _render_batch(qr_urls: List[str], *options) -> List[bytes]:
+    """Render a chunk of QR code URLs inside a worker process"""
+    return [_render(qr_url, *options) for qr_url in qr_urls]
 
 class QRService:
     def __init__(self):
         self.base_url = os.getenv("BASE_URL", "http://localhost:8000")
-    
+        self.box_size = int(os.getenv("QR_BOX_SIZE", "10"))
+        self.border = int(os.getenv("QR_BORDER", "4"))
+        self.error_correction = os.getenv("QR_ERROR_CORRECTION", "L").upper()
+        # "png" writes the PNG directly, "pil" goes through PIL, "svg" skips rasterizing
+        self.backend = os.getenv("QR_BACKEND", "png")
+        self.compress_level = int(os.getenv("QR_COMPRESS_LEVEL", "6"))
+        self.workers = int(os.getenv("QR_WORKERS", str(os.cpu_count() or 1)))
+        # Below this many codes the process pool costs more than it saves
+        self.parallel_threshold = int(os.getenv("QR_PARALLEL_THRESHOLD", "8"))
+        self.cache = QRCache(
+            max_bytes=int(os.getenv("QR_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+            disk_dir=os.getenv("QR_CACHE_DIR") or None
+        )
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def build_url(self, token: str) -> str:
+        """Build the URL encoded in the QR code for a token"""
+        return f"{self.base_url}/q/{token}"
+
+    @property
+    def media_type(self) -> str:
+        """MIME type of the images produced by the configured backend"""
+        return BACKENDS[self.backend].media_type
+
+    def cache_key(self, token: str) -> str:
+        """Cache key covering every input that changes the rendered image"""
+        return QRCache.make_key(token, self.base_url, *self._render_options())
+
     def generate_qr_code(self, token: str) -> bytes:
-        """Generate QR code for token and return as PNG bytes"""
-        # Create QR code URL
-        qr_url = f"{self.base_url}/q/{token}"
-        
-        # Generate QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
+        """Generate QR code for token and return it in the backend's format (PNG by default)"""
+        key = self.cache_key(token)
+        image = self.cache.get(key)
+        if image is None:
+            started = time.perf_counter()
+            image = _render(self.build_url(token), *self._render_options())
+            QR_RENDER_SECONDS.observe(time.perf_counter() - started)
+            self.cache.put(key, image)
+        return image
+
+    async def generate_qr_codes(self, tokens: List[str]) -> List[bytes]:
+        """Generate QR codes for several tokens, rendering cache misses in parallel on a process pool"""
+        keys = [self.cache_key(token) for token in tokens]
+        found: Dict[str, bytes] = {}
+        missing: List[Tuple[str, str]] = []
+        for token, key in zip(tokens, keys):
+            if key in found:
+                continue
+            image = self.cache.get(key)
+            if image is None:
+                missing.append((key, self.build_url(token)))
+            else:
+                found[key] = image
+
+        rendered = await self._render_many([qr_url for _, qr_url in missing])
+        for (key, _), image in zip(missing, rendered):
+            self.cache.put(key, image)
+            found[key] = image
+
+        return [found[key] for key in keys]
+
+    def shutdown(self):
+        """Stop the worker processes, if any were started"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _render_many(self, qr_urls: List[str]) -> List[bytes]:
+        options = self._render_options()
+        if len(qr_urls) < self.parallel_threshold or self.workers <= 1:
+            return _render_batch(qr_urls, *options)
+
+        # One chunk per worker keeps pickling overhead to a handful of round-trips
+        executor = self._get_executor()
+        chunk_size = -(-len(qr_urls) // self.workers)
+        chunks = [qr_urls[i:i + chunk_size] for i in range(0, len(qr_urls), chunk_size)]
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, _render_batch, chunk, *options) for chunk in chunks)
         )
-        qr.add_data(qr_url)
-        qr.make(fit=True)
-        
-        # Create image
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convert to bytes
-        img_buffer = BytesIO()
-        img.save(img_buffer, format='PNG')
-        img_buffer.seek(0)
-        
-        return img_buffer.getvalue()
+        return [image for chunk in results for image in chunk]
+
+    def _render_options(self) -> Tuple[str, int, int, str, int]:
+        return self.backend, self.box_size, self.border, self.error_correction, self.compress_level
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
 
 # Global QR service instance
 qr_service = QRService()
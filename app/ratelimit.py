@@ -0,0 +1,204 @@
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+import math
+import os
+import time
+import zlib
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # redis is optional; limits are then per process
+    redis = None
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+class Limit(NamedTuple):
+    """Bucket of `burst` tokens that refills at `rate` tokens per second"""
+    rate: float
+    burst: int
+
+def parse_limit(value: str) -> Limit:
+    """Parse "5/minute" into a bucket of 5 tokens refilled over a minute"""
+    count, _, period = value.partition("/")
+    seconds = PERIODS[period.strip().lower()] if period else 1
+    return Limit(rate=int(count) / seconds, burst=int(count))
+
+def limit_from_env(name: str, default: str) -> Optional[Limit]:
+    """Limit from the environment; "off" (or an empty value) disables it"""
+    value = os.getenv(name, default).strip()
+    if not value or value.lower() == "off":
+        return None
+    return parse_limit(value)
+
+class MemoryBackend:
+    """Token buckets kept in this process
+
+    Each bucket is stored as a single float, the time at which it will be full
+    again (the "theoretical arrival time" form of a token bucket), so refilling
+    is lazy arithmetic on access and an idle key costs one dict entry. Keys
+    are spread over shards; one shard is swept of full buckets every
+    sweep_interval / shards seconds, so no sweep walks every key at once.
+    """
+    def __init__(self, shards: int = 64, sweep_interval: float = 60.0):
+        self._shards: List[Dict[str, float]] = [{} for _ in range(shards)]
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._sweep_cursor = 0
+
+    async def hit(self, key: str, limit: Limit, now: Optional[float] = None) -> float:
+        """Take a token; returns 0 if allowed, otherwise seconds until one is available"""
+        if now is None:
+            now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+
+        shard = self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+        interval = 1.0 / limit.rate
+        full_at = max(shard.get(key, now), now)
+        # Tokens left = (burst interval window - time until full) / interval
+        retry_after = full_at + interval - now - limit.burst * interval
+        if retry_after > 0:
+            return retry_after
+        shard[key] = full_at + interval
+        return 0.0
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def _sweep(self, now: float):
+        shard = self._shards[self._sweep_cursor]
+        # Full buckets are indistinguishable from absent ones
+        for key in [key for key, full_at in shard.items() if full_at <= now]:
+            del shard[key]
+        self._sweep_cursor = (self._sweep_cursor + 1) % len(self._shards)
+        self._next_sweep = now + self.sweep_interval / len(self._shards)
+
+# Same algorithm as MemoryBackend, atomically in Redis; the key expires when full
+_REDIS_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local full_at = tonumber(redis.call('GET', KEYS[1]) or now)
+if full_at < now then full_at = now end
+local retry_after = full_at + interval - now - burst * interval
+if retry_after > 0 then return tostring(retry_after) end
+redis.call('SET', KEYS[1], full_at + interval, 'PX', math.ceil((full_at + interval - now) * 1000))
+return '0'
+"""
+
+class RedisBackend:
+    """Token buckets shared by every worker through Redis"""
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_REDIS_URL is set but the redis package is not installed")
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(_REDIS_SCRIPT)
+
+    async def hit(self, key: str, limit: Limit, now: Optional[float] = None) -> float:
+        """Take a token; returns 0 if allowed, otherwise seconds until one is available"""
+        # Wall clock, since workers don't share a monotonic clock
+        if now is None:
+            now = time.time()
+        result = await self._script(keys=[self.prefix + key], args=[now, 1.0 / limit.rate, limit.burst])
+        return float(result)
+
+class Rule(NamedTuple):
+    """Limit requests matching a method and path prefix, per client address"""
+    name: str
+    method: str
+    path_prefix: str
+    limit: Limit
+
+def default_rules() -> List[Rule]:
+    """Per-route limits, each overridable from the environment"""
+    rules = [
+        ("signup", "POST", "/request-access", limit_from_env("RATE_LIMIT_SIGNUP", "20/minute")),
+        ("login", "POST", "/admin/login", limit_from_env("RATE_LIMIT_LOGIN", "10/minute")),
+        # Door staff share one address, so this only stops token guessing
+        ("qr", "GET", "/q/", limit_from_env("RATE_LIMIT_QR", "120/minute")),
+    ]
+    return [Rule(name, method, prefix, limit) for name, method, prefix, limit in rules if limit]
+
+# Checked in the routes, which know the submitted email / username
+SIGNUP_EMAIL_LIMIT = limit_from_env("RATE_LIMIT_SIGNUP_EMAIL", "3/hour")
+LOGIN_USER_LIMIT = limit_from_env("RATE_LIMIT_LOGIN_USER", "5/minute")
+
+class RateLimiter:
+    """Rate limit checks against a shared backend"""
+    def __init__(self, backend=None, rules: Optional[List[Rule]] = None):
+        if backend is None:
+            redis_url = os.getenv("RATE_LIMIT_REDIS_URL")
+            backend = RedisBackend(redis_url) if redis_url else MemoryBackend()
+        self.backend = backend
+        self.rules = default_rules() if rules is None else rules
+        self.enabled = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.rejected = 0
+
+    def match(self, method: str, path: str) -> Optional[Rule]:
+        """First rule covering a request, if any"""
+        for rule in self.rules:
+            if rule.method == method and path.startswith(rule.path_prefix):
+                return rule
+        return None
+
+    async def hit(self, key: str, limit: Optional[Limit]) -> float:
+        """Take a token for key; returns 0 if allowed, otherwise the Retry-After in seconds"""
+        if not self.enabled or limit is None:
+            return 0.0
+        retry_after = await self.backend.hit(key, limit)
+        if retry_after:
+            self.rejected += 1
+        return retry_after
+
+def client_address(scope: Dict, trust_proxy: bool = False) -> str:
+    """Client IP of an ASGI request, optionally from the first X-Forwarded-For hop"""
+    if trust_proxy:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                return value.split(b",", 1)[0].strip().decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware applying the limiter's per-route rules by client IP
+
+    Rejections are answered here with a bare 429, before FastAPI parses the
+    request or opens a database session.
+    """
+    def __init__(self, app, limiter: RateLimiter, trust_proxy: Optional[bool] = None):
+        self.app = app
+        self.limiter = limiter
+        if trust_proxy is None:
+            trust_proxy = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() in ("1", "true", "yes")
+        self.trust_proxy = trust_proxy
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.limiter.enabled:
+            return await self.app(scope, receive, send)
+        rule = self.limiter.match(scope["method"], scope["path"])
+        if rule is None:
+            return await self.app(scope, receive, send)
+
+        key = f"{rule.name}:{client_address(scope, self.trust_proxy)}"
+        retry_after = await self.limiter.hit(key, rule.limit)
+        if not retry_after:
+            return await self.app(scope, receive, send)
+        await send_too_many_requests(send, retry_after)
+
+_REJECT_BODY = b"Too many requests"
+
+async def send_too_many_requests(send: Callable[[Dict], Awaitable[None]], retry_after: float):
+    """Answer 429 with a Retry-After header"""
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(_REJECT_BODY)).encode()),
+            (b"retry-after", str(math.ceil(retry_after)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": _REJECT_BODY})
+
+# Global rate limiter instance
+rate_limiter = RateLimiter()
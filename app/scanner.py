@@ -0,0 +1,63 @@
+from fastapi import Request, Response
+from sqlmodel import Session, select
+from app.models import AccessRequest, QRToken, read_engine as default_engine
+from datetime import datetime
+from typing import Any, Iterator
+import json
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; scanners fall back to JSON
+    msgpack = None
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+def wants_msgpack(request: Request) -> bool:
+    """Whether the scanner asked for msgpack and we can produce it"""
+    accept = request.headers.get("accept", "")
+    return msgpack is not None and any(media_type in accept for media_type in MSGPACK_TYPES)
+
+def _default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def encode(payload: Any, as_msgpack: bool) -> bytes:
+    """Serialize a payload compactly as msgpack or JSON"""
+    if as_msgpack:
+        return msgpack.packb(payload, default=_default)
+    return json.dumps(payload, default=_default, separators=(",", ":")).encode()
+
+def scanner_response(request: Request, payload: Any, status_code: int = 200) -> Response:
+    """Respond in the format the scanner negotiated"""
+    as_msgpack = wants_msgpack(request)
+    return Response(
+        encode(payload, as_msgpack),
+        status_code=status_code,
+        media_type=MSGPACK_TYPES[0] if as_msgpack else "application/json"
+    )
+
+def iter_snapshot(as_msgpack: bool, engine=None, batch_size: int = 1000) -> Iterator[bytes]:
+    """Stream every issued token with its guest for offline caching on a scanner
+
+    The first record is a header with the generation time; each following record
+    is [token, guest_name, instagram, used]. JSON output is one record per line,
+    msgpack output is a sequence of concatenated objects.
+    """
+    separator = b"" if as_msgpack else b"\n"
+    yield encode({"generated_at": datetime.utcnow()}, as_msgpack) + separator
+
+    statement = (
+        select(QRToken.token, AccessRequest.first_name, AccessRequest.last_name, AccessRequest.instagram, QRToken.used)
+        .join(AccessRequest, AccessRequest.id == QRToken.request_id)
+        .execution_options(yield_per=batch_size)
+    )
+    with Session(engine or default_engine) as session:
+        chunk = []
+        for token, first_name, last_name, instagram, used in session.exec(statement):
+            chunk.append(encode([token, f"{first_name} {last_name}", instagram, used], as_msgpack) + separator)
+            if len(chunk) >= batch_size:
+                yield b"".join(chunk)
+                chunk = []
+        if chunk:
+            yield b"".join(chunk)
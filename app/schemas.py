@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, field_validator
+from typing import Optional, List
+from datetime import datetime, timezone
 
 class AccessRequestCreate(BaseModel):
     """Schema for creating access request"""
@@ -8,6 +8,7 @@ class AccessRequestCreate(BaseModel):
     last_name: str
     email: EmailStr
     instagram: str
+    locale: Optional[str] = None
 
 class AccessRequestResponse(BaseModel):
     """Schema for access request response"""
@@ -19,6 +20,7 @@ class AccessRequestResponse(BaseModel):
     approved: bool
     created_at: datetime
     approved_at: Optional[datetime] = None
+    locale: Optional[str] = None
 
 class UserLogin(BaseModel):
     """Schema for user login"""
@@ -30,3 +32,77 @@ class QRTokenResponse(BaseModel):
     token: str
     used: bool
     guest_name: str
+
+class BulkApproveRequest(BaseModel):
+    """Schema for approving several access requests at once"""
+    request_ids: List[int]
+
+class BulkApproveResult(BaseModel):
+    """Schema for the outcome of one request in a bulk approval"""
+    request_id: int
+    status: str  # "approved", "already_approved" or "not_found"
+    email_queued: bool = False
+
+class BulkApproveResponse(BaseModel):
+    """Schema for bulk approval response"""
+    approved: int
+    results: List[BulkApproveResult]
+
+class OutboxEntryResponse(BaseModel):
+    """Schema for a queued invitation email"""
+    id: int
+    request_id: int
+    to_email: str
+    status: str
+    attempts: int
+    last_error: Optional[str] = None
+    created_at: datetime
+    sent_at: Optional[datetime] = None
+
+class OutboxStatsResponse(BaseModel):
+    """Schema for email outbox queue depth and send latency"""
+    pending: int
+    sending: int
+    sent: int
+    dead: int
+    latency_p50: Optional[float] = None
+    latency_p95: Optional[float] = None
+    recent_dead: List[OutboxEntryResponse]
+
+class ScanResult(BaseModel):
+    """Schema for a door scan outcome"""
+    status: str  # "admitted", "used" or "invalid"
+    guest_name: Optional[str] = None
+    instagram: Optional[str] = None
+    used_at: Optional[datetime] = None
+
+class OfflineScan(BaseModel):
+    """Schema for a scan recorded while a door device was offline"""
+    token: str
+    scanned_at: datetime
+
+    @field_validator("scanned_at")
+    @classmethod
+    def to_naive_utc(cls, value: datetime) -> datetime:
+        """Store times like the rest of the database: naive UTC"""
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+class OfflineScanBatch(BaseModel):
+    """Schema for uploading offline scans"""
+    device_id: str
+    scans: List[OfflineScan]
+
+class OfflineScanResult(BaseModel):
+    """Schema for how one offline scan was reconciled"""
+    token: str
+    status: str  # "admitted", "duplicate" or "invalid"
+    conflict: bool = False
+    first_scanned_at: Optional[datetime] = None
+
+class OfflineSyncResponse(BaseModel):
+    """Schema for offline scan reconciliation response"""
+    admitted: int
+    duplicates: int
+    results: List[OfflineScanResult]
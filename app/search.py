@@ -0,0 +1,71 @@
+from sqlalchemy import or_, text
+from sqlmodel import Session, select
+from app.models import AccessRequest, SEARCH_TABLE
+from typing import List, Optional
+import re
+
+# Same notion of a word as FTS5's unicode61 tokenizer: runs of letters and digits
+_TERM = re.compile(r"[^\W_]+")
+
+def build_match_query(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 query where every word must match as a prefix
+
+    "nico ross" becomes '"nico"* AND "ross"*'. Terms are quoted so FTS5 syntax
+    in user input (AND, NEAR, column filters, stray quotes) is never interpreted.
+    """
+    terms = _TERM.findall(query)
+    if not terms:
+        return None
+    return " AND ".join(f'"{term}"*' for term in terms)
+
+def search_requests(
+    session: Session, query: str, limit: int = 20, event_id: Optional[int] = None
+) -> List[AccessRequest]:
+    """Find access requests by partial name, email or Instagram handle, best match first
+
+    Only requests of event_id when it is given.
+    """
+    match = build_match_query(query)
+    if match is None:
+        return []
+    if session.get_bind().dialect.name != "sqlite":
+        return like_search(session, query, limit, event_id)
+
+    if event_id is None:
+        statement = text(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match ORDER BY rank LIMIT :limit"
+        )
+    else:
+        # Filtered before the LIMIT, so other events' matches don't crowd this one's out
+        statement = text(
+            f"SELECT {SEARCH_TABLE}.rowid FROM {SEARCH_TABLE}"
+            f" JOIN accessrequest ON accessrequest.id = {SEARCH_TABLE}.rowid"
+            f" WHERE {SEARCH_TABLE} MATCH :match AND accessrequest.event_id = :event_id"
+            " ORDER BY rank LIMIT :limit"
+        )
+    params = {"match": match, "limit": limit, "event_id": event_id}
+    ids = [row_id for (row_id,) in session.execute(statement, params)]
+    if not ids:
+        return []
+
+    # Keep the relevance order from the index
+    found = {
+        access_request.id: access_request
+        for access_request in session.exec(select(AccessRequest).where(AccessRequest.id.in_(ids)))
+    }
+    return [found[row_id] for row_id in ids if row_id in found]
+
+def like_search(session: Session, query: str, limit: int = 20, event_id: Optional[int] = None) -> List[AccessRequest]:
+    """Substring scan over every searchable column; every word must match somewhere"""
+    statement = select(AccessRequest)
+    if event_id is not None:
+        statement = statement.where(AccessRequest.event_id == event_id)
+    for term in _TERM.findall(query):
+        pattern = f"%{term}%"
+        statement = statement.where(or_(
+            AccessRequest.first_name.ilike(pattern),
+            AccessRequest.last_name.ilike(pattern),
+            AccessRequest.email.ilike(pattern),
+            AccessRequest.instagram.ilike(pattern)
+        ))
+    return list(session.exec(statement.order_by(AccessRequest.created_at.desc()).limit(limit)))
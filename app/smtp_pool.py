@@ -0,0 +1,149 @@
+import aiosmtplib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class PooledConnection:
+    """An authenticated SMTP session plus the bookkeeping needed to recycle it"""
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp = smtp
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+class SMTPConnectionPool:
+    """Keeps a bounded set of open, authenticated SMTP connections for reuse
+
+    Connections are opened lazily, checked with NOOP when they have sat idle
+    for a while, and recycled after `max_messages` sends or `max_idle` seconds
+    without use. A connection that errors is thrown away, never reused.
+    """
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        start_tls: bool = True,
+        size: int = 4,
+        max_messages: int = 100,
+        max_idle: float = 30.0,
+        health_check_after: float = 5.0,
+        timeout: float = 30.0
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.size = size
+        self.max_messages = max_messages
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self.timeout = timeout
+
+        # Counters, handy for tests and benchmarks
+        self.connections_opened = 0
+        self.messages_sent = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._idle: List[PooledConnection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def send_raw(self, sender: str, recipients: List[str], data: bytes):
+        """Send an already serialized message, retrying once on a dropped session"""
+        try:
+            async with self.connection() as conn:
+                await conn.smtp.sendmail(sender, recipients, data)
+        except (aiosmtplib.SMTPServerDisconnected, ConnectionError):
+            # The server may have closed a connection we believed healthy
+            async with self.connection() as conn:
+                await conn.smtp.sendmail(sender, recipients, data)
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[PooledConnection]:
+        """Borrow a healthy connection; it goes back to the pool if the block succeeds"""
+        self._bind_loop()
+        async with self._slots:
+            conn = await self._checkout()
+            try:
+                yield conn
+            except BaseException:
+                await self._discard(conn)
+                raise
+            conn.messages_sent += 1
+            conn.last_used = time.monotonic()
+            self.messages_sent += 1
+            if conn.messages_sent >= self.max_messages:
+                await self._discard(conn)
+            else:
+                self._idle.append(conn)
+
+    async def ping(self):
+        """Check a connection (an idle one, or a new one) with NOOP, raising on failure"""
+        self._bind_loop()
+        async with self._slots:
+            conn = await self._checkout()
+            try:
+                await conn.smtp.noop()
+            except BaseException:
+                await self._discard(conn)
+                raise
+            conn.last_used = time.monotonic()
+            self._idle.append(conn)
+
+    async def close(self):
+        """Close every idle connection"""
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await self._discard(conn)
+
+    async def _checkout(self) -> PooledConnection:
+        # Most recently used first: it is the one least likely to have timed out
+        while self._idle:
+            conn = self._idle.pop()
+            idle_for = time.monotonic() - conn.last_used
+            if idle_for >= self.max_idle or not conn.smtp.is_connected:
+                await self._discard(conn)
+                continue
+            if idle_for >= self.health_check_after:
+                try:
+                    await conn.smtp.noop()
+                except (aiosmtplib.SMTPException, ConnectionError, asyncio.TimeoutError):
+                    await self._discard(conn)
+                    continue
+            return conn
+        return await self._connect()
+
+    async def _connect(self) -> PooledConnection:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            start_tls=self.start_tls,
+            timeout=self.timeout
+        )
+        await smtp.connect()
+        if self.username:
+            await smtp.login(self.username, self.password)
+        self.connections_opened += 1
+        return PooledConnection(smtp)
+
+    async def _discard(self, conn: PooledConnection):
+        try:
+            if conn.smtp.is_connected:
+                await conn.smtp.quit()
+        except Exception:
+            conn.smtp.close()
+
+    def _bind_loop(self):
+        # Sockets and semaphores belong to one event loop; start fresh on a new one
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            if self._idle:
+                logger.debug("Dropping %d SMTP connections from a previous event loop", len(self._idle))
+            self._loop = loop
+            self._idle = []
+            self._slots = asyncio.Semaphore(self.size)
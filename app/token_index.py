@@ -0,0 +1,141 @@
+from sqlalchemy.engine import Row
+from sqlmodel import Session, select
+from app import crud
+from app.models import QRToken
+from app.tokens import token_signer
+from typing import Dict, Optional, Tuple
+import os
+import threading
+import time
+
+MISSING = "missing"
+UNUSED = "unused"
+USED = "used"
+ADMITTED = "admitted"
+
+class TokenIndex:
+    """In-process map of every issued QR token to whether it has been used
+
+    Lets the door scanner turn away unknown and already-used codes without a
+    database round-trip. The database stays the source of truth: an UNUSED hit
+    still goes through the conditional redeem, and tokens created by other
+    processes are picked up by an incremental refresh (new rows only, by id).
+    """
+    def __init__(self, refresh_interval: Optional[float] = None):
+        if refresh_interval is None:
+            refresh_interval = float(os.getenv("TOKEN_INDEX_REFRESH_INTERVAL", "1"))
+        self.refresh_interval = refresh_interval
+        self._used: Dict[str, bool] = {}
+        self._max_id = 0
+        self._last_refresh = 0.0
+        self._loaded = False
+        self._lock = threading.Lock()
+        # Set when a refresh was asked for while another was running
+        self._stale = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self, session: Session):
+        """(Re)build the index from the database"""
+        with self._lock:
+            self._used = {}
+            self._max_id = 0
+            self._apply(session.exec(select(QRToken.id, QRToken.token, QRToken.used)))
+            self._loaded = True
+
+    def refresh(self, session: Session):
+        """Add tokens created since the last load or refresh
+
+        Never waits for a refresh already in progress: through AsyncSession.run_sync
+        both run on the event loop thread, and the one holding the lock is
+        suspended until the loop runs again. The running refresh queries again
+        instead, so it also picks up the rows the skipped caller committed.
+        """
+        if not self._loaded:
+            return
+        if not self._lock.acquire(blocking=False):
+            self._stale = True
+            return
+        try:
+            self._stale = True
+            repeat = False
+            while self._stale:
+                self._stale = False
+                if repeat:
+                    # End the read transaction so rows committed since are visible
+                    session.commit()
+                repeat = True
+                statement = (
+                    select(QRToken.id, QRToken.token, QRToken.used)
+                    .where(QRToken.id > self._max_id)
+                    .order_by(QRToken.id)
+                )
+                self._apply(session.exec(statement))
+        finally:
+            self._lock.release()
+
+    def catch_up(self, session: Session) -> bool:
+        """Refresh if the last refresh is older than refresh_interval; returns whether it ran"""
+        if not self._loaded or time.monotonic() - self._last_refresh < self.refresh_interval:
+            return False
+        self.refresh(session)
+        return True
+
+    def lookup(self, token: str) -> Optional[str]:
+        """MISSING, UNUSED or USED; None until the index has been loaded"""
+        if not self._loaded:
+            return None
+        used = self._used.get(token)
+        if used is None:
+            return MISSING
+        return USED if used else UNUSED
+
+    def mark_used(self, token: str):
+        """Record that a token has been redeemed"""
+        if self._loaded:
+            self._used[token] = True
+
+    def __len__(self) -> int:
+        return len(self._used)
+
+    def _apply(self, rows):
+        for token_id, token, used in rows:
+            self._used[token] = used
+            self._max_id = max(self._max_id, token_id)
+        self._last_refresh = time.monotonic()
+
+# Global token index instance
+token_index = TokenIndex()
+
+def redeem(session: Session, token: str, index: TokenIndex = token_index) -> Tuple[str, Optional[Row]]:
+    """Admit a scanned token at most once
+
+    Returns (ADMITTED, guest) on success, otherwise (MISSING, None) or (USED, None).
+    Tokens with a bad signature are MISSING without a lookup, in the index or
+    the database.
+    """
+    if not token_signer.is_plausible(token):
+        return MISSING, None
+    state = index.lookup(token)
+    if state == MISSING and index.catch_up(session):
+        state = index.lookup(token)
+    if state == MISSING and token_signer.request_id(token) is None:
+        # A correctly signed token is genuine, so it is checked in the database
+        # even when the index hasn't seen it: on PostgreSQL, IDs from concurrent
+        # transactions can commit out of order and slip behind the refresh
+        return MISSING, None
+    if state == USED:
+        return USED, None
+
+    guest = crud.redeem_qr_token(session, token)
+    if guest:
+        index.mark_used(token)
+        return ADMITTED, guest
+
+    # Lost a race with another scanner, or the index hasn't been loaded
+    if crud.get_qr_token(session, token) is None:
+        return MISSING, None
+    index.mark_used(token)
+    return USED, None
@@ -0,0 +1,76 @@
+from itsdangerous import Signer
+from app.auth import SECRET_KEY
+from typing import Optional
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+import re
+import secrets
+
+# A token is base32 (RFC 4648, no padding) of 15 bytes: the request ID (4 bytes,
+# big-endian), a 5-byte nonce so tokens re-issued for a request don't collide,
+# and the first 6 bytes of an HMAC-SHA256 of those 9 bytes. That is 24 characters
+# from A-Z2-7, which QR codes store in alphanumeric mode (5.5 bits a character
+# instead of 8), against 36 bytes for a UUID.
+TOKEN_LENGTH = 24
+_PAYLOAD_BYTES = 9
+_MAC_BYTES = 6
+# Tokens first had a 2-byte nonce and a 9-byte MAC; those already issued stay valid
+_LAYOUTS = ((_PAYLOAD_BYTES, _MAC_BYTES), (6, 9))
+MAX_REQUEST_ID = 2 ** 32 - 1
+_TOKEN = re.compile(r"^[A-Z2-7]{24}$")
+# Random UUIDs, and "qr_<name>_<random>" from the old Node app's JSON store
+_LEGACY = re.compile(r"^(?:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|qr_[\w-]{1,64})$")
+
+# Tokens issued before signing are only accepted (and looked up) while this is on
+ACCEPT_LEGACY_TOKENS = os.getenv("ACCEPT_LEGACY_TOKENS", "true").lower() in ("1", "true", "yes")
+
+class TokenSigner:
+    """Issues and checks signed QR tokens
+
+    The key is derived from SECRET_KEY by itsdangerous, as for session cookies,
+    with its own salt, so a token can't be replayed as a cookie signature.
+    """
+    def __init__(self, secret_key: str = SECRET_KEY, accept_legacy: bool = ACCEPT_LEGACY_TOKENS):
+        signer = Signer(secret_key, salt="qr-token", key_derivation="hmac", digest_method=hashlib.sha256)
+        self._key = signer.derive_key()
+        self.accept_legacy = accept_legacy
+
+    def issue(self, request_id: int) -> str:
+        """New token for an access request"""
+        if not 0 <= request_id <= MAX_REQUEST_ID:
+            raise ValueError(f"Request ID {request_id} doesn't fit in a token (0 to {MAX_REQUEST_ID})")
+        payload = request_id.to_bytes(4, "big") + secrets.token_bytes(_PAYLOAD_BYTES - 4)
+        return base64.b32encode(payload + self._mac(payload)[:_MAC_BYTES]).decode()
+
+    def request_id(self, token: str) -> Optional[int]:
+        """The request ID a genuine token was issued for, or None"""
+        if len(token) != TOKEN_LENGTH or not _TOKEN.match(token):
+            return None
+        try:
+            raw = base64.b32decode(token)
+        except binascii.Error:
+            return None
+        for payload_bytes, mac_bytes in _LAYOUTS:
+            payload, mac = raw[:payload_bytes], raw[payload_bytes:]
+            if hmac.compare_digest(mac, self._mac(payload)[:mac_bytes]):
+                return int.from_bytes(payload[:4], "big")
+        return None
+
+    def is_plausible(self, token: str) -> bool:
+        """Whether a token is worth looking up
+
+        True for a correctly signed token, or a legacy one while those are
+        accepted; forgeries are turned away without touching the database.
+        """
+        if self.request_id(token) is not None:
+            return True
+        return self.accept_legacy and _LEGACY.match(token) is not None
+
+    def _mac(self, payload: bytes) -> bytes:
+        return hmac.new(self._key, payload, hashlib.sha256).digest()
+
+# Global token signer instance
+token_signer = TokenSigner()
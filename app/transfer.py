@@ -0,0 +1,284 @@
+"""
+Streaming export and import of the guest list
+
+Exports walk the database with a server-side cursor and yield CSV or JSON
+Lines a batch at a time; imports read a file row by row, validate each row with
+AccessRequestCreate and insert valid rows in chunks, skipping duplicates. Both
+run in constant memory, whatever the number of rows.
+
+Usage:
+    python -m app.transfer export guests|redemptions [--format csv|jsonl] [-o FILE]
+    python -m app.transfer import FILE [--format csv|jsonl] [--chunk-size 1000]
+"""
+
+from pydantic import ValidationError
+from sqlalchemy import Connection, select
+from sqlmodel import Session
+from app import crud
+from app.models import AccessRequest, QRToken
+from app.schemas import AccessRequestCreate
+from datetime import datetime
+from typing import Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+import argparse
+import csv
+import io
+import json
+import sys
+
+FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+# Every request, with its token(s) if approved
+GUEST_COLUMNS = [
+    ("id", AccessRequest.id),
+    ("first_name", AccessRequest.first_name),
+    ("last_name", AccessRequest.last_name),
+    ("email", AccessRequest.email),
+    ("instagram", AccessRequest.instagram),
+    ("locale", AccessRequest.locale),
+    ("approved", AccessRequest.approved),
+    ("created_at", AccessRequest.created_at),
+    ("approved_at", AccessRequest.approved_at),
+    ("token", QRToken.token),
+    ("token_used", QRToken.used),
+    ("token_used_at", QRToken.used_at),
+]
+
+# Who came in, in order of arrival
+REDEMPTION_COLUMNS = [
+    ("used_at", QRToken.used_at),
+    ("token", QRToken.token),
+    ("request_id", AccessRequest.id),
+    ("first_name", AccessRequest.first_name),
+    ("last_name", AccessRequest.last_name),
+    ("instagram", AccessRequest.instagram),
+]
+
+IMPORT_FIELDS = ("first_name", "last_name", "email", "instagram", "locale")
+
+def export_statement(kind: str, event_id: Optional[int] = None):
+    """Query behind an export kind ("guests" or "redemptions"), of one event if given"""
+    if kind == "guests":
+        statement = (
+            select(*(column for _, column in GUEST_COLUMNS))
+            .outerjoin(QRToken, QRToken.request_id == AccessRequest.id)
+            .order_by(AccessRequest.id, QRToken.id)
+        )
+    elif kind == "redemptions":
+        statement = (
+            select(*(column for _, column in REDEMPTION_COLUMNS))
+            .join(AccessRequest, AccessRequest.id == QRToken.request_id)
+            .where(QRToken.used == True)
+            .order_by(QRToken.used_at, QRToken.id)
+        )
+    else:
+        raise ValueError(f"Unknown export {kind!r}")
+    if event_id is not None:
+        statement = statement.where(AccessRequest.event_id == event_id)
+    return statement
+
+def export_columns(kind: str) -> List[str]:
+    return [name for name, _ in (GUEST_COLUMNS if kind == "guests" else REDEMPTION_COLUMNS)]
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def stream_export(
+    engine, kind: str, fmt: str, batch_size: int = 1000, event_id: Optional[int] = None
+) -> Iterator[str]:
+    """iter_export on a connection of its own, closed when the stream ends"""
+    with engine.connect() as connection:
+        yield from iter_export(connection, kind, fmt, batch_size, event_id)
+
+def iter_export(
+    connection: Connection, kind: str, fmt: str, batch_size: int = 1000, event_id: Optional[int] = None
+) -> Iterator[str]:
+    """Yield an export as text chunks of about batch_size rows each
+
+    Rows are fetched through a server-side cursor (yield_per), so memory use
+    doesn't grow with the table.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}")
+    columns = export_columns(kind)
+    statement = export_statement(kind, event_id)
+    result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(columns)
+
+    for partition in result.partitions():
+        for row in partition:
+            if fmt == "csv":
+                writer.writerow([_csv_value(value) for value in row])
+            else:
+                buffer.write(json.dumps(dict(zip(columns, map(_json_value, row))), ensure_ascii=False))
+                buffer.write("\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+class ImportReport:
+    """Counters and per-row errors of an import
+
+    Rows are numbered from 1: CSV records after the header, or JSONL lines.
+    Only the first max_errors errors are kept; pass on_error to import_guests
+    to see all of them.
+    """
+    def __init__(self, max_errors: int = 1000):
+        self.max_errors = max_errors
+        self.rows = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors: List[Dict] = []
+
+    def add_error(self, row: int, error: str):
+        self.invalid += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "error": error})
+
+    def to_dict(self) -> Dict:
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "errors": self.errors,
+            "errors_truncated": self.invalid > len(self.errors)
+        }
+
+def read_rows(file: IO[str], fmt: str) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """Yield (row number, fields, parse error) for each row of a CSV or JSONL file"""
+    if fmt == "csv":
+        reader = csv.DictReader(file)
+        if reader.fieldnames:
+            # Accept "First Name", "first-name" and the like
+            reader.fieldnames = [name.strip().lower().replace(" ", "_").replace("-", "_") for name in reader.fieldnames]
+        for number, row in enumerate(reader, 1):
+            yield number, row, None
+    elif fmt == "jsonl":
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, None, f"invalid JSON: {e.msg}"
+                continue
+            if not isinstance(row, dict):
+                yield number, None, "expected a JSON object"
+                continue
+            yield number, row, None
+    else:
+        raise ValueError(f"Unknown format {fmt!r}")
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors())
+
+def import_guests(
+    engine,
+    file: IO[str],
+    fmt: str,
+    chunk_size: int = 1000,
+    on_error: Optional[Callable[[int, str], None]] = None,
+    report: Optional[ImportReport] = None
+) -> ImportReport:
+    """Import access requests from a CSV or JSONL file
+
+    Rows are validated with AccessRequestCreate and inserted chunk_size at a
+    time; rows whose email or Instagram handle is already taken count as
+    duplicates. Invalid rows are reported with their row number and skipped.
+    """
+    report = report or ImportReport()
+
+    def fail(number: int, error: str):
+        report.add_error(number, error)
+        if on_error:
+            on_error(number, error)
+
+    def flush(chunk: List[Tuple[int, AccessRequestCreate]]):
+        with Session(engine) as session:
+            ids = crud.insert_access_requests(session, [request for _, request in chunk])
+        inserted = sum(1 for request_id in ids if request_id is not None)
+        report.inserted += inserted
+        report.duplicates += len(ids) - inserted
+
+    chunk: List[Tuple[int, AccessRequestCreate]] = []
+    for number, row, error in read_rows(file, fmt):
+        report.rows += 1
+        if error:
+            fail(number, error)
+            continue
+        fields = {name: row[name] for name in IMPORT_FIELDS if row.get(name) not in (None, "")}
+        try:
+            chunk.append((number, AccessRequestCreate(**fields)))
+        except ValidationError as e:
+            fail(number, _validation_message(e))
+            continue
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+    return report
+
+def format_from_name(filename: Optional[str], default: str = "csv") -> str:
+    """Format implied by a file name's extension"""
+    if filename:
+        extension = filename.rsplit(".", 1)[-1].lower()
+        if extension in ("jsonl", "ndjson"):
+            return "jsonl"
+        if extension == "csv":
+            return "csv"
+    return default
+
+def main(argv: Optional[Iterable[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="write guests or redemptions to a file or stdout")
+    export_parser.add_argument("kind", choices=["guests", "redemptions"])
+    export_parser.add_argument("--format", choices=list(FORMATS))
+    export_parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    import_parser = commands.add_parser("import", help="add access requests from a CSV or JSONL file")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--format", choices=list(FORMATS))
+    import_parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    from app.models import create_db_and_tables, engine, read_engine
+    create_db_and_tables()
+
+    if args.command == "export":
+        fmt = args.format or format_from_name(args.output)
+        output = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+        try:
+            with read_engine.connect() as connection:
+                for chunk in iter_export(connection, args.kind, fmt):
+                    output.write(chunk)
+        finally:
+            if args.output:
+                output.close()
+        return
+
+    fmt = args.format or format_from_name(args.file)
+    with open(args.file, newline="", encoding="utf-8-sig") as file:
+        report = import_guests(
+            engine, file, fmt, args.chunk_size,
+            on_error=lambda number, error: print(f"row {number}: {error}", file=sys.stderr)
+        )
+    print(
+        f"{report.rows} rows: {report.inserted} inserted, {report.duplicates} duplicates, {report.invalid} invalid",
+        file=sys.stderr
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Benchmark: latency under mixed load, sync sessions on the event loop vs. the async data layer
+Usage: python -m benchmarks.bench_async_db [--requests 3000] [--concurrency 50]
+
+Both apps run under uvicorn against their own seeded SQLite file. "sync" serves
+the same routes the way app.main used to, calling app.crud through a sync
+Session inside `async def` handlers; "async" is app.main as shipped. Traffic is
+40% sign-ups, 40% door scans and 20% admin list pages.
+
+The sync app gets an unbounded pool: with a bounded one, a handler blocking the
+event loop on an exhausted pool stops the handlers that would return
+connections, and the server deadlocks instead of just getting slow.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Annotated, Dict, List
+
+import httpx
+from fastapi import Depends, FastAPI, Form, Request
+from fastapi.responses import StreamingResponse
+from fastapi.templating import Jinja2Templates
+from sqlmodel import Session, SQLModel, create_engine
+
+from app import crud
+from app.database import create_sqlite_engine
+from app.auth import create_session_token, require_auth, require_scanner
+from app.models import AccessRequest, QRToken
+from app.schemas import AccessRequestCreate
+from app.token_index import redeem, token_index, ADMITTED
+from benchmarks.common import free_port, percentile, start_uvicorn, wait_ready
+
+SCANNER_KEY = "bench-scanner-key"
+
+# The pre-async request path, served by the "sync" run
+sync_app = FastAPI()
+templates = Jinja2Templates(directory="templates")
+
+def get_sync_session():
+    engine = sync_app.state.engine
+    with Session(engine) as session:
+        yield session
+
+@sync_app.on_event("startup")
+def sync_startup():
+    # Same tuned engine as app.database, so only sync vs. async differs
+    sync_app.state.engine = create_sqlite_engine(os.environ["DATABASE_URL"], max_overflow=-1)
+    with Session(sync_app.state.engine) as session:
+        token_index.load(session)
+
+@sync_app.get("/health")
+async def sync_health():
+    return {"status": "healthy"}
+
+@sync_app.post("/request-access")
+async def sync_request_access(
+    first_name: Annotated[str, Form()],
+    last_name: Annotated[str, Form()],
+    email: Annotated[str, Form()],
+    instagram: Annotated[str, Form()],
+    session: Session = Depends(get_sync_session)
+):
+    crud.create_access_request(session, AccessRequestCreate(
+        first_name=first_name, last_name=last_name, email=email, instagram=instagram
+    ))
+    return {"ok": True}
+
+@sync_app.get("/admin")
+async def sync_admin(request: Request, session: Session = Depends(get_sync_session)):
+    username = require_auth(request)
+    rows, next_cursor = crud.list_requests(session, None, None, None, 50)
+    context = {
+        "request": request, "rows": rows, "counts": crud.count_requests(session),
+        "outbox": crud.get_outbox_stats(session), "status": None, "q": "", "limit": 50,
+        "cursor": None, "next_cursor": next_cursor, "username": username
+    }
+    # As streamed before this change: one threadpool hop per Jinja chunk
+    return StreamingResponse(templates.get_template("admin_panel.html").generate(context), media_type="text/html")
+
+@sync_app.post("/api/scan/redeem/{token}")
+async def sync_scan(token: str, request: Request, session: Session = Depends(get_sync_session)):
+    require_scanner(request)
+    outcome, _ = redeem(session, token)
+    return {"status": "admitted" if outcome == ADMITTED else "rejected"}
+
+def seed(path: str, guests: int, tokens: int) -> List[str]:
+    """Create the schema, guests and unused tokens (no outbox rows, so nothing is mailed)"""
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    issued = [str(uuid.uuid4()) for _ in range(tokens)]
+    with Session(engine) as session:
+        session.bulk_insert_mappings(AccessRequest, [
+            {"first_name": f"Guest{i}", "last_name": "Load", "email": f"guest{i}@example.com",
+             "instagram": f"guest{i}", "approved": i < tokens, "created_at": datetime.utcnow()}
+            for i in range(guests)
+        ])
+        session.bulk_insert_mappings(QRToken, [
+            {"token": token, "request_id": i + 1, "used": False, "created_at": datetime.utcnow()}
+            for i, token in enumerate(issued)
+        ])
+        session.commit()
+    engine.dispose()
+    return issued
+
+async def load(base_url: str, tokens: List[str], total: int, concurrency: int) -> Dict[str, List[float]]:
+    rng = random.Random(7)
+    unused = list(tokens)
+    rng.shuffle(unused)
+    plan = [rng.choices(("signup", "scan", "admin"), weights=(4, 4, 2))[0] for _ in range(total)]
+    latencies: Dict[str, List[float]] = {"signup": [], "scan": [], "admin": []}
+    queue: asyncio.Queue = asyncio.Queue()
+    for n, kind in enumerate(plan):
+        queue.put_nowait((n, kind))
+
+    cookies = {"session": create_session_token("admin")}
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, cookies=cookies, limits=limits, timeout=60) as client:
+        async def worker():
+            while not queue.empty():
+                n, kind = queue.get_nowait()
+                started = time.perf_counter()
+                if kind == "signup":
+                    response = await client.post("/request-access", data={
+                        "first_name": "Load", "last_name": f"Test{n}",
+                        "email": f"load{n}@example.com", "instagram": f"load{n}"
+                    })
+                elif kind == "scan":
+                    token = unused.pop() if unused else tokens[n % len(tokens)]
+                    response = await client.post(f"/api/scan/redeem/{token}", headers={"x-scanner-key": SCANNER_KEY})
+                else:
+                    response = await client.get("/admin")
+                response.raise_for_status()
+                latencies[kind].append(time.perf_counter() - started)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+async def run(target: str, guests: int, total: int, concurrency: int) -> Dict[str, List[float]]:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        tokens = seed(db_path, guests, guests // 2)
+        port = free_port()
+        server = start_uvicorn(
+            target, port, DATABASE_URL=f"sqlite:///{db_path}", SCANNER_API_KEY=SCANNER_KEY, RATE_LIMIT_ENABLED="false"
+        )
+        try:
+            await wait_ready(f"http://127.0.0.1:{port}")
+            return await load(f"http://127.0.0.1:{port}", tokens, total, concurrency)
+        finally:
+            server.terminate()
+            server.wait()
+
+def report(name: str, latencies: Dict[str, List[float]]):
+    everything = [sample for samples in latencies.values() for sample in samples]
+    for kind, samples in [("all", everything)] + list(latencies.items()):
+        print(
+            f"{name:>6} {kind:>6}: n={len(samples):5d}  p50 {percentile(samples, 50) * 1000:8.2f}ms"
+            f"  p99 {percentile(samples, 99) * 1000:8.2f}ms"
+        )
+
+async def main(guests: int, total: int, concurrency: int):
+    print(f"guests={guests} requests={total} concurrency={concurrency}")
+    for name, target in (("sync", "benchmarks.bench_async_db:sync_app"), ("async", "app.main:app")):
+        report(name, await run(target, guests, total, concurrency))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--guests", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.guests, args.requests, args.concurrency))
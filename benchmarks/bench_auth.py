@@ -0,0 +1,132 @@
+"""
+Benchmark: admin polling latency while other admins log in
+Usage: python -m benchmarks.bench_auth [--logins 40] [--login-concurrency 8] [--pollers 10]
+
+"before" verifies bcrypt passwords on the event loop and re-checks the session
+HMAC on every request; "after" is app.main as shipped (bcrypt on a capped
+thread pool, verified sessions cached). Pollers hit /admin/qr-cache, which does
+nothing but authenticate, so its latency is the cost of auth plus time spent
+waiting for the event loop.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Annotated, Dict, List
+
+import httpx
+from fastapi import Depends, FastAPI, Form, HTTPException, Request
+from sqlmodel import Session, SQLModel, create_engine
+
+from app import crud
+from app.auth import create_session_token, verify_session_token
+from app.models import User
+from benchmarks.common import free_port, percentile, start_uvicorn, wait_ready
+
+PASSWORD = "bench-password"
+
+# The pre-change auth path, served by the "before" run
+before_app = FastAPI()
+
+def get_before_session():
+    with Session(before_app.state.engine) as session:
+        yield session
+
+@before_app.on_event("startup")
+def before_startup():
+    before_app.state.engine = create_engine(os.environ["DATABASE_URL"])
+
+@before_app.get("/health")
+async def before_health():
+    return {"status": "healthy"}
+
+@before_app.post("/admin/login")
+async def before_login(
+    username: Annotated[str, Form()],
+    password: Annotated[str, Form()],
+    session: Session = Depends(get_before_session)
+):
+    if not crud.authenticate_user(session, username, password):
+        raise HTTPException(status_code=401)
+    return {"session": create_session_token(username)}
+
+@before_app.get("/admin/qr-cache")
+async def before_poll(request: Request):
+    if not verify_session_token(request.cookies.get("session", "")):
+        raise HTTPException(status_code=401)
+    return {}
+
+def seed(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(username="admin", hashed_password=crud.get_password_hash(PASSWORD)))
+        session.commit()
+    engine.dispose()
+
+async def load(base_url: str, logins: int, login_concurrency: int, pollers: int) -> Dict[str, List[float]]:
+    latencies: Dict[str, List[float]] = {"login": [], "poll": []}
+    remaining = [logins]
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        async def login():
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                started = time.perf_counter()
+                response = await client.post(
+                    "/admin/login", data={"username": "admin", "password": PASSWORD}, follow_redirects=False
+                )
+                assert response.status_code in (200, 302), response.status_code
+                latencies["login"].append(time.perf_counter() - started)
+
+        async def poll():
+            cookies = {"session": create_session_token("admin")}
+            while not done.is_set():
+                started = time.perf_counter()
+                response = await client.get("/admin/qr-cache", cookies=cookies)
+                response.raise_for_status()
+                latencies["poll"].append(time.perf_counter() - started)
+
+        polling = [asyncio.create_task(poll()) for _ in range(pollers)]
+        await asyncio.gather(*(login() for _ in range(login_concurrency)))
+        done.set()
+        await asyncio.gather(*polling)
+    return latencies
+
+async def run(target: str, logins: int, login_concurrency: int, pollers: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        seed(db_path)
+        port = free_port()
+        server = start_uvicorn(target, port, DATABASE_URL=f"sqlite:///{db_path}")
+        try:
+            await wait_ready(f"http://127.0.0.1:{port}")
+            started = time.perf_counter()
+            latencies = await load(f"http://127.0.0.1:{port}", logins, login_concurrency, pollers)
+            return time.perf_counter() - started, latencies
+        finally:
+            server.terminate()
+            server.wait()
+
+async def main(logins: int, login_concurrency: int, pollers: int):
+    print(f"logins={logins} login_concurrency={login_concurrency} pollers={pollers}")
+    for name, target in (("before", "benchmarks.bench_auth:before_app"), ("after", "app.main:app")):
+        elapsed, latencies = await run(target, logins, login_concurrency, pollers)
+        polls = latencies["poll"]
+        print(
+            f"{name:>6}: {elapsed:6.2f}s  {logins / elapsed:6.1f} logins/s"
+            f"  login p50 {percentile(latencies['login'], 50) * 1000:7.1f}ms"
+            f"  | {len(polls) / elapsed:8.1f} polls/s"
+            f"  poll p50 {percentile(polls, 50) * 1000:7.2f}ms  p99 {percentile(polls, 99) * 1000:7.2f}ms"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--login-concurrency", type=int, default=8)
+    parser.add_argument("--pollers", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.login_concurrency, args.pollers))
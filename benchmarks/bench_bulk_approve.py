@@ -0,0 +1,61 @@
+"""
+Benchmark: looped single approvals vs. bulk approval, both sent by the outbox worker
+Usage: python -m benchmarks.bench_bulk_approve [--guests 500]
+"""
+
+import argparse
+import asyncio
+
+from sqlmodel import Session
+
+from app import crud
+from app.email_service import email_service
+from app.outbox import OutboxWorker
+from app.qr_service import qr_service
+from benchmarks.common import temp_engine, seed_requests, smtp_stub, timer
+
+def outbox_worker(engine) -> OutboxWorker:
+    worker = OutboxWorker(engine, email_service, qr_service)
+    # Every bench guest is @example.com; don't let the per-domain limit dominate
+    worker.domain_limiter.interval = 0
+    return worker
+
+async def approve_looped(engine, request_ids):
+    """Mirror POST /admin/approve/{id} once per guest, each invitation sent as the worker wakes"""
+    worker = outbox_worker(engine)
+    with Session(engine) as session:
+        for request_id in request_ids:
+            crud.approve_request(session, request_id)
+            await worker.drain_once()
+
+async def approve_bulk(engine, request_ids):
+    """Mirror POST /admin/approve-bulk, then let the outbox worker drain the queue"""
+    with Session(engine) as session:
+        crud.approve_requests(session, request_ids)
+
+    worker = outbox_worker(engine)
+    worker.batch_size = len(request_ids)
+    while await worker.drain_once():
+        pass
+
+async def main(guests: int):
+    results = {}
+    async with smtp_stub(email_service) as smtp:
+        for name, run in (("looped", approve_looped), ("bulk", approve_bulk)):
+            with temp_engine() as engine:
+                request_ids = seed_requests(engine, guests)
+                with timer(results, name):
+                    await run(engine, request_ids)
+        delivered = smtp.messages
+    qr_service.shutdown()
+
+    print(f"guests={guests} delivered={delivered} (both runs)")
+    for name, seconds in results.items():
+        print(f"{name:>8}: {seconds:8.3f}s  {guests / seconds:8.1f} approvals/s")
+    print(f" speedup: {results['looped'] / results['bulk']:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--guests", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.guests))
@@ -0,0 +1,102 @@
+"""
+Benchmark: concurrent sign-ups and door scans against differently tuned SQLite engines
+Usage: python -m benchmarks.bench_db_contention [--threads 16] [--ops 200]
+
+"default" is a plain create_engine() as the app used to have (rollback journal,
+synchronous=FULL); "tuned" adds WAL and the pragmas from app.database; "split"
+also routes writes through one BEGIN IMMEDIATE connection and reads through a
+read-only pool.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import text
+from sqlmodel import SQLModel, Session, create_engine
+
+from app.database import create_engines
+from benchmarks.common import percentile, seed_requests
+
+def build(kind: str, url: str):
+    if kind == "default":
+        engine = create_engine(url)
+        return engine, engine
+    return create_engines(url, split=(kind == "split"))
+
+def worker(writer, reader, worker_id: int, ops: int, existing: int, latencies, errors):
+    rng = random.Random(worker_id)
+    for i in range(ops):
+        started = time.perf_counter()
+        try:
+            if rng.random() < 0.7:
+                # Sign-up: duplicate check, then insert
+                email = f"w{worker_id}-{i}@example.com"
+                with Session(writer) as session:
+                    session.execute(text("SELECT id FROM accessrequest WHERE email = :email"), {"email": email}).first()
+                    session.execute(
+                        text("INSERT INTO accessrequest (first_name, last_name, email, instagram, approved, created_at) "
+                             "VALUES ('Load', 'Test', :email, :email, 0, CURRENT_TIMESTAMP)"),
+                        {"email": email}
+                    )
+                    session.commit()
+            elif rng.random() < 0.5:
+                # Door scan: conditional update
+                with Session(writer) as session:
+                    session.execute(
+                        text("UPDATE accessrequest SET approved = 1 WHERE id = :id AND approved = 0"),
+                        {"id": rng.randrange(1, existing + 1)}
+                    )
+                    session.commit()
+            else:
+                # Admin list page
+                with Session(reader) as session:
+                    session.execute(text("SELECT * FROM accessrequest ORDER BY created_at DESC, id DESC LIMIT 50")).all()
+        except Exception as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+def run(kind: str, threads: int, ops: int, existing: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        writer, reader = build(kind, url)
+        SQLModel.metadata.create_all(writer)
+        seed_requests(writer, existing)
+
+        latencies, errors = [], []
+        pool = [
+            threading.Thread(target=worker, args=(writer, reader, n, ops, existing, latencies, errors))
+            for n in range(threads)
+        ]
+        started = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        writer.dispose()
+        reader.dispose()
+    return elapsed, latencies, errors
+
+def main(threads: int, ops: int, existing: int):
+    total = threads * ops
+    print(f"threads={threads} ops/thread={ops} total={total}")
+    for kind in ("default", "tuned", "split"):
+        elapsed, latencies, errors = run(kind, threads, ops, existing)
+        print(
+            f"{kind:>8}: {elapsed:7.2f}s  {total / elapsed:8.1f} ops/s"
+            f"  p50 {percentile(latencies, 50) * 1000:7.2f}ms  p99 {percentile(latencies, 99) * 1000:8.2f}ms"
+            f"  errors {len(errors)}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--existing", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.threads, args.ops, args.existing)
@@ -0,0 +1,108 @@
+"""
+Benchmark: invitation messages built per second
+Usage: python -m benchmarks.bench_email_build [--guests 10000]
+
+"before" is the previous builder: an inline HTML f-string and a new
+MIMEMultipart tree per guest, flattened to bytes as SMTP needs them. "after"
+is EmailService.build_invitation_message, which substitutes the guest's
+fields into pre-rendered Jinja templates inside a pre-serialized MIME
+skeleton. Both attach the same real QR PNG, so only message building is timed.
+"""
+
+import argparse
+import time
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from app.email_service import EmailService
+from app.qr_service import qr_service
+
+def build_before(from_email: str, to_email: str, guest_name: str, qr_code_bytes: bytes, fallback_url: str) -> bytes:
+    """The pre-template builder, condensed to the same structure and size"""
+    msg = MIMEMultipart()
+    msg["From"] = from_email
+    msg["To"] = to_email
+    msg["Subject"] = "🌊 Terrace After-Party Invitation - You're Approved! ✨"
+    body = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; text-align: center; color: white;">
+                <h1 style="margin: 0; font-size: 28px;">🌊 You're Invited! ✨</h1>
+                <p style="margin: 10px 0 0 0; font-size: 18px;">Terrace After-Party by the Sea</p>
+            </div>
+            <div style="padding: 30px; background: #f8f9fa;">
+                <h2 style="color: #333;">Hey {guest_name}! 👋</h2>
+                <p style="font-size: 16px; line-height: 1.6; color: #555;">
+                    Your request has been <strong>approved</strong>! Get ready for an unforgettable night
+                    on our seaside terrace starting at <strong>midnight (00:00)</strong>.
+                </p>
+                <div style="background: white; padding: 20px; border-radius: 10px; margin: 20px 0; text-align: center; border: 2px dashed #667eea;">
+                    <h3 style="color: #667eea; margin-top: 0;">Your Personal QR Code</h3>
+                    <p style="color: #666; margin-bottom: 15px;">
+                        Show this QR code at the entrance. <strong>One-time use only!</strong>
+                    </p>
+                    <p style="font-size: 14px; color: #999;">
+                        QR code is attached to this email as an image.
+                    </p>
+                </div>
+                <div style="background: #e3f2fd; padding: 15px; border-radius: 8px; margin: 20px 0;">
+                    <h4 style="color: #1976d2; margin-top: 0;">Backup Access Link:</h4>
+                    <a href="{fallback_url}" style="color: #1976d2; text-decoration: none; font-weight: bold;">
+                        {fallback_url}
+                    </a>
+                    <p style="font-size: 14px; color: #666; margin-bottom: 0;">
+                        Use this link if you can't scan the QR code.
+                    </p>
+                </div>
+                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd;">
+                    <p style="color: #666; font-size: 14px; margin: 0;">
+                        🌊 See you at midnight on the terrace! 🥂<br>
+                        Questions? Just reply to this email.
+                    </p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+    msg.attach(MIMEText(body, "html"))
+    qr_attachment = MIMEImage(qr_code_bytes, _subtype="png")
+    qr_attachment.add_header("Content-Disposition", "attachment", filename="invitation-qr-code.png")
+    msg.attach(qr_attachment)
+    return msg.as_bytes()
+
+def main(guests: int):
+    service = EmailService()
+    service.from_email = "party@example.com"
+    qr_code_bytes = qr_service.generate_qr_code("bench-token")
+    guest_list = [
+        (f"guest{i}@example.com", f"Guest{i} Bench", qr_service.build_url(f"token-{i}"), "it" if i % 2 else "en")
+        for i in range(guests)
+    ]
+
+    results = {}
+    started = time.perf_counter()
+    sizes = [
+        len(build_before(service.from_email, to_email, name, qr_code_bytes, url))
+        for to_email, name, url, _ in guest_list
+    ]
+    results["before"] = (time.perf_counter() - started, sum(sizes) / guests)
+
+    service.templates.get("en"), service.templates.get("it")  # compile outside the timing
+    started = time.perf_counter()
+    sizes = [
+        len(service.build_invitation_message(to_email, name, qr_code_bytes, url, locale).data)
+        for to_email, name, url, locale in guest_list
+    ]
+    results["after"] = (time.perf_counter() - started, sum(sizes) / guests)
+
+    print(f"guests={guests} (after: half en, half it; with plain-text part)")
+    for name, (seconds, size) in results.items():
+        print(f"{name:>7}: {seconds:7.3f}s  {guests / seconds:9.1f} messages/s  {size / 1024:5.1f} KiB/message")
+    print(f"speedup: {results['before'][0] / results['after'][0]:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--guests", type=int, default=10000)
+    args = parser.parse_args()
+    main(args.guests)
@@ -0,0 +1,119 @@
+"""
+Benchmark: current-event queries as past events pile up, before and after archiving
+Usage: python -m benchmarks.bench_events [--events 10] [--guests 20000] [--pages 200]
+
+Seeds --events events of --guests requests each (half approved with a token,
+a fifth of those checked in); the newest is the current event. Times the
+admin page queries (first page of the list, filtered by status, and the
+counters) scoped to the current event, and the hot database's size; then
+archives every past event and times them again, along with reading an
+archived event back from its file.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+from app import crud
+from app.archive import EventArchive
+from app.models import AccessRequest, QRToken
+from benchmarks.common import temp_engine
+
+def seed(engine, events: int, guests: int) -> list:
+    """Insert the events with executemany, oldest first; returns their IDs"""
+    event_ids = []
+    started = datetime(2024, 1, 1)
+    with Session(engine) as session:
+        for e in range(events):
+            event_ids.append(crud.create_event(session, f"Party {e + 1}").id)
+        connection = session.connection()
+        next_id = 1
+        for e, event_id in enumerate(event_ids):
+            base = started + timedelta(days=30 * e)
+            requests, tokens = [], []
+            for i in range(guests):
+                approved = i % 2 == 0
+                requests.append({
+                    "id": next_id, "event_id": event_id, "first_name": f"Guest{i}", "last_name": "Bench",
+                    "email": f"guest{i}@example.com", "instagram": f"guest{i}",
+                    "email_key": f"guest{i}@example.com", "instagram_key": f"guest{i}",
+                    "approved": approved, "created_at": base + timedelta(seconds=i),
+                    "approved_at": base + timedelta(seconds=i + 60) if approved else None,
+                })
+                if approved:
+                    used = i % 10 == 0
+                    tokens.append({
+                        "token": f"tok-{next_id}", "request_id": next_id, "event_id": event_id,
+                        "used": used, "used_at": base + timedelta(days=1) if used else None,
+                        "created_at": base,
+                    })
+                next_id += 1
+            connection.execute(AccessRequest.__table__.insert(), requests)
+            connection.execute(QRToken.__table__.insert(), tokens)
+        session.commit()
+    return event_ids
+
+def time_queries(engine, event_id: int, pages: int) -> dict:
+    results = {}
+    with Session(engine) as session:
+        for name, fn in (
+            ("list all", lambda: crud.list_requests(session, limit=50, event_id=event_id)),
+            ("list pending", lambda: crud.list_requests(session, "pending", limit=50, event_id=event_id)),
+            ("list checked in", lambda: crud.list_requests(session, "used", limit=50, event_id=event_id)),
+            ("counters", lambda: crud.count_requests(session, event_id)),
+        ):
+            fn()
+            started = time.perf_counter()
+            for _ in range(pages):
+                fn()
+            results[name] = (time.perf_counter() - started) / pages * 1000
+    return results
+
+def database_size(engine) -> float:
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(engine.url.database) / 2**20
+
+def main(events: int, guests: int, pages: int):
+    print(f"events={events} guests={guests}/event pages={pages}")
+    with temp_engine() as engine, tempfile.TemporaryDirectory() as archive_dir:
+        event_ids = seed(engine, events, guests)
+        current = event_ids[-1]
+        before = time_queries(engine, current, pages)
+        size_before = database_size(engine)
+
+        archive = EventArchive(archive_dir)
+        started = time.perf_counter()
+        for event_id in event_ids[:-1]:
+            archive.archive(engine, event_id)
+        seconds = time.perf_counter() - started
+        after = time_queries(engine, current, pages)
+        size_after = database_size(engine)
+
+        print(f"archived {events - 1} events in {seconds:.1f}s ({seconds / max(events - 1, 1) * 1000:.0f}ms each)")
+        print(f"hot database {size_before:.1f} MiB -> {size_after:.1f} MiB (pages reused, not returned)")
+        print(f"{'current event':<18}{'before':>10}{'after':>10}")
+        for name in before:
+            print(f"{name:<18}{before[name]:>8.2f}ms{after[name]:>8.2f}ms")
+
+        with Session(engine) as session:
+            past = crud.get_event(session, event_ids[0])
+        archive.run(past, crud.count_requests)
+        started = time.perf_counter()
+        for _ in range(pages):
+            archive.run(past, crud.list_requests, None, None, None, 50, past.id)
+        print(f"{'archived list all':<18}{(time.perf_counter() - started) / pages * 1000:>18.2f}ms"
+              f"  ({os.path.getsize(past.archive_path) / 2**20:.1f} MiB file)")
+        archive.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=10)
+    parser.add_argument("--guests", type=int, default=20000)
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+    main(args.events, args.guests, args.pages)
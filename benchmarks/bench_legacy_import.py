@@ -0,0 +1,68 @@
+"""
+Benchmark: importing a large legacy data/database.json
+Usage: python -m benchmarks.bench_legacy_import [--records 1000000] [--batch-size 5000]
+
+Writes a synthetic dump in the Node app's layout (--records requests, a token
+for every other one), imports it into a throwaway database, imports it again
+(all updates), and reports records/s with the process's peak RSS, which should
+stay flat whatever the size of the file.
+"""
+
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+
+from app.legacy_import import migrate
+from benchmarks.common import temp_engine
+
+def peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def write_dump(path: str, records: int):
+    """Stream a database.json to disk without holding it in memory"""
+    with open(path, "w") as file:
+        file.write('{"admin": {"username": "admin", "password": "x"}, "requests": [')
+        for i in range(records):
+            file.write(("," if i else "") + json.dumps({
+                "firstName": f"Guest{i}", "lastName": "Legacy", "email": f"guest{i}@example.com",
+                "instagram": f"guest{i}", "id": f"req_{i}", "approved": i % 2 == 0,
+                "createdAt": "2025-07-29T18:38:39.510Z",
+                "approvedAt": "2025-07-29T18:39:29.115Z" if i % 2 == 0 else None
+            }))
+        file.write('], "tokens": [')
+        for n, i in enumerate(range(0, records, 2)):
+            file.write(("," if n else "") + json.dumps({
+                "token": f"qr_guest{i}_{i:08x}", "requestId": f"req_{i}", "used": i % 10 == 0,
+                "createdAt": "2025-07-29T18:39:29.115Z"
+            }))
+        file.write('], "sessions": {}}')
+
+def main(records: int, batch_size: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "database.json")
+        started = time.perf_counter()
+        write_dump(path, records)
+        size = os.path.getsize(path)
+        print(
+            f"records={records} batch_size={batch_size}  dump {size / 2**20:.0f} MiB"
+            f" written in {time.perf_counter() - started:.1f}s  peak RSS {peak_rss_mib():.0f} MiB"
+        )
+
+        with temp_engine() as engine:
+            for run in ("import", "re-import"):
+                report = migrate(engine, path, batch_size).to_dict()
+                print(
+                    f"{run:>9}: {report['requests']:,} requests + {report['tokens']:,} tokens"
+                    f" in {report['seconds']:.1f}s  {report['records_per_second']:,} records/s"
+                    f"  peak RSS {peak_rss_mib():.0f} MiB"
+                )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    main(args.records, args.batch_size)
@@ -0,0 +1,124 @@
+"""
+Load test: requests per second on the public sign-up page, rendered per hit vs. cached
+Usage: python -m benchmarks.bench_pages [--seconds 10] [--concurrency 20]
+
+"render" is GET / the way app.main used to serve it, through Jinja on every
+request; "cached" is GET / as shipped, answered from PageCache. Both are routes
+of one app.main under uvicorn, behind the same middleware, and are loaded
+three ways: a browser asking for compressed pages (Accept-Encoding: gzip, br),
+a client taking identity, and revalidation with If-None-Match, which the cached
+page answers with 304. Bytes are the mean response body size on the wire.
+
+The per-hit cost is then measured on its own, without HTTP: on a small machine
+the server's request handling and the load generator, not the page, cap the
+uvicorn numbers.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+from fastapi import Request
+from fastapi.responses import HTMLResponse
+
+from app.http_cache import PageCache
+from app.main import app, templates
+from benchmarks.common import free_port, percentile, start_uvicorn, wait_ready
+
+# The page rendered on every hit, served by the "render" run
+@app.get("/bench/rendered", response_class=HTMLResponse)
+async def rendered_home(request: Request):
+    return templates.TemplateResponse("request_access.html", {"request": request})
+
+PATHS = {"render": "/bench/rendered", "cached": "/"}
+
+LOADS = {
+    "compressed": {"accept-encoding": "gzip, br"},
+    "identity": {"accept-encoding": "identity"},
+    "revalidate": {"accept-encoding": "gzip, br"},
+}
+
+async def load(base_url: str, path: str, seconds: float, concurrency: int, headers: Dict[str, str]) -> Tuple[List[float], int]:
+    latencies: List[float] = []
+    sizes = [0]
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await asyncio.gather(*(client.get("/health") for _ in range(concurrency)))
+        deadline = time.monotonic() + seconds
+
+        async def client_loop():
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                async with client.stream("GET", path, headers=headers) as response:
+                    async for chunk in response.aiter_raw():
+                        sizes[0] += len(chunk)
+                if response.status_code not in (200, 304):
+                    response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return latencies, sizes[0] // max(len(latencies), 1)
+
+async def run(seconds: float, concurrency: int) -> Dict[Tuple[str, str], Tuple[List[float], int]]:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        server = start_uvicorn(
+            "benchmarks.bench_pages:app", port, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            RATE_LIMIT_ENABLED="false", PRERENDER_ENABLED="false"
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            await wait_ready(base_url)
+            for name, path in PATHS.items():
+                for load_name, headers in LOADS.items():
+                    headers = dict(headers)
+                    if load_name == "revalidate":
+                        async with httpx.AsyncClient(base_url=base_url) as client:
+                            etag = (await client.get(path, headers=headers)).headers.get("etag")
+                        if etag:
+                            headers["if-none-match"] = etag
+                    results[name, load_name] = await load(base_url, path, seconds, concurrency, headers)
+        finally:
+            server.terminate()
+            server.wait()
+    return results
+
+def per_hit(count: int) -> Dict[str, float]:
+    """Microseconds to produce the page: Jinja render vs. a cache hit"""
+    template = templates.get_template("request_access.html")
+    cache = PageCache(templates.env)
+    cache.get("request_access.html")
+    timings = {}
+    started = time.perf_counter()
+    for _ in range(count):
+        template.render({}).encode()
+    timings["render"] = (time.perf_counter() - started) / count * 1e6
+    started = time.perf_counter()
+    for _ in range(count):
+        cache.get("request_access.html")
+    timings["cached"] = (time.perf_counter() - started) / count * 1e6
+    return timings
+
+async def main(seconds: float, concurrency: int):
+    print(f"seconds={seconds} concurrency={concurrency}")
+    for (name, load_name), (latencies, size) in (await run(seconds, concurrency)).items():
+        print(
+            f"{name:>7} {load_name:>10}: {len(latencies) / seconds:8.1f} req/s  {size:6d} bytes"
+            f"  p50 {percentile(latencies, 50) * 1000:6.1f}ms  p99 {percentile(latencies, 99) * 1000:6.1f}ms"
+        )
+
+    print("page only:")
+    for name, micros in per_hit(2000).items():
+        print(f"{name:>7}: {micros:8.1f}us")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.seconds, args.concurrency))
@@ -0,0 +1,82 @@
+"""
+Benchmark: time from approval to invitation handed to SMTP, with and without pre-rendering
+Usage: python -m benchmarks.bench_prerender [--guests 300] [--pace 0.01]
+
+An admin approves guests one by one (POST /admin/approve/{id}), one every
+--pace seconds, while the outbox worker sends in the background. "on demand"
+renders each QR code and builds each email after approval; "prerendered"
+first lets InvitationPrerenderer prepare tokens, QR codes and emails for the
+pending requests (timed separately, as idle-time work), so approval and
+sending only move prepared data.
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlmodel import Session
+
+from app import crud
+from app.email_service import email_service
+from app.outbox import OutboxWorker
+from app.prerender import InvitationPrerenderer
+from app.qr_service import qr_service
+from benchmarks.common import percentile, seed_requests, smtp_stub, temp_engine
+
+async def run(guests: int, pace: float, prerender: bool):
+    with temp_engine() as engine:
+        request_ids = seed_requests(engine, guests)
+        prerenderer = InvitationPrerenderer(engine, email_service, qr_service)
+        prerenderer.max_bytes = 1 << 30
+
+        prepare_seconds = 0.0
+        if prerender:
+            started = time.perf_counter()
+            while await prerenderer.prepare_batch():
+                pass
+            prepare_seconds = time.perf_counter() - started
+
+        worker = OutboxWorker(engine, email_service, qr_service, prerenderer)
+        worker.domain_limiter.interval = 0
+        worker.poll_interval = 0.05
+        worker.start()
+
+        def approve(request_id: int):
+            with Session(engine) as session:
+                crud.approve_request(session, request_id, prerenderer.claim_token(request_id))
+
+        approve_latencies = []
+        for request_id in request_ids:
+            started = time.perf_counter()
+            await asyncio.to_thread(approve, request_id)
+            approve_latencies.append(time.perf_counter() - started)
+            worker.wake()
+            await asyncio.sleep(pace)
+
+        while True:
+            with Session(engine) as session:
+                stats = crud.get_outbox_stats(session, latency_sample=guests)
+            if stats["sent"] == guests:
+                break
+            await asyncio.sleep(0.05)
+        await worker.stop()
+    return prepare_seconds, approve_latencies, stats
+
+async def main(guests: int, pace: float):
+    print(f"guests={guests} pace={pace * 1000:.0f}ms")
+    async with smtp_stub(email_service):
+        for name, prerender in (("on demand", False), ("prerendered", True)):
+            prepare_seconds, approve_latencies, stats = await run(guests, pace, prerender)
+            print(
+                f"{name:>12}: prepare {prepare_seconds:6.2f}s"
+                f"  approve p50 {percentile(approve_latencies, 50) * 1000:6.2f}ms"
+                f"  approval->sent p50 {stats['latency_p50'] * 1000:7.1f}ms p95 {stats['latency_p95'] * 1000:7.1f}ms"
+            )
+    qr_service.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--guests", type=int, default=300)
+    parser.add_argument("--pace", type=float, default=0.01)
+    args = parser.parse_args()
+    asyncio.run(main(args.guests, args.pace))
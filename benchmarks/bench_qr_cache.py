@@ -0,0 +1,42 @@
+"""
+Microbenchmark: repeated QR renders with and without the cache
+Usage: python -m benchmarks.bench_qr_cache [--tokens 200] [--repeats 5]
+"""
+
+import argparse
+import uuid
+
+from app.qr_service import QRService
+from benchmarks.common import timer
+
+def render_all(qr_service: QRService, tokens, repeats: int):
+    for _ in range(repeats):
+        for token in tokens:
+            qr_service.generate_qr_code(token)
+
+def main(count: int, repeats: int):
+    tokens = [str(uuid.uuid4()) for _ in range(count)]
+    results = {}
+
+    uncached = QRService()
+    uncached.cache.max_bytes = 0
+    with timer(results, "uncached"):
+        render_all(uncached, tokens, repeats)
+
+    cached = QRService()
+    with timer(results, "cached"):
+        render_all(cached, tokens, repeats)
+
+    renders = count * repeats
+    print(f"tokens={count} repeats={repeats} renders={renders}")
+    for name, seconds in results.items():
+        print(f"{name:>9}: {seconds:7.3f}s  {renders / seconds:10.1f} renders/s")
+    print(f"  speedup: {results['uncached'] / results['cached']:.1f}x")
+    print(f"    cache: {cached.cache.stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    main(args.tokens, args.repeats)
@@ -0,0 +1,42 @@
+"""
+Benchmark: QR rendering backends (PIL vs. direct PNG vs. SVG), cache disabled
+Matrix encoding is shared by every backend, so it is timed separately.
+Usage: python -m benchmarks.bench_qr_render [--tokens 300]
+"""
+
+import argparse
+import uuid
+
+from app.qr_render import BACKENDS, build_qr
+from app.qr_service import QRService
+from benchmarks.common import timer
+
+def main(count: int):
+    base = QRService()
+    urls = [base.build_url(str(uuid.uuid4())) for _ in range(count)]
+
+    results = {}
+    with timer(results, "encode"):
+        matrices = [build_qr(url, base.border, base.error_correction).get_matrix() for url in urls]
+
+    sizes = {}
+    for backend, level in (("pil", 6), ("png", 1), ("png", 6), ("png", 9), ("svg", 0)):
+        name = f"{backend}/z{level}" if backend != "svg" else backend
+        render = BACKENDS[backend].render
+        with timer(results, name):
+            images = [render(matrix, base.box_size, level) for matrix in matrices]
+        sizes[name] = sum(len(image) for image in images) / len(images)
+
+    print(f"tokens={count} box_size={base.box_size} border={base.border}")
+    print(f"  encode: {results['encode'] * 1000 / count:7.3f} ms/code  (matrix build, shared by all backends)")
+    for name, seconds in results.items():
+        if name == "encode":
+            continue
+        print(f"{name:>8}: {seconds * 1000 / count:7.3f} ms/code  {sizes[name]:7.0f} bytes  "
+              f"{results['pil/z6'] / seconds:6.1f}x vs pil")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=300)
+    args = parser.parse_args()
+    main(args.tokens)
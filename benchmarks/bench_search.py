@@ -0,0 +1,93 @@
+"""
+Benchmark: FTS5 guest search against LIKE scans
+Usage: python -m benchmarks.bench_search [--rows 100000] [--queries 200]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+from app.models import AccessRequest
+from app.search import like_search, search_requests
+from benchmarks.common import percentile, temp_engine, timer
+
+FIRST_NAMES = ["Nicolò", "Niccolò", "Andrea", "Giulia", "Chiara", "Lorenzo", "Sofia", "Mattia",
+               "Francesca", "Gabriele", "Aurora", "Tommaso", "Ginevra", "Riccardo", "Beatrice", "Zoë"]
+LAST_NAMES = ["Rossi", "Russo", "Ferrari", "Esposito", "Bianchi", "Romano", "Colombo", "Ricci",
+              "Marino", "Greco", "Bruno", "Gallo", "Conti", "De Luca", "Mancini", "Costa", "Fabbrò"]
+DOMAINS = ["gmail.com", "libero.it", "hotmail.it", "icloud.com", "example.com"]
+
+def seed(engine, rows: int, rng: random.Random):
+    """Bulk insert guest requests (the FTS triggers index them as they go)"""
+    start = datetime(2024, 1, 1)
+    mappings = []
+    for i in range(rows):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        handle = f"{first}_{last}{i}".lower().replace(" ", "")
+        mappings.append({
+            "first_name": first,
+            "last_name": last,
+            "email": f"{handle}@{rng.choice(DOMAINS)}",
+            "instagram": handle,
+            "approved": False,
+            "created_at": start + timedelta(seconds=i),
+        })
+    with Session(engine) as session:
+        session.bulk_insert_mappings(AccessRequest, mappings)
+        session.commit()
+
+def make_queries(count: int, rows: int, rng: random.Random):
+    """What admins type at the door: name prefixes, accentless names, handle fragments"""
+    queries = []
+    for _ in range(count):
+        kind = rng.randrange(3)
+        if kind == 0:
+            queries.append(rng.choice(FIRST_NAMES)[:4] + " " + rng.choice(LAST_NAMES)[:3])
+        elif kind == 1:
+            queries.append("nicolo ross")
+        else:
+            queries.append(f"{rng.choice(LAST_NAMES).lower().replace(' ', '')}{rng.randrange(rows)}")
+    return queries
+
+def run(session, search, queries, latencies):
+    for query in queries:
+        started = time.perf_counter()
+        search(session, query, 20)
+        latencies.append(time.perf_counter() - started)
+
+def main(rows: int, count: int):
+    rng = random.Random(42)
+    queries = make_queries(count, rows, rng)
+    results = {}
+    latencies = {"fts": [], "like": []}
+
+    with temp_engine() as engine:
+        with timer(results, "seed"):
+            seed(engine, rows, rng)
+        with Session(engine) as session:
+            # Warm the page cache so both sides are measured hot
+            run(session, search_requests, queries[:5], [])
+            run(session, like_search, queries[:5], [])
+            with timer(results, "fts"):
+                run(session, search_requests, queries, latencies["fts"])
+            with timer(results, "like"):
+                run(session, like_search, queries, latencies["like"])
+
+    print(f"rows={rows} queries={count} (seeded in {results['seed']:.1f}s)")
+    for name in ("fts", "like"):
+        samples = latencies[name]
+        print(
+            f"{name:>5}: {results[name]:7.3f}s  p50 {percentile(samples, 50) * 1000:7.2f}ms"
+            f"  p95 {percentile(samples, 95) * 1000:7.2f}ms"
+        )
+    print(f"speedup: {results['like'] / results['fts']:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    main(args.rows, args.queries)
@@ -0,0 +1,166 @@
+"""
+Load test: sustained public sign-ups per second
+Usage: python -m benchmarks.bench_signup [--seconds 10] [--concurrency 20] [--duplicates 0.2]
+
+"single" stores each submission in its own transaction (the previous
+POST /request-access); "batched" is app.main as shipped, where submissions are
+queued and written in grouped, deduplicating inserts. Both run under uvicorn;
+a share of submissions reuse an earlier email to exercise dedupe.
+
+The write path is then measured on its own, without HTTP: on a small machine
+the server's request handling, not the database, caps the uvicorn numbers.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from typing import Annotated, Dict, List
+
+import httpx
+from fastapi import Depends, FastAPI, Form, Request
+from fastapi.templating import Jinja2Templates
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, SQLModel, create_engine, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import async_crud, crud
+from app.database import create_engines, get_async_session
+from app.ingest import SignupIngestor
+from app.models import AccessRequest
+from app.schemas import AccessRequestCreate
+from benchmarks.common import free_port, percentile, start_uvicorn, wait_ready
+
+# One transaction per submission, served by the "single" run
+single_app = FastAPI()
+templates = Jinja2Templates(directory="templates")
+
+@single_app.get("/health")
+async def single_health():
+    return {"status": "healthy"}
+
+@single_app.post("/request-access")
+async def single_request_access(
+    request: Request,
+    first_name: Annotated[str, Form()],
+    last_name: Annotated[str, Form()],
+    email: Annotated[str, Form()],
+    instagram: Annotated[str, Form()],
+    session: AsyncSession = Depends(get_async_session)
+):
+    try:
+        await async_crud.create_access_request(session, AccessRequestCreate(
+            first_name=first_name, last_name=last_name, email=email, instagram=instagram
+        ))
+    except IntegrityError:
+        await session.rollback()
+    return templates.TemplateResponse("request_access.html", {
+        "request": request, "success": True,
+        "message": "Your request has been submitted! You'll receive an email if approved."
+    })
+
+async def load(base_url: str, seconds: float, concurrency: int, duplicates: float) -> Dict[str, List[float]]:
+    rng = random.Random(3)
+    counter = [0]
+    latencies: List[float] = []
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        # Open every connection before the clock starts
+        await asyncio.gather(*(client.get("/health") for _ in range(concurrency)))
+        deadline = time.monotonic() + seconds
+
+        async def client_loop():
+            while time.monotonic() < deadline:
+                counter[0] += 1
+                n = counter[0]
+                if n > 10 and rng.random() < duplicates:
+                    n = rng.randrange(1, n)
+                started = time.perf_counter()
+                response = await client.post("/request-access", data={
+                    "first_name": "Fan", "last_name": f"Number{n}",
+                    "email": f"fan{n}@example.com", "instagram": f"@fan{n}"
+                })
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return {"submit": latencies}
+
+async def run(target: str, seconds: float, concurrency: int, duplicates: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        engine = create_engine(f"sqlite:///{db_path}")
+        SQLModel.metadata.create_all(engine)
+
+        port = free_port()
+        server = start_uvicorn(target, port, DATABASE_URL=f"sqlite:///{db_path}")
+        try:
+            await wait_ready(f"http://127.0.0.1:{port}")
+            latencies = (await load(f"http://127.0.0.1:{port}", seconds, concurrency, duplicates))["submit"]
+        finally:
+            server.terminate()
+            server.wait()
+
+        with Session(engine) as session:
+            stored = session.exec(select(func.count(AccessRequest.id))).one()
+        engine.dispose()
+    return latencies, stored
+
+async def write_path(count: int, duplicates: float):
+    """Submissions/s through one transaction each vs. the ingestor, no HTTP involved"""
+    rng = random.Random(5)
+    requests = []
+    for n in range(count):
+        if n > 10 and rng.random() < duplicates:
+            n = rng.randrange(n)
+        requests.append(AccessRequestCreate(
+            first_name="Fan", last_name=f"Number{n}", email=f"fan{n}@example.com", instagram=f"@fan{n}"
+        ))
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("single", "batched"):
+            engine, _ = create_engines(f"sqlite:///{os.path.join(tmp, name + '.db')}", split=True)
+            SQLModel.metadata.create_all(engine)
+            started = time.perf_counter()
+            if name == "single":
+                def insert_each():
+                    with Session(engine) as session:
+                        for request in requests:
+                            try:
+                                crud.create_access_request(session, request)
+                            except IntegrityError:
+                                session.rollback()
+                await asyncio.to_thread(insert_each)
+            else:
+                ingestor = SignupIngestor(engine)
+                ingestor.start()
+                await asyncio.gather(*(ingestor.submit(request) for request in requests))
+                await ingestor.stop()
+            results[name] = count / (time.perf_counter() - started)
+            engine.dispose()
+    return results
+
+async def main(seconds: float, concurrency: int, duplicates: float):
+    print(f"seconds={seconds} concurrency={concurrency} duplicates={duplicates:.0%}")
+    for name, target in (("single", "benchmarks.bench_signup:single_app"), ("batched", "app.main:app")):
+        latencies, stored = await run(target, seconds, concurrency, duplicates)
+        print(
+            f"{name:>8}: {len(latencies) / seconds:8.1f} submissions/s  stored {stored:6d}"
+            f"  p50 {percentile(latencies, 50) * 1000:7.1f}ms  p99 {percentile(latencies, 99) * 1000:7.1f}ms"
+        )
+
+    print("write path only:")
+    for name, rate in (await write_path(5000, duplicates)).items():
+        print(f"{name:>8}: {rate:8.1f} submissions/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duplicates", type=float, default=0.2)
+    args = parser.parse_args()
+    asyncio.run(main(args.seconds, args.concurrency, args.duplicates))
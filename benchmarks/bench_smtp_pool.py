@@ -0,0 +1,65 @@
+"""
+Benchmark: one SMTP session per message vs. the persistent connection pool
+Usage: python -m benchmarks.bench_smtp_pool [--messages 500] [--concurrency 10]
+"""
+
+import argparse
+import asyncio
+from email.message import EmailMessage
+
+import aiosmtplib
+
+from app.email_service import email_service
+from benchmarks.common import smtp_stub, timer
+
+def make_message(i: int) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "bench@example.com"
+    msg["To"] = f"guest{i}@example.com"
+    msg["Subject"] = "Benchmark"
+    msg.set_content("x" * 2048)
+    return msg
+
+async def send_unpooled(count: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send_one(i: int):
+        async with semaphore:
+            await aiosmtplib.send(
+                make_message(i),
+                hostname=email_service.smtp_server,
+                port=email_service.smtp_port,
+                start_tls=False
+            )
+
+    await asyncio.gather(*(send_one(i) for i in range(count)))
+
+async def send_pooled(count: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send_one(i: int):
+        async with semaphore:
+            msg = make_message(i)
+            await email_service.pool.send_raw(msg["From"], [msg["To"]], msg.as_bytes())
+
+    await asyncio.gather(*(send_one(i) for i in range(count)))
+
+async def main(count: int, concurrency: int):
+    results = {}
+    connections = {}
+    for name, run in (("unpooled", send_unpooled), ("pooled", send_pooled)):
+        async with smtp_stub(email_service) as smtp:
+            with timer(results, name):
+                await run(count, concurrency)
+            connections[name] = smtp.connections
+
+    print(f"messages={count} concurrency={concurrency} pool_size={email_service.pool_size}")
+    for name, seconds in results.items():
+        print(f"{name:>9}: {seconds:7.3f}s  {count / seconds:8.1f} msg/s  {connections[name]:5d} connections")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.concurrency))
@@ -0,0 +1,70 @@
+"""
+Benchmark: signed QR tokens vs. random UUIDs
+Usage: python -m benchmarks.bench_tokens [--guests 100000] [--scans 20000] [--renders 300]
+
+Rejecting a forged code: a UUID can only be checked by looking it up (a
+QRToken query on a table of --guests tokens), a signed token by its HMAC.
+Rendering: the QR code for a signed token's URL against a UUID's, with the QR
+version (size) each needs.
+"""
+
+import argparse
+import time
+import uuid
+
+from sqlmodel import Session
+
+from app import crud
+from app.qr_render import build_qr
+from app.qr_service import QRService
+from app.tokens import TokenSigner
+from benchmarks.common import seed_requests, temp_engine
+
+def per_second(count: int, seconds: float) -> str:
+    return f"{count / seconds:12,.0f}/s  {seconds / count * 1e6:8.2f}us each"
+
+def main(guests: int, scans: int, renders: int):
+    signer = TokenSigner()
+    print(f"guests={guests} scans={scans} renders={renders}")
+
+    with temp_engine() as engine:
+        request_ids = seed_requests(engine, guests)
+        with Session(engine) as session:
+            crud.approve_requests(session, request_ids)
+
+            forged = [str(uuid.uuid4()) for _ in range(scans)]
+            started = time.perf_counter()
+            for token in forged:
+                crud.get_qr_token(session, token)
+            print(f"reject forged UUID (lookup):  {per_second(scans, time.perf_counter() - started)}")
+
+    forged = [TokenSigner("attacker").issue(i) for i in range(scans)]
+    started = time.perf_counter()
+    for token in forged:
+        signer.is_plausible(token)
+    print(f"reject forged signed (HMAC):  {per_second(scans, time.perf_counter() - started)}")
+
+    qr_service = QRService()
+    for name, tokens in (
+        ("uuid", [str(uuid.uuid4()) for _ in range(renders)]),
+        ("signed", [signer.issue(100000 + i) for i in range(renders)]),
+    ):
+        url = qr_service.build_url(tokens[0])
+        version = build_qr(url, qr_service.border, qr_service.error_correction).version
+        started = time.perf_counter()
+        for token in tokens:
+            qr_service.cache.clear()
+            qr_service.generate_qr_code(token)
+        seconds = time.perf_counter() - started
+        print(
+            f"render {name:>6}: {len(url)} char URL, QR version {version}"
+            f"  {seconds / renders * 1000:6.2f}ms each"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--guests", type=int, default=100000)
+    parser.add_argument("--scans", type=int, default=20000)
+    parser.add_argument("--renders", type=int, default=300)
+    args = parser.parse_args()
+    main(args.guests, args.scans, args.renders)
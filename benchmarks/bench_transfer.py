@@ -0,0 +1,62 @@
+"""
+Benchmark: importing and exporting a large guest list in constant memory
+Usage: python -m benchmarks.bench_transfer [--rows 1000000] [--chunk-size 1000]
+
+Writes a promoter-style CSV with --rows rows (1% invalid emails), imports it
+with app.transfer.import_guests, then exports the guest list as CSV and JSON
+Lines. Peak RSS is printed after each phase; it should stay flat as --rows
+grows.
+"""
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from app import transfer
+from benchmarks.common import temp_engine
+
+def peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def write_csv(path: str, rows: int):
+    with open(path, "w", newline="") as file:
+        file.write("First Name,Last Name,Email,Instagram\n")
+        for i in range(rows):
+            email = f"fan{i}example.com" if i % 100 == 99 else f"fan{i}@example.com"
+            file.write(f"Fan,Number{i},{email},@fan{i}\n")
+
+def main(rows: int, chunk_size: int):
+    print(f"rows={rows} chunk_size={chunk_size}  baseline peak RSS {peak_rss_mib():.0f} MiB")
+    with tempfile.TemporaryDirectory() as tmp, temp_engine() as engine:
+        path = os.path.join(tmp, "promoter.csv")
+        write_csv(path, rows)
+
+        started = time.perf_counter()
+        with open(path, newline="") as file:
+            report = transfer.import_guests(engine, file, "csv", chunk_size)
+        elapsed = time.perf_counter() - started
+        print(
+            f"  import: {elapsed:7.2f}s  {rows / elapsed:9.0f} rows/s  inserted {report.inserted}"
+            f"  invalid {report.invalid} (kept {len(report.errors)})  peak RSS {peak_rss_mib():.0f} MiB"
+        )
+
+        for fmt in ("csv", "jsonl"):
+            started = time.perf_counter()
+            size = 0
+            with engine.connect() as connection:
+                for chunk in transfer.iter_export(connection, "guests", fmt):
+                    size += len(chunk)
+            elapsed = time.perf_counter() - started
+            print(
+                f"  export {fmt:>5}: {elapsed:7.2f}s  {report.inserted / elapsed:9.0f} rows/s"
+                f"  {size / 2**20:6.1f} MiB  peak RSS {peak_rss_mib():.0f} MiB"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.rows, args.chunk_size)
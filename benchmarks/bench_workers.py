@@ -0,0 +1,179 @@
+"""
+Benchmark: sign-up and door-scan throughput with 1, 4 and 8 uvicorn workers, SQLite vs. PostgreSQL
+Usage: python -m benchmarks.bench_workers [--seconds 10] [--concurrency 40] [--workers 1 4 8]
+                                          [--postgres-url postgresql://postgres@localhost/postgres]
+
+app.main runs under uvicorn with WEB_CONCURRENCY workers against a freshly
+migrated database seeded with approved guests and signed tokens; traffic is
+half sign-ups, half scans. Every token is scanned twice, back to back, so the
+two scans usually race in different workers: each token must be admitted
+exactly once. PostgreSQL runs use a throwaway database created on the server
+at --postgres-url (its maintenance database) and are skipped without it.
+
+On a machine with fewer cores than workers the extra processes only add
+contention; the numbers are meant for the deployment's own hardware.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List
+
+import httpx
+from sqlalchemy.engine import make_url
+from sqlmodel import Session, create_engine, func, select
+
+from app import crud
+from app.migrations import run_migrations
+from app.models import AccessRequest, QRToken
+from app.tokens import token_signer
+from benchmarks.common import free_port, percentile, start_uvicorn, wait_ready
+
+SCANNER_KEY = "bench-scanner-key"
+
+@contextmanager
+def database(backend: str, postgres_url: str) -> Iterator[str]:
+    """URL of an empty database, dropped afterwards"""
+    if backend == "sqlite":
+        with tempfile.TemporaryDirectory() as tmp:
+            yield f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        return
+    admin = create_engine(postgres_url, isolation_level="AUTOCOMMIT")
+    name = f"bench_{uuid.uuid4().hex[:12]}"
+    with admin.connect() as connection:
+        connection.exec_driver_sql(f'CREATE DATABASE "{name}"')
+    try:
+        yield make_url(postgres_url).set(database=name).render_as_string(hide_password=False)
+    finally:
+        with admin.connect() as connection:
+            connection.exec_driver_sql(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+        admin.dispose()
+
+def seed(url: str, guests: int) -> List[str]:
+    """Migrate, then insert approved guests with one signed, unused token each"""
+    engine = create_engine(url)
+    run_migrations(engine)
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        event_id = crud.get_current_event(session).id
+        connection = session.connection()
+        connection.execute(AccessRequest.__table__.insert(), [
+            {"id": i, "event_id": event_id, "first_name": f"Guest{i}", "last_name": "Load",
+             "email": f"guest{i}@example.com", "instagram": f"guest{i}", "email_key": f"guest{i}@example.com",
+             "instagram_key": f"guest{i}", "approved": True, "created_at": now, "approved_at": now}
+            for i in range(1, guests + 1)
+        ])
+        tokens = [token_signer.issue(i) for i in range(1, guests + 1)]
+        connection.execute(QRToken.__table__.insert(), [
+            {"token": token, "request_id": i, "event_id": event_id, "used": False, "created_at": now}
+            for i, token in enumerate(tokens, 1)
+        ])
+        if engine.dialect.name == "postgresql":
+            # Explicit IDs don't advance the sequence
+            connection.exec_driver_sql(
+                "SELECT setval(pg_get_serial_sequence('accessrequest', 'id'), (SELECT max(id) FROM accessrequest))"
+            )
+        session.commit()
+    engine.dispose()
+    return tokens
+
+async def load(base_url: str, tokens: List[str], seconds: float, concurrency: int) -> Dict:
+    rng = random.Random(11)
+    scans = [token for token in tokens for _ in range(2)]
+    scans.reverse()
+    counter = [0]
+    latencies: Dict[str, List[float]] = {"signup": [], "scan": []}
+    outcomes: Counter = Counter()
+    admitted: Counter = Counter()
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await asyncio.gather(*(client.get("/health") for _ in range(concurrency)))
+        deadline = time.monotonic() + seconds
+
+        async def client_loop():
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                if rng.random() < 0.5 or not scans:
+                    counter[0] += 1
+                    n = counter[0]
+                    response = await client.post("/request-access", data={
+                        "first_name": "Load", "last_name": f"Test{n}",
+                        "email": f"load{n}@example.com", "instagram": f"load{n}"
+                    })
+                    kind = "signup"
+                else:
+                    token = scans.pop()
+                    response = await client.post(
+                        f"/api/scan/redeem/{token}", headers={"x-scanner-key": SCANNER_KEY}
+                    )
+                    kind = "scan"
+                    status = response.json()["status"] if response.status_code == 200 else "error"
+                    outcomes[status] += 1
+                    if status == "admitted":
+                        admitted[token] += 1
+                response.raise_for_status()
+                latencies[kind].append(time.perf_counter() - started)
+
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return {"latencies": latencies, "outcomes": outcomes, "admitted": admitted}
+
+async def run(url: str, workers: int, guests: int, seconds: float, concurrency: int) -> Dict:
+    tokens = seed(url, guests)
+    port = free_port()
+    server = start_uvicorn(
+        "app.main:app", port, DATABASE_URL=url, WEB_CONCURRENCY=str(workers), SCANNER_API_KEY=SCANNER_KEY,
+        RATE_LIMIT_ENABLED="false"
+    )
+    try:
+        await wait_ready(f"http://127.0.0.1:{port}", timeout=60)
+        results = await load(f"http://127.0.0.1:{port}", tokens, seconds, concurrency)
+    finally:
+        server.terminate()
+        server.wait()
+
+    engine = create_engine(url)
+    with Session(engine) as session:
+        results["stored"] = session.exec(
+            select(func.count(AccessRequest.id)).where(AccessRequest.id > guests)
+        ).one()
+        results["used"] = session.exec(select(func.count(QRToken.id)).where(QRToken.used == True)).one()
+    engine.dispose()
+    return results
+
+def report(backend: str, workers: int, seconds: float, results: Dict):
+    latencies = results["latencies"]
+    twice = sum(1 for count in results["admitted"].values() if count > 1)
+    print(
+        f"{backend:>10} {workers:>2}w: signups {len(latencies['signup']) / seconds:7.1f}/s"
+        f" (stored {results['stored']:6d})  scans {len(latencies['scan']) / seconds:7.1f}/s"
+        f"  p50 {percentile(latencies['signup'] + latencies['scan'], 50) * 1000:6.1f}ms"
+        f"  p99 {percentile(latencies['signup'] + latencies['scan'], 99) * 1000:7.1f}ms"
+        f"  admitted {results['outcomes']['admitted']:5d} (used in db {results['used']:5d}, twice {twice})"
+        f"  rescans rejected {results['outcomes']['used']:5d}"
+    )
+
+async def main(seconds: float, concurrency: int, worker_counts: List[int], guests: int, postgres_url: str):
+    print(f"seconds={seconds} concurrency={concurrency} guests={guests} cpus={os.cpu_count()}")
+    backends = ["sqlite"] + (["postgresql"] if postgres_url else [])
+    for backend in backends:
+        for workers in worker_counts:
+            with database(backend, postgres_url) as url:
+                report(backend, workers, seconds, await run(url, workers, guests, seconds, concurrency))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--guests", type=int, default=20000)
+    parser.add_argument("--postgres-url", default=os.getenv("BENCH_POSTGRES_URL"))
+    args = parser.parse_args()
+    asyncio.run(main(args.seconds, args.concurrency, args.workers, args.guests, args.postgres_url))
@@ -0,0 +1,136 @@
+"""
+Shared helpers for the benchmark scripts
+Run the scripts from the repository root, e.g. `python -m benchmarks.bench_bulk_approve`
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, List, Dict
+
+from sqlmodel import SQLModel, Session, create_engine
+
+from app.models import AccessRequest
+
+@contextmanager
+def temp_engine() -> Iterator:
+    """Create a throwaway file-backed SQLite database with all tables"""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        try:
+            yield engine
+        finally:
+            engine.dispose()
+
+def seed_requests(engine, count: int) -> List[int]:
+    """Insert `count` pending access requests and return their IDs"""
+    with Session(engine) as session:
+        requests = [
+            AccessRequest(
+                first_name=f"Guest{i}",
+                last_name="Bench",
+                email=f"guest{i}@example.com",
+                instagram=f"guest{i}"
+            )
+            for i in range(count)
+        ]
+        session.add_all(requests)
+        session.commit()
+        return [request.id for request in requests]
+
+def free_port() -> int:
+    """Ask the OS for an unused local TCP port"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class _CountingHandler:
+    """aiosmtpd handler that accepts and counts every message"""
+    def __init__(self):
+        self.messages = 0
+        self.peers = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        self.peers.add(session.peer)
+        return "250 Message accepted"
+
+    @property
+    def connections(self) -> int:
+        """Number of distinct client connections that delivered mail"""
+        return len(self.peers)
+
+@asynccontextmanager
+async def smtp_stub(email_service) -> AsyncIterator[_CountingHandler]:
+    """Point an EmailService at a local aiosmtpd server for the duration of the block"""
+    from aiosmtpd.controller import Controller
+
+    handler = _CountingHandler()
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    saved = (email_service.smtp_server, email_service.smtp_port, email_service.start_tls,
+             email_service.smtp_username, email_service.from_email)
+    await email_service.close()
+    email_service.smtp_server = "127.0.0.1"
+    email_service.smtp_port = port
+    email_service.start_tls = False
+    email_service.smtp_username = None
+    email_service.from_email = "bench@example.com"
+    try:
+        yield handler
+    finally:
+        await email_service.close()
+        (email_service.smtp_server, email_service.smtp_port, email_service.start_tls,
+         email_service.smtp_username, email_service.from_email) = saved
+        controller.stop()
+
+def start_uvicorn(target: str, port: int, **env: str) -> subprocess.Popen:
+    """Serve an ASGI app ("module:attr") under uvicorn in a subprocess
+
+    Outbound mail points at a closed local port, unless env sets SMTP_PORT, so
+    a server under test never reaches a real SMTP server.
+    """
+    env = {**os.environ, "SMTP_SERVER": "127.0.0.1", "SMTP_PORT": str(free_port()), **env}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", target, "--port", str(port), "--log-level", "warning"],
+        env=env
+    )
+
+async def wait_ready(base_url: str, timeout: float = 30):
+    """Poll /health until the server answers"""
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{base_url} did not become ready")
+
+@contextmanager
+def timer(results: Dict[str, float], name: str) -> Iterator[None]:
+    """Record the wall-clock duration of the block in `results[name]`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        results[name] = time.perf_counter() - start
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
@@ -0,0 +1,349 @@
+"""
+Benchmark suite: the request lifecycle at several guest-list sizes, with saved results
+Usage:
+    python -m benchmarks.suite run [--sizes 1000,10000,100000] [--modes inprocess,uvicorn]
+                                   [--requests 500] [--concurrency 20] [-o results.json]
+                                   [--baseline baseline.json] [--threshold 0.15]
+    python -m benchmarks.suite compare results.json baseline.json [--threshold 0.15]
+
+For each size a fresh SQLite database is seeded with that many guests, half
+pending and half approved with a token. Against it, --requests requests are
+made per scenario, --concurrency at a time:
+
+    signup      POST /request-access with new guests
+    admin_list  GET /admin, first page, unfiltered, pending and searched
+    approve     POST /admin/approve/{id}; invitations go through the outbox to a
+                local aiosmtpd stub, and the time until all are delivered is
+                reported as emails/s
+    qr_render   qr_service.generate_qr_code for new tokens (no HTTP, in-process only)
+    redeem      POST /api/scan/redeem/{token}, each token once
+
+"inprocess" drives app.main through httpx's ASGI transport, so the numbers are
+the app's own; "uvicorn" serves it on a local port, adding HTTP parsing and
+sockets. Each size and mode runs in a subprocess of its own, because app
+configuration is read at import. Rate limiting and pre-rendering are turned
+off so runs are repeatable.
+
+Results are written as JSON (throughput and p50/p95/p99 per scenario, plus
+commit and machine). With --baseline, or with `compare`, each scenario is
+checked against a saved run; the exit status is 1 if throughput fell or p95
+rose by more than --threshold.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Nothing from app is imported at module level: the worker configures the app
+# through environment variables first.
+
+SCENARIOS = ("signup", "admin_list", "approve", "qr_render", "redeem")
+MODES = ("inprocess", "uvicorn")
+SCANNER_KEY = "bench-scanner-key"
+SECRET_KEY = "bench-secret-key"
+
+def seed_token(i: int) -> str:
+    return str(uuid.UUID(int=i + 1))
+
+def seed(engine, size: int, batch_size: int = 10000) -> Tuple[List[int], List[str]]:
+    """Insert size guests, the first half pending and the rest approved with a
+    token; returns the pending IDs and the tokens"""
+    from sqlmodel import Session, select
+    from app.models import AccessRequest, QRToken
+
+    now = datetime.utcnow()
+    half = size // 2
+    with Session(engine) as session:
+        connection = session.connection()
+        for start in range(0, size, batch_size):
+            connection.execute(AccessRequest.__table__.insert(), [
+                {
+                    "first_name": f"Guest{i}", "last_name": "Bench", "email": f"guest{i}@example.com",
+                    "instagram": f"guest{i}", "email_key": f"guest{i}@example.com", "instagram_key": f"guest{i}",
+                    "approved": i >= half, "created_at": now, "approved_at": now if i >= half else None
+                }
+                for i in range(start, min(size, start + batch_size))
+            ])
+        ids = list(session.exec(select(AccessRequest.id).order_by(AccessRequest.id)))
+        tokens = [seed_token(i) for i in range(half, size)]
+        for start in range(0, len(tokens), batch_size):
+            connection.execute(QRToken.__table__.insert(), [
+                {"token": token, "request_id": request_id, "used": False, "created_at": now}
+                for token, request_id in zip(tokens[start:start + batch_size], ids[half + start:])
+            ])
+        session.commit()
+    return ids[:half], tokens
+
+def summarize(latencies: List[float], errors: int, seconds: float) -> Dict:
+    from benchmarks.common import percentile
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(seconds, 4),
+        "throughput": round(len(latencies) / seconds, 2) if seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+async def drive(items: Iterable, call: Callable[..., Awaitable[bool]], concurrency: int) -> Dict:
+    """Run call(item) for every item, concurrency at a time; call returns success"""
+    pending = iter(items)
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for item in pending:
+            started = time.perf_counter()
+            ok = await call(item)
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+async def run_scenarios(client, size: int, pending_ids: List[int], tokens: List[str], requests: int,
+                        concurrency: int, smtp, in_process: bool) -> Dict[str, Dict]:
+    from app.auth import create_session_token
+
+    client.cookies.set("session", create_session_token("bench"))
+    results = {}
+
+    # Compile templates and statements before anything is timed
+    await client.post("/request-access", data={
+        "first_name": "Warm", "last_name": "Up", "email": "warmup@example.com", "instagram": "warmup"
+    })
+    await client.get("/admin")
+    await client.post("/admin/approve/0")
+    await client.post("/api/scan/redeem/warmup", headers={"x-scanner-key": SCANNER_KEY})
+
+    async def signup(i: int) -> bool:
+        response = await client.post("/request-access", data={
+            "first_name": "Fan", "last_name": f"Number{i}",
+            "email": f"fan{i}@example.com", "instagram": f"@fan{i}"
+        })
+        return response.status_code == 200
+    results["signup"] = await drive(range(requests), signup, concurrency)
+
+    list_params = [{}, {"status": "pending"}, {"q": "guest1"}]
+    async def admin_list(i: int) -> bool:
+        response = await client.get("/admin", params=list_params[i % len(list_params)])
+        return response.status_code == 200
+    results["admin_list"] = await drive(range(requests), admin_list, concurrency)
+
+    approve_ids = pending_ids[:requests]
+    delivered_before = smtp.messages
+    async def approve(request_id: int) -> bool:
+        response = await client.post(f"/admin/approve/{request_id}")
+        return response.status_code == 302
+    started = time.perf_counter()
+    results["approve"] = await drive(approve_ids, approve, concurrency)
+    deadline = time.monotonic() + 300
+    while smtp.messages - delivered_before < len(approve_ids) and time.monotonic() < deadline:
+        await asyncio.sleep(0.02)
+    delivered = smtp.messages - delivered_before
+    results["approve"]["emails_delivered"] = delivered
+    results["approve"]["emails_per_second"] = round(delivered / (time.perf_counter() - started), 2)
+
+    if in_process:
+        from app.qr_service import qr_service
+        async def render(i: int) -> bool:
+            return bool(qr_service.generate_qr_code(f"bench-render-{size}-{i}"))
+        # Rendering is CPU-bound, so one at a time
+        results["qr_render"] = await drive(range(requests), render, 1)
+
+    async def redeem(token: str) -> bool:
+        response = await client.post(f"/api/scan/redeem/{token}", headers={"x-scanner-key": SCANNER_KEY})
+        return response.status_code == 200 and response.json()["status"] == "admitted"
+    results["redeem"] = await drive(tokens[:requests], redeem, concurrency)
+    return results
+
+async def worker(mode: str, size: int, requests: int, concurrency: int) -> Dict[str, Dict]:
+    """One mode and size, in this process; configures the app through the environment"""
+    with tempfile.TemporaryDirectory() as tmp:
+        # Before anything imports app.database
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from aiosmtpd.controller import Controller
+        from benchmarks.common import _CountingHandler, free_port
+
+        smtp = _CountingHandler()
+        smtp_port = free_port()
+        controller = Controller(smtp, hostname="127.0.0.1", port=smtp_port)
+        controller.start()
+        os.environ.update({
+            "SECRET_KEY": SECRET_KEY,
+            "SCANNER_API_KEY": SCANNER_KEY,
+            "RATE_LIMIT_ENABLED": "false",
+            "PRERENDER_ENABLED": "false",
+            "SMTP_SERVER": "127.0.0.1",
+            "SMTP_PORT": str(smtp_port),
+            "SMTP_STARTTLS": "false",
+            "SMTP_USERNAME": "",
+            "FROM_EMAIL": "bench@example.com",
+            "OUTBOX_DOMAIN_RATE": "0",
+            "OUTBOX_POLL_INTERVAL": "0.05",
+        })
+        import httpx
+        from app.models import create_db_and_tables, engine
+
+        create_db_and_tables()
+        pending_ids, tokens = seed(engine, size)
+        engine.dispose()
+        limits = httpx.Limits(max_connections=concurrency)
+
+        try:
+            if mode == "inprocess":
+                from app.main import app
+                await app.router.startup()
+                try:
+                    transport = httpx.ASGITransport(app=app)
+                    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+                        return await run_scenarios(client, size, pending_ids, tokens, requests, concurrency, smtp, True)
+                finally:
+                    await app.router.shutdown()
+
+            from benchmarks.common import start_uvicorn, wait_ready
+            port = free_port()
+            server = start_uvicorn("app.main:app", port, SMTP_PORT=str(smtp_port))
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                await wait_ready(base_url)
+                async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+                    # Open the connections before anything is timed
+                    await asyncio.gather(*(client.get("/health") for _ in range(concurrency)))
+                    return await run_scenarios(client, size, pending_ids, tokens, requests, concurrency, smtp, False)
+            finally:
+                server.terminate()
+                server.wait()
+        finally:
+            controller.stop()
+
+def run_worker(mode: str, size: int, requests: int, concurrency: int) -> Dict[str, Dict]:
+    """Run worker() in a fresh interpreter and return its results"""
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.suite", "_worker", mode, str(size),
+         "--requests", str(requests), "--concurrency", str(concurrency)],
+        stdout=subprocess.PIPE, check=True
+    ).stdout
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Print results against a baseline, scenario by scenario; returns the regressions"""
+    regressions = []
+    print(f"against baseline {baseline['environment'].get('commit')} ({baseline['environment']['created_at']}):")
+    for mode, sizes in results["results"].items():
+        for size, scenarios in sizes.items():
+            for scenario, current in scenarios.items():
+                before = baseline["results"].get(mode, {}).get(size, {}).get(scenario)
+                if not before:
+                    continue
+                throughput = current["throughput"] / before["throughput"] - 1 if before["throughput"] else 0.0
+                p95 = current["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+                name = f"{mode}/{size}/{scenario}"
+                regressed = throughput < -threshold or p95 > threshold
+                if regressed:
+                    regressions.append(name)
+                print(
+                    f"  {name:<28} throughput {throughput:+7.1%}  p95 {p95:+7.1%}"
+                    f"{'  REGRESSION' if regressed else ''}"
+                )
+    return regressions
+
+def report(results: Dict):
+    for mode, sizes in results["results"].items():
+        for size, scenarios in sizes.items():
+            print(f"{mode}, {int(size):,} guests:")
+            for scenario, stats in scenarios.items():
+                extra = f"  {stats['emails_per_second']:8.1f} emails/s" if "emails_per_second" in stats else ""
+                print(
+                    f"  {scenario:>10}: {stats['throughput']:9.1f}/s"
+                    f"  p50 {stats['p50_ms']:8.2f}ms  p95 {stats['p95_ms']:8.2f}ms  p99 {stats['p99_ms']:8.2f}ms"
+                    f"{'  errors ' + str(stats['errors']) if stats['errors'] else ''}{extra}"
+                )
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the suite and write results")
+    run_parser.add_argument("--sizes", default="1000,10000,100000", help="guest-list sizes, comma-separated")
+    run_parser.add_argument("--modes", default=",".join(MODES), help="inprocess, uvicorn or both")
+    run_parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    run_parser.add_argument("--concurrency", type=int, default=20)
+    run_parser.add_argument("-o", "--output", default="benchmark-results.json")
+    run_parser.add_argument("--baseline", help="results file to compare against")
+    run_parser.add_argument("--threshold", type=float, default=0.15, help="relative change counted as a regression")
+    compare_parser = commands.add_parser("compare", help="compare a results file against a baseline")
+    compare_parser.add_argument("results")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("--threshold", type=float, default=0.15)
+    worker_parser = commands.add_parser("_worker")
+    worker_parser.add_argument("mode", choices=MODES)
+    worker_parser.add_argument("size", type=int)
+    worker_parser.add_argument("--requests", type=int, default=500)
+    worker_parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == "_worker":
+        results = asyncio.run(worker(args.mode, args.size, args.requests, args.concurrency))
+        print(json.dumps(results))
+        return 0
+
+    if args.command == "compare":
+        with open(args.results) as file:
+            results = json.load(file)
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        return 1 if compare(results, baseline, args.threshold) else 0
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = {
+        "environment": environment(),
+        "settings": {"sizes": sizes, "modes": modes, "requests": args.requests, "concurrency": args.concurrency},
+        "results": {},
+    }
+    for mode in modes:
+        for size in sizes:
+            print(f"running {mode}, {size:,} guests...", file=sys.stderr)
+            results["results"].setdefault(mode, {})[str(size)] = run_worker(mode, size, args.requests, args.concurrency)
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    report(results)
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        return 1 if compare(results, baseline, args.threshold) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
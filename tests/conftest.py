@@ -0,0 +1,113 @@
+"""
+Database fixtures: backend-neutral tests run on SQLite and on PostgreSQL
+
+Tests that take `engine`, `session` or `db_url` run once per backend. The
+PostgreSQL server is TEST_DATABASE_URL when that is set, otherwise a
+throwaway cluster in a temp dir, started with the initdb and pg_ctl found in
+PG_BIN or on PATH; without either, the PostgreSQL runs are skipped. Each test
+gets databases of its own, created from scratch and dropped afterwards.
+
+    TEST_DATABASE_URL=postgresql://postgres@localhost/postgres pytest
+    pytest -k sqlite        # one backend only
+"""
+
+import os
+import shutil
+import socket
+import subprocess
+import uuid
+import pytest
+from sqlalchemy.engine import make_url
+from sqlmodel import Session, create_engine
+from app.migrations import run_migrations
+
+BACKENDS = ["sqlite", "postgresql"]
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture(scope="session")
+def postgres_server(tmp_path_factory):
+    """URL of a PostgreSQL server (its maintenance database) for the whole run"""
+    url = os.getenv("TEST_DATABASE_URL")
+    if url:
+        yield url
+        return
+
+    bin_dir = os.getenv("PG_BIN") or os.path.dirname(shutil.which("pg_ctl") or "")
+    if not bin_dir or not os.path.exists(os.path.join(bin_dir, "initdb")):
+        pytest.skip("no PostgreSQL: set TEST_DATABASE_URL, or put initdb and pg_ctl on PATH")
+    if os.geteuid() == 0:
+        pytest.skip("PostgreSQL won't run as root: set TEST_DATABASE_URL instead")
+
+    data = tmp_path_factory.mktemp("pgdata")
+    port = _free_port()
+    subprocess.run(
+        [os.path.join(bin_dir, "initdb"), "-D", str(data), "-U", "postgres", "--auth=trust", "-E", "UTF8"],
+        check=True, capture_output=True
+    )
+    # Durability off: the cluster is thrown away
+    options = (
+        f"-p {port} -k {data} -c listen_addresses=127.0.0.1"
+        " -c fsync=off -c synchronous_commit=off -c full_page_writes=off"
+    )
+    pg_ctl = os.path.join(bin_dir, "pg_ctl")
+    subprocess.run(
+        [pg_ctl, "-D", str(data), "-l", str(data / "server.log"), "-o", options, "-w", "start"],
+        check=True, capture_output=True
+    )
+    try:
+        yield f"postgresql://postgres@127.0.0.1:{port}/postgres"
+    finally:
+        subprocess.run([pg_ctl, "-D", str(data), "-m", "immediate", "stop"], capture_output=True)
+
+@pytest.fixture(params=BACKENDS)
+def backend(request) -> str:
+    return request.param
+
+@pytest.fixture
+def new_database_url(backend, request, tmp_path):
+    """Factory of URLs of empty databases on the test's backend"""
+    if backend == "sqlite":
+        counter = iter(range(1000))
+        yield lambda: f"sqlite:///{tmp_path / f'test{next(counter)}.db'}"
+        return
+
+    server = request.getfixturevalue("postgres_server")
+    admin = create_engine(server, isolation_level="AUTOCOMMIT")
+    names = []
+
+    def create() -> str:
+        name = f"test_{uuid.uuid4().hex[:16]}"
+        with admin.connect() as connection:
+            connection.exec_driver_sql(f'CREATE DATABASE "{name}"')
+        names.append(name)
+        return make_url(server).set(database=name).render_as_string(hide_password=False)
+
+    yield create
+    with admin.connect() as connection:
+        for name in names:
+            connection.exec_driver_sql(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+    admin.dispose()
+
+@pytest.fixture
+def db_url(new_database_url) -> str:
+    """An empty database on the test's backend"""
+    return new_database_url()
+
+@pytest.fixture
+def engine(db_url):
+    """Engine on a database with the current schema, shareable between threads"""
+    connect_args = {"timeout": 30} if db_url.startswith("sqlite") else {}
+    engine = create_engine(db_url, connect_args=connect_args)
+    run_migrations(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def session(engine):
+    """Session on the engine fixture's database"""
+    with Session(engine) as session:
+        yield session
@@ -0,0 +1,131 @@
+import os
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+from app.archive import EventArchive, main
+from app.models import AccessRequest, QRToken
+from app.schemas import AccessRequestCreate
+from app import crud
+
+def signup(email, instagram):
+    return AccessRequestCreate(first_name="Guest", last_name="Doe", email=email, instagram=instagram)
+
+def test_requests_scoped_per_event(engine):
+    """Test per-event dedupe, lists and counts"""
+    with Session(engine) as session:
+        summer = crud.get_current_event(session)
+        crud.insert_access_requests(session, [signup("ana@example.com", "ana"), signup("bo@example.com", "bo")])
+        autumn = crud.create_event(session, "Terrace After-Party")
+        assert autumn.slug == f"{summer.slug}-2"
+        assert crud.get_current_event(session).id == autumn.id
+
+        # The same person can sign up again for the next event, but only once
+        ids = crud.insert_access_requests(session, [signup("ANA@example.com", "ana"), signup("ana@example.com", "x")])
+        assert ids[0] is not None and ids[1] is None
+
+        assert crud.count_requests(session, summer.id)["total"] == 2
+        assert crud.count_requests(session, autumn.id)["total"] == 1
+        assert crud.count_requests(session)["total"] == 3
+        rows, _ = crud.list_requests(session, event_id=autumn.id)
+        assert [request.id for request, _, _ in rows] == [ids[0]]
+
+        request, qr_token = crud.approve_requests(session, [ids[0]])[0]
+        assert qr_token.event_id == autumn.id
+        assert crud.count_requests(session, summer.id)["approved"] == 0
+
+def test_event_list_uses_event_index(engine):
+    """Test that one event's admin page is an index range scan"""
+    if engine.dialect.name != "sqlite":
+        pytest.skip("SQLite query plan")
+    with Session(engine) as session:
+        plan = " ".join(row[-1] for row in session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM accessrequest WHERE event_id = 1 AND approved = 0"
+            " ORDER BY created_at DESC, id DESC LIMIT 51"
+        )))
+        assert "ix_accessrequest_event_approved_created_at_id" in plan
+        assert "TEMP B-TREE" not in plan
+
+def test_backfill_event_ids(engine):
+    """Test that rows written before events existed join the current event"""
+    with Session(engine) as session:
+        old = AccessRequest(first_name="Old", last_name="Row", email="old@example.com", instagram="old")
+        session.add(old)
+        session.commit()
+        session.add(QRToken(token="legacy-token", request_id=old.id))
+        session.commit()
+
+        event = crud.get_current_event(session)
+        assert crud.backfill_event_ids(session, event.id) == 1
+        assert crud.get_qr_token(session, "legacy-token").event_id == event.id
+        assert crud.backfill_event_ids(session, event.id) == 0
+
+def test_archive_event(engine, tmp_path):
+    """Test moving an event to its file, reading it back, and leaving the other event alone"""
+    archive = EventArchive(str(tmp_path / "archive"))
+    with Session(engine) as session:
+        past_id = crud.get_current_event(session).id
+        ids = crud.insert_access_requests(session, [signup(f"g{i}@example.com", f"g{i}") for i in range(5)])
+        results = crud.approve_requests(session, ids[:3])
+        token = results[0][1].token
+        crud.use_qr_token(session, token)
+        current_id = crud.create_event(session, "Next").id
+        crud.insert_access_requests(session, [signup("g0@example.com", "g0")])
+
+    assert archive.archive(engine, past_id) == {"tokens": 3, "requests": 5}
+    assert archive.archive(engine, past_id) is None
+
+    with Session(engine) as session:
+        past = crud.get_event(session, past_id)
+        assert past.status == "archived" and os.path.exists(past.archive_path)
+        assert crud.get_qr_token(session, token) is None
+        assert crud.count_requests(session) == {"total": 1, "approved": 0, "pending": 1, "used": 0}
+        assert crud.get_outbox_stats(session)["pending"] == 0
+        assert crud.get_current_event(session).id == current_id
+
+    assert archive.run(past, crud.count_requests) == {"total": 5, "approved": 3, "pending": 2, "used": 1}
+    rows, _ = archive.run(past, crud.list_requests, "used")
+    assert [request.id for request, _, _ in rows] == [ids[0]]
+    with pytest.raises(OperationalError):  # read-only
+        archive.run(past, crud.create_event, "read-only")
+    archive.close()
+
+def test_archive_in_batches_keeps_changes_made_after_the_copy(engine, tmp_path, monkeypatch):
+    """Test that a scan and an approval landing between the copy and the deletes are archived"""
+    archive = EventArchive(str(tmp_path / "archive"))
+    with Session(engine) as session:
+        past_id = crud.get_current_event(session).id
+        ids = crud.insert_access_requests(session, [signup(f"g{i}@example.com", f"g{i}") for i in range(7)])
+        tokens = [qr_token.token for _, qr_token in crud.approve_requests(session, ids[:4])]
+        crud.create_event(session, "Next")
+
+    copy = EventArchive._copy
+
+    def copy_then_race(read_engine, cold, table, event_id, batch_size):
+        copy(read_engine, cold, table, event_id, batch_size)
+        if table is QRToken.__table__:
+            with Session(engine) as session:
+                crud.use_qr_token(session, tokens[3])
+                crud.approve_requests(session, [ids[4]])
+
+    monkeypatch.setattr(EventArchive, "_copy", staticmethod(copy_then_race))
+    assert archive.archive(engine, past_id, batch_size=2) == {"tokens": 5, "requests": 7}
+
+    with Session(engine) as session:
+        past = crud.get_event(session, past_id)
+        assert past.status == "archived"
+        assert crud.count_requests(session, past_id)["total"] == 0
+    assert archive.run(past, crud.count_requests) == {"total": 7, "approved": 5, "pending": 2, "used": 1}
+    archive.close()
+
+def test_cli_refuses_current_event(engine, monkeypatch):
+    """Test that the command line, like the admin route, won't archive the current event"""
+    monkeypatch.setattr("app.models.create_db_and_tables", lambda: None)
+    monkeypatch.setattr("app.models.engine", engine)
+    monkeypatch.setattr("app.models.read_engine", engine)
+    with Session(engine) as session:
+        current_id = crud.get_current_event(session).id
+    with pytest.raises(SystemExit, match="current"):
+        main([str(current_id)])
+    with Session(engine) as session:
+        assert crud.get_event(session, current_id).status == "open"
@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from app.database import create_async_engines, make_async_sessionmaker
+from app.schemas import AccessRequestCreate
+from app.token_index import TokenIndex, redeem, ADMITTED, USED
+from app import async_crud
+
+@pytest_asyncio.fixture
+async def sessionmaker(engine, db_url):
+    """Async sessions over the engine fixture's database"""
+    async_engine, _ = create_async_engines(db_url, split=False)
+    yield make_async_sessionmaker(async_engine)
+    await async_engine.dispose()
+
+def guest(name):
+    return AccessRequestCreate(
+        first_name=name, last_name="Doe", email=f"{name.lower()}@example.com", instagram=name.lower()
+    )
+
+@pytest.mark.asyncio
+async def test_create_list_and_approve(sessionmaker):
+    """Test the async wrappers end to end"""
+    async with sessionmaker() as session:
+        john = await async_crud.create_access_request(session, guest("John"))
+        await async_crud.create_access_request(session, guest("Jane"))
+
+        approved = await async_crud.approve_request(session, john.id)
+        # Still readable after commit, no lazy load outside the greenlet
+        assert approved.approved and approved.approved_at is not None
+
+    async with sessionmaker() as session:
+        rows, next_cursor = await async_crud.list_requests(session, "pending")
+        assert [request.first_name for request, _, _ in rows] == ["Jane"]
+        assert next_cursor is None
+        assert (await async_crud.count_requests(session))["approved"] == 1
+        assert (await async_crud.get_outbox_stats(session))["pending"] == 1
+
+@pytest.mark.asyncio
+async def test_redeem_through_run_sync(sessionmaker):
+    """Test a door scan through the async session"""
+    async with sessionmaker() as session:
+        request = await async_crud.create_access_request(session, guest("Ann"))
+        await async_crud.approve_requests(session, [request.id])
+        outbox = await async_crud.claim_outbox_batch(session, 10)
+        token = outbox[0].token
+
+        index = TokenIndex()
+        await session.run_sync(index.load)
+        outcome, row = await session.run_sync(redeem, token, index)
+        assert outcome == ADMITTED and row.first_name == "Ann"
+        assert (await session.run_sync(redeem, token, index))[0] == USED
+
+@pytest.mark.asyncio
+async def test_concurrent_index_refreshes(sessionmaker):
+    """Test that refreshes overlapping on the event loop neither deadlock nor miss tokens"""
+    index = TokenIndex()
+    async with sessionmaker() as session:
+        await session.run_sync(index.load)
+
+    async def approve(name):
+        async with sessionmaker() as session:
+            request = await async_crud.create_access_request(session, guest(name))
+            await async_crud.approve_request(session, request.id, f"token-{name}")
+            await async_crud.run_sync(session, index.refresh)
+
+    async def refresh():
+        async with sessionmaker() as session:
+            await async_crud.run_sync(session, index.refresh)
+
+    # As approvals and scans do when requests arrive together
+    work = [approve(f"Guest{i}") for i in range(10)] + [refresh() for _ in range(10)]
+    await asyncio.wait_for(asyncio.gather(*work), 10)
+    assert len(index) == 10
+
+@pytest.mark.asyncio
+async def test_authenticate_user(sessionmaker):
+    """Test password checks off the event loop"""
+    from app.models import User
+    async with sessionmaker() as session:
+        session.add(User(username="admin", hashed_password=await async_crud.get_password_hash("secret")))
+        await session.commit()
+        assert (await async_crud.authenticate_user(session, "admin", "secret")).username == "admin"
+        assert await async_crud.authenticate_user(session, "admin", "wrong") is None
@@ -19,3 +19,45 @@ def test_verify_invalid_token():
     invalid_token = "invalid-token"
     result = verify_session_token(invalid_token)
     assert result is None
+
+def test_session_cache_skips_reverification(monkeypatch):
+    """Test that a verified token is served from the cache"""
+    from app import auth
+    cache = auth.SessionCache(ttl=60)
+    token = create_session_token("admin")
+    assert cache.verify(token) == "admin"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("token verified again")
+    monkeypatch.setattr(auth.serializer, "loads", fail)
+    assert cache.verify(token) == "admin"
+
+def test_session_cache_expiry_and_bad_tokens(monkeypatch):
+    """Test TTL expiry and that invalid tokens are never cached"""
+    from app import auth
+    cache = auth.SessionCache(ttl=0)
+    token = create_session_token("admin")
+    assert cache.verify(token) == "admin"
+
+    # Expired entries are verified again
+    calls = []
+    loads = auth.serializer.loads
+    monkeypatch.setattr(auth.serializer, "loads", lambda *a, **kw: calls.append(1) or loads(*a, **kw))
+    assert cache.verify(token) == "admin"
+    assert calls
+
+    assert cache.verify("invalid-token") is None
+    assert cache.verify("invalid-token") is None
+    assert len(calls) == 3
+
+def test_session_cache_revoke():
+    """Test that logging out rejects the token from then on"""
+    from app.auth import SessionCache
+    cache = SessionCache(ttl=60)
+    token = create_session_token("admin")
+    other = create_session_token("other-admin")
+    assert cache.verify(token) == "admin"
+
+    cache.revoke(token)
+    assert cache.verify(token) is None
+    assert cache.verify(other) == "other-admin"
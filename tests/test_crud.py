@@ -0,0 +1,77 @@
+import pytest
+from sqlmodel import func, select
+from app.models import AccessRequest, EmailOutbox, QRToken
+from app import crud
+
+def add_request(session, name):
+    request = AccessRequest(
+        first_name=name,
+        last_name="Doe",
+        email=f"{name.lower()}@example.com",
+        instagram=name.lower()
+    )
+    session.add(request)
+    session.commit()
+    session.refresh(request)
+    return request
+
+def test_approve_requests(session):
+    """Test approving several requests in one call"""
+    john = add_request(session, "John")
+    jane = add_request(session, "Jane")
+    crud.approve_request(session, jane.id)
+
+    results = crud.approve_requests(session, [john.id, 9999, jane.id, john.id])
+
+    # Missing and duplicate IDs are dropped, order is preserved
+    assert [request.id for request, _ in results] == [john.id, jane.id]
+
+    request, qr_token = results[0]
+    assert request.approved
+    assert request.approved_at is not None
+    assert qr_token.request_id == john.id
+    assert crud.get_qr_token(session, qr_token.token) is not None
+
+    # Already approved requests don't get a second token
+    assert results[1][1] is None
+
+def test_approve_request_twice(session):
+    """Test that approving again keeps one token and one queued invitation"""
+    jane = add_request(session, "Jane")
+    first = crud.approve_request(session, jane.id)
+    approved_at = first.approved_at
+    again = crud.approve_request(session, jane.id)
+
+    assert again.id == jane.id and again.approved_at == approved_at
+    assert session.exec(select(func.count(QRToken.id)).where(QRToken.request_id == jane.id)).one() == 1
+    assert session.exec(select(func.count(EmailOutbox.id)).where(EmailOutbox.request_id == jane.id)).one() == 1
+
+def test_list_requests_pages_and_filters(session):
+    """Test keyset pagination, status filters and prefix search"""
+    requests = [add_request(session, f"Guest{i}") for i in range(5)]
+    crud.approve_requests(session, [requests[0].id, requests[1].id])
+    token = session.exec(crud.select(crud.QRToken).where(crud.QRToken.request_id == requests[0].id)).one().token
+    crud.use_qr_token(session, token)
+
+    # Newest first, two per page, cursor continues where the last page stopped
+    seen = []
+    cursor = None
+    while True:
+        rows, cursor = crud.list_requests(session, cursor=cursor, limit=2)
+        seen.extend(request.id for request, _, _ in rows)
+        if not cursor:
+            break
+    assert seen == sorted((request.id for request in requests), reverse=True)
+
+    pending, _ = crud.list_requests(session, status="pending")
+    assert len(pending) == 3
+    approved, _ = crud.list_requests(session, status="approved")
+    assert [request.id for request, _, _ in approved] == [requests[1].id]
+    used, _ = crud.list_requests(session, status="used")
+    assert [(request.id, checked_in) for request, checked_in, _ in used] == [(requests[0].id, True)]
+    assert used[0][2] is not None
+
+    found, _ = crud.list_requests(session, search="@GUEST3")
+    assert [request.id for request, _, _ in found] == [requests[3].id]
+
+    assert crud.count_requests(session) == {"total": 5, "approved": 2, "pending": 3, "used": 1}
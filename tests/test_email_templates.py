@@ -0,0 +1,63 @@
+from email import message_from_bytes, policy
+from app.email_templates import InvitationTemplates, pick_locale
+
+def parse(data):
+    return message_from_bytes(data, policy=policy.default)
+
+def test_invitation_message_structure():
+    """Test that the serialized message is a valid multipart invitation"""
+    templates = InvitationTemplates("templates/email")
+    data = templates.build_message(
+        None, "party@example.com", "guest@example.com", "Jane <Doe>", "http://test/q/abc?x=1&y=2", b"\x89PNGdata"
+    )
+    msg = parse(data)
+
+    assert msg["To"] == "guest@example.com"
+    assert msg["From"] == "party@example.com"
+    assert "You're Approved" in msg["Subject"]
+    assert msg["Message-ID"] and msg["Date"]
+
+    alternative, attachment = msg.get_payload()
+    text, html = alternative.get_payload()
+    assert text.get_content_type() == "text/plain"
+    assert "Hey Jane <Doe>!" in text.get_content()
+    assert "http://test/q/abc?x=1&y=2" in text.get_content()
+    # HTML gets escaped values
+    assert "Hey Jane &lt;Doe&gt;!" in html.get_content()
+    assert 'href="http://test/q/abc?x=1&amp;y=2"' in html.get_content()
+    assert attachment.get_content_type() == "image/png"
+    assert attachment.get_filename() == "invitation-qr-code.png"
+    assert attachment.get_content() == b"\x89PNGdata"
+
+def test_locales():
+    """Test per-locale templates and fallback to the default"""
+    templates = InvitationTemplates("templates/email")
+    assert templates.locales == ["en", "it"]
+    assert templates.resolve("it-IT") == "it"
+    assert templates.resolve("de") == "en"
+
+    subject, text, html = templates.render("it", "Giulia", "http://test/q/t")
+    assert subject.startswith("🌊 Invito")
+    assert "Ciao Giulia!" in text
+    assert "Ciao Giulia! 👋" in html
+
+    msg = parse(templates.build_message("it_IT", "", "g@example.com", "Giulia", "http://test/q/t", b"<svg/>"))
+    assert "Invito" in msg["Subject"]
+    assert msg.get_payload()[1].get_content_type() == "image/svg+xml"
+
+def test_compiled_matches_jinja():
+    """Test that substituting into the pre-rendered template matches a full render"""
+    templates = InvitationTemplates("templates/email")
+    values = {"guest_name": "Zoë \"Z\" O'Neil & co", "fallback_url": "http://test/q/a<b>"}
+    for locale in templates.locales:
+        _, text, html = templates.render(locale, **values)
+        assert text == templates.environment.get_template(f"{locale}/invitation.txt").render(**values)
+        assert html == templates.environment.get_template(f"{locale}/invitation.html").render(**values)
+
+def test_pick_locale():
+    """Test Accept-Language negotiation"""
+    assert pick_locale("it-IT,it;q=0.9,en-US;q=0.8,en;q=0.7", ["en", "it"]) == "it"
+    assert pick_locale("en-GB,it;q=0.5", ["en", "it"]) == "en"
+    assert pick_locale("de-DE,it;q=0.3", ["en", "it"]) == "it"
+    assert pick_locale("fr;q=1,it;q=0", ["en", "it"]) is None
+    assert pick_locale(None, ["en", "it"]) is None
@@ -0,0 +1,137 @@
+import asyncio
+import json
+from datetime import datetime
+import pytest
+import pytest_asyncio
+from sqlmodel import Session
+from app.events import EventBus, event_bus
+from app.schemas import AccessRequestCreate
+from app import crud
+
+@pytest_asyncio.fixture
+async def bus(engine):
+    """The global bus crud publishes to, started from this database's counts"""
+    with Session(engine) as session:
+        current = crud.get_current_event(session)
+        event_bus.start(crud.count_requests(session, current.id), current.id)
+    yield event_bus
+    await event_bus.stop()
+    event_bus.event_id = None
+
+def parse(frame: bytes):
+    fields = dict(line.split(": ", 1) for line in frame.decode().strip().splitlines() if ": " in line)
+    return int(fields["id"]), fields["event"], json.loads(fields["data"])
+
+def signup(email, instagram):
+    return AccessRequestCreate(first_name="Jane", last_name="Doe", email=email, instagram=instagram)
+
+@pytest.mark.asyncio
+async def test_crud_changes_reach_subscribers(engine, bus):
+    """Test sign-up, approval and check-in events and the running counters"""
+    queue, snapshot = bus.subscribe()
+    snapshot_id, kind, data = parse(snapshot)
+    assert kind == "snapshot"
+    assert data["counts"] == {"total": 0, "approved": 0, "pending": 0, "used": 0}
+
+    def run():
+        # From a worker thread, as async_crud and the ingestor do
+        with Session(engine) as session:
+            ids = crud.insert_access_requests(session, [signup("a@example.com", "a"), signup("b@example.com", "b")])
+            crud.approve_request(session, ids[0], "token-a")
+            crud.approve_request(session, ids[0], "token-a2")  # already approved: no event, no token
+            crud.redeem_qr_token(session, "token-a")
+            crud.redeem_qr_token(session, "token-a")  # already used: no event
+            return ids
+    ids = await asyncio.to_thread(run)
+
+    events = [parse(await asyncio.wait_for(queue.get(), 1)) for _ in range(3)]
+    assert queue.empty()
+    assert [kind for _, kind, _ in events] == ["signup", "approved", "checked_in"]
+    assert [event_id for event_id, _, _ in events] == list(range(snapshot_id + 1, snapshot_id + 4))
+    assert [guest["id"] for guest in events[0][2]["guests"]] == ids
+    assert events[2][2]["guests"][0]["name"] == "Jane Doe"
+    assert events[2][2]["counts"] == {"total": 2, "approved": 1, "pending": 1, "used": 1}
+
+    with Session(engine) as session:
+        assert crud.count_requests(session) == bus.counts
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_disconnected():
+    """Test that a client that stops reading is dropped rather than buffered"""
+    bus = EventBus()
+    bus.queue_size = 2
+    bus.resync_interval = 0
+    bus.start()
+    fast, _ = bus.subscribe()
+    slow, _ = bus.subscribe()
+
+    for i in range(3):
+        bus.publish("signup", {"guests": []}, total=1, pending=1)
+        await asyncio.sleep(0)
+        await fast.get()
+
+    assert slow.get_nowait() is None
+    assert bus.stats()["subscribers"] == 1
+    assert bus.dropped == 1
+    await bus.stop()
+    assert fast.get_nowait() is None
+
+@pytest.mark.asyncio
+async def test_stream_sends_snapshot_then_events():
+    """Test the SSE stream of one client"""
+    bus = EventBus()
+    bus.resync_interval = 0
+    bus.start({"total": 5, "approved": 2, "pending": 3, "used": 1})
+    stream = bus.stream()
+
+    first = await stream.__anext__()
+    assert first.startswith(b"retry: 3000\n")
+    assert parse(first.split(b"\n", 1)[1])[2]["counts"]["total"] == 5
+
+    bus.checked_in([(1, 1, "Jane Doe", "jane", None)])
+    event_id, kind, data = parse(await asyncio.wait_for(stream.__anext__(), 1))
+    assert kind == "checked_in" and data["counts"]["used"] == 2
+
+    await stream.aclose()
+    assert bus.stats()["subscribers"] == 0
+
+@pytest.mark.asyncio
+async def test_resync_counts_current_event_only(engine):
+    """Test that recounting ignores other events and follows a new current event"""
+    bus = EventBus(engine)
+    with Session(engine) as session:
+        ids = crud.insert_access_requests(session, [signup("a@example.com", "a"), signup("b@example.com", "b")])
+        crud.approve_requests(session, ids[:1])
+    await bus.resync()
+    assert bus.counts == {"total": 2, "approved": 1, "pending": 1, "used": 0}
+
+    with Session(engine) as session:
+        crud.create_event(session, "Next Party")
+        crud.insert_access_requests(session, [signup("c@example.com", "c")])
+    await bus.resync()
+    assert bus.counts == {"total": 1, "approved": 0, "pending": 1, "used": 0}
+
+@pytest.mark.asyncio
+async def test_other_events_leave_counters_alone(engine, bus):
+    """Test that guests of an older open event don't reach the current event's counters or feed"""
+    with Session(engine) as session:
+        past_id = crud.get_current_event(session).id
+        old = crud.insert_access_requests(session, [signup("a@example.com", "a"), signup("b@example.com", "b")])
+        current = crud.create_event(session, "Next Party")
+        bus.reset(crud.count_requests(session, current.id), current.id)
+        new = crud.insert_access_requests(session, [signup("c@example.com", "c")])
+    await asyncio.sleep(0)
+    queue, _ = bus.subscribe()
+
+    with Session(engine) as session:
+        # The old event's guest comes first, and is the one checked in
+        token = crud.approve_requests(session, old[:1] + new)[0][1].token
+        crud.redeem_qr_token(session, token)
+        crud.reconcile_offline_scans(session, [(token, datetime(2020, 1, 1))])
+        crud.insert_access_requests(session, [signup("d@example.com", "d")], event_id=past_id)
+    await asyncio.sleep(0)
+
+    _, kind, data = parse(queue.get_nowait())
+    assert queue.empty()
+    assert kind == "approved" and [guest["id"] for guest in data["guests"]] == new
+    assert bus.counts == {"total": 1, "approved": 1, "pending": 0, "used": 0}
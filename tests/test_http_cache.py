@@ -0,0 +1,97 @@
+import os
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from jinja2 import DictLoader, Environment
+from app.http_cache import CompressedStaticFiles, PageCache, pick_encoding
+
+PAGE = "<html><body>{{ message }}" + "<p>Terrace After-Party</p>" * 50 + "</body></html>"
+
+def make_app(static_dir):
+    app = FastAPI()
+    cache = PageCache(Environment(loader=DictLoader({"page.html": PAGE})))
+    static_files = CompressedStaticFiles(directory=str(static_dir))
+    app.mount("/static", static_files)
+
+    @app.get("/")
+    async def home(request: Request):
+        return cache.response(request, "page.html", {"message": "Welcome"})
+
+    @app.get("/invalid")
+    async def invalid(request: Request):
+        return cache.response(request, "page.html", {"message": "Invalid"}, max_age=0)
+
+    return app, cache, static_files
+
+def test_pick_encoding():
+    """Test that brotli wins over gzip and q=0 opts out"""
+    available = {"br": b"", "gzip": b""}
+    assert pick_encoding("gzip, deflate, br", available) == "br"
+    assert pick_encoding("gzip;q=1.0, br;q=0", available) == "gzip"
+    assert pick_encoding("*", {"gzip": b""}) == "gzip"
+    assert pick_encoding("identity", available) is None
+    assert pick_encoding("", available) is None
+
+def test_page_rendered_once_with_etag(tmp_path):
+    """Test caching, 304 on If-None-Match and precompressed bodies"""
+    app, cache, _ = make_app(tmp_path)
+    client = TestClient(app)
+
+    first = client.get("/", headers={"accept-encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["vary"] == "Accept-Encoding"
+    assert first.headers["cache-control"] == "public, max-age=60"
+    assert "Welcome" in first.text
+
+    plain = client.get("/", headers={"accept-encoding": "identity"})
+    assert "content-encoding" not in plain.headers and plain.text == first.text
+    assert plain.headers["etag"] != first.headers["etag"]
+    assert first.headers["etag"] == plain.headers["etag"][:-1] + '-gz"'
+
+    not_modified = client.get("/", headers={"accept-encoding": "gzip", "if-none-match": first.headers["etag"]})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert not_modified.headers["etag"] == first.headers["etag"]
+    # The gzip ETag doesn't validate the identity body
+    assert client.get("/", headers={"accept-encoding": "identity", "if-none-match": first.headers["etag"]}).status_code == 200
+
+    other = client.get("/invalid", headers={"if-none-match": first.headers["etag"]})
+    assert other.status_code == 200 and "Invalid" in other.text
+    assert other.headers["cache-control"] == "no-cache"
+    assert (cache.misses, cache.hits) == (2, 3)
+
+def test_static_files_precompressed(tmp_path):
+    """Test encodings, cache headers and files changed after startup"""
+    css = b"body { color: #0284c7; }\n" * 100
+    (tmp_path / "app.css").write_bytes(css)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" + bytes(1000))
+    app, _, static_files = make_app(tmp_path)
+    assert static_files.precompress() == 2
+    client = TestClient(app)
+
+    response = client.get("/static/app.css", headers={"accept-encoding": "gzip"})
+    assert response.status_code == 200 and response.content == css
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == "public, max-age=3600"
+    assert response.headers["content-type"].startswith("text/css")
+
+    plain = client.get("/static/app.css", headers={"accept-encoding": "identity"})
+    assert plain.content == css and "content-encoding" not in plain.headers
+    assert response.headers["etag"] == plain.headers["etag"] + "-gz"
+    identity = {"accept-encoding": "identity", "if-none-match": plain.headers["etag"]}
+    assert client.get("/static/app.css", headers=identity).status_code == 304
+
+    # Each encoding revalidates against its own ETag only
+    gzipped = {"accept-encoding": "gzip", "if-none-match": response.headers["etag"]}
+    not_modified = client.get("/static/app.css", headers=gzipped)
+    assert not_modified.status_code == 304 and not_modified.headers["etag"] == response.headers["etag"]
+    assert client.get("/static/app.css", headers={**gzipped, "if-none-match": plain.headers["etag"]}).status_code == 200
+    assert client.get("/static/app.css", headers={**identity, "if-none-match": response.headers["etag"]}).status_code == 200
+
+    image = client.get("/static/logo.png", headers={"accept-encoding": "gzip"})
+    assert "content-encoding" not in image.headers
+
+    # A file changed since precompress() is served as is
+    (tmp_path / "app.css").write_bytes(css + b"a { color: red; }\n")
+    os.utime(tmp_path / "app.css", (0, 0))
+    changed = client.get("/static/app.css", headers={"accept-encoding": "gzip"})
+    assert changed.content.endswith(b"red; }\n") and "content-encoding" not in changed.headers
@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from sqlmodel import Session, select
+from app.models import AccessRequest
+from app.schemas import AccessRequestCreate
+from app.ingest import SignupIngestor
+from app import crud
+
+def signup(email, instagram, name="Guest"):
+    return AccessRequestCreate(first_name=name, last_name="Doe", email=email, instagram=instagram)
+
+def test_normalize():
+    """Test the dedupe keys"""
+    assert crud.normalize_email("  Jane.Doe@Example.COM ") == "jane.doe@example.com"
+    assert crud.normalize_instagram("@Jane_Doe") == "jane_doe"
+    assert crud.normalize_instagram("https://www.instagram.com/Jane_Doe/") == "jane_doe"
+
+def test_insert_skips_duplicates(engine):
+    """Test dedupe against the table and within a batch"""
+    with Session(engine) as session:
+        existing = crud.create_access_request(session, signup("taken@example.com", "taken"))
+
+        ids = crud.insert_access_requests(session, [
+            signup("new@example.com", "new"),
+            signup("TAKEN@example.com", "other"),      # email already in the table
+            signup("fresh@example.com", "@Taken"),      # handle already in the table
+            signup("New@Example.com", "new2"),          # email earlier in this batch
+            signup("last@example.com", "last"),
+        ])
+
+        assert ids[0] is not None and ids[4] is not None
+        assert ids[1:4] == [None, None, None]
+        emails = set(session.exec(select(AccessRequest.email)))
+        assert emails == {existing.email, "new@example.com", "last@example.com"}
+
+def test_backfill_keeps_oldest_duplicate(engine):
+    """Test that legacy rows get keys without breaking the unique indexes"""
+    with Session(engine) as session:
+        for email in ["a@example.com", "A@example.com", "b@example.com"]:
+            session.add(AccessRequest(first_name="Old", last_name="Row", email=email, instagram=email[0]))
+        session.commit()
+
+        assert crud.backfill_signup_keys(session) == 2
+        keys = list(session.exec(select(AccessRequest.email_key).order_by(AccessRequest.id)))
+        assert keys == ["a@example.com", None, "b@example.com"]
+        assert crud.backfill_signup_keys(session) == 0
+
+@pytest.mark.asyncio
+async def test_ingestor_batches_concurrent_submissions(engine):
+    """Test that concurrent sign-ups are grouped and deduplicated"""
+    ingestor = SignupIngestor(engine)
+    ingestor.flush_interval = 0.05
+    ingestor.start()
+
+    submissions = [signup(f"guest{i % 40}@example.com", f"guest{i}") for i in range(60)]
+    ids = await asyncio.gather(*(ingestor.submit(request) for request in submissions))
+    await ingestor.stop()
+
+    assert sum(1 for request_id in ids if request_id is not None) == 40
+    assert ingestor.inserted == 40 and ingestor.duplicates == 20
+    assert ingestor.batches < 10
+    with Session(engine) as session:
+        assert len(list(session.exec(select(AccessRequest.id)))) == 40
+
+@pytest.mark.asyncio
+async def test_ingestor_stop_flushes_queue(engine):
+    """Test that stopping writes what was already queued"""
+    ingestor = SignupIngestor(engine)
+    ingestor.flush_interval = 10
+    ingestor.start()
+
+    pending = asyncio.ensure_future(ingestor.submit(signup("late@example.com", "late")))
+    await asyncio.sleep(0)
+    await ingestor.stop()
+    assert await pending is not None
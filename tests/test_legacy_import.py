@@ -0,0 +1,69 @@
+import json
+import pytest
+from sqlmodel import Session, select
+from app.models import AccessRequest, QRToken
+from app.legacy_import import migrate, parse_time
+from app import crud
+
+def legacy_request(n, email=None, instagram=None, **fields):
+    return {
+        "firstName": f"Guest{n}", "lastName": "Old", "email": email or f"guest{n}@example.com",
+        "instagram": instagram or f"guest{n}", "id": f"req_{n}", "approved": False,
+        "createdAt": "2025-07-29T18:38:39.510Z", **fields
+    }
+
+@pytest.fixture
+def dump(tmp_path):
+    """A small database.json in the Node app's layout, tokens before requests"""
+    path = tmp_path / "database.json"
+    path.write_text(json.dumps({
+        "admin": {"username": "admin", "password": "secret"},
+        "tokens": [
+            {"token": "qr_guest1_abc", "requestId": "req_1", "used": True, "usedAt": "2025-07-30T22:00:00Z"},
+            {"token": "qr_guest2_def", "requestId": "req_2", "used": False},
+            {"token": "qr_ghost_123", "requestId": "req_404", "used": False},
+        ],
+        "requests": [
+            legacy_request(1, approved=True, approvedAt="2025-07-29T18:39:29.115Z"),
+            legacy_request(2, approved=True),
+            legacy_request(3, email="GUEST1@example.com"),  # same person as req_1
+            {"firstName": "No", "id": "req_bad"},
+        ],
+        "sessions": {"abc": {"username": "admin"}},
+    }))
+    return path
+
+def test_parse_time():
+    """Test that timestamps come out naive UTC"""
+    assert parse_time("2025-07-29T18:38:39.510Z").isoformat() == "2025-07-29T18:38:39.510000"
+    assert parse_time("2025-07-29T20:38:39+02:00").hour == 18
+    assert parse_time(None) is None
+
+def test_migrate(engine, dump):
+    """Test requests, tokens, invalid records, orphans and duplicate dedupe keys"""
+    report = migrate(engine, str(dump), batch_size=2)
+    assert (report.requests, report.tokens, report.orphaned_tokens, report.skipped) == (3, 2, 1, 1)
+    assert report.errors[0].startswith("requests[3]: KeyError")
+
+    with Session(engine) as session:
+        requests = {r.legacy_id: r for r in session.exec(select(AccessRequest))}
+        assert requests["req_1"].approved and requests["req_1"].approved_at is not None
+        assert requests["req_1"].email_key == "guest1@example.com"
+        assert requests["req_3"].email_key is None and requests["req_3"].instagram_key is None
+
+        used = crud.get_qr_token(session, "qr_guest1_abc")
+        assert used.used and used.request_id == requests["req_1"].id
+        assert not crud.get_qr_token(session, "qr_guest2_def").used
+
+def test_rerun_is_idempotent(engine, dump):
+    """Test that importing again adds nothing and keeps changes made since"""
+    migrate(engine, str(dump))
+    with Session(engine) as session:
+        crud.use_qr_token(session, "qr_guest2_def")
+
+    report = migrate(engine, str(dump))
+    assert (report.requests, report.tokens) == (3, 2)
+    with Session(engine) as session:
+        assert len(session.exec(select(AccessRequest)).all()) == 3
+        assert len(session.exec(select(QRToken)).all()) == 2
+        assert crud.get_qr_token(session, "qr_guest2_def").used  # not reset by the stale dump
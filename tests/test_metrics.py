@@ -0,0 +1,53 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import create_engine, text
+from app.metrics import MetricsMiddleware, render_metrics
+
+def sample(name, **labels):
+    """Current value of a sample in the default registry"""
+    from prometheus_client import REGISTRY
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"id": item_id}
+
+    return app
+
+def test_middleware_labels_by_route_template():
+    """Test that requests are counted per route template and status"""
+    client = TestClient(make_app())
+    labels = {"method": "GET", "route": "/items/{item_id}"}
+    before_ok = sample("http_request_duration_seconds_count", status="200", **labels)
+    before_bad = sample("http_request_duration_seconds_count", status="422", **labels)
+
+    assert client.get("/items/1").status_code == 200
+    assert client.get("/items/2").status_code == 200
+    assert client.get("/items/abc").status_code == 422
+    assert client.get("/missing").status_code == 404
+
+    assert sample("http_request_duration_seconds_count", status="200", **labels) == before_ok + 2
+    assert sample("http_request_duration_seconds_count", status="422", **labels) == before_bad + 1
+    assert sample("http_request_duration_seconds_count", method="GET", route="other", status="404") >= 1
+    assert sample("http_requests_in_progress") == 0
+
+def test_database_queries_are_timed():
+    """Test that statements on any engine are recorded"""
+    engine = create_engine("sqlite://")
+    before = sample("db_query_duration_seconds_count")
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        connection.execute(text("SELECT 2"))
+    assert sample("db_query_duration_seconds_count") >= before + 2
+
+def test_render_metrics():
+    """Test the exposition output"""
+    body, content_type = render_metrics()
+    assert content_type.startswith("text/plain")
+    for name in (b"http_request_duration_seconds", b"db_query_duration_seconds", b"smtp_send_duration_seconds",
+                 b"password_hash_duration_seconds", b"qr_render_duration_seconds", b"http_requests_in_progress"):
+        assert name in body
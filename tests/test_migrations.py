@@ -0,0 +1,40 @@
+from sqlalchemy import create_engine, inspect, select, text
+from app.migrations import available, run_migrations, schema_migrations
+
+def test_new_database_is_stamped(engine):
+    """Test that a database created from the models has every migration recorded"""
+    with engine.connect() as connection:
+        versions = list(connection.execute(select(schema_migrations.c.version).order_by("version")).scalars())
+    assert versions == [version for version, _ in available()]
+    assert run_migrations(engine) == []
+
+def test_upgrade_database_from_before_migrations(new_database_url):
+    """Test upgrading a database made by create_all before events and the legacy import"""
+    engine = create_engine(new_database_url())
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE accessrequest (id INTEGER PRIMARY KEY, first_name VARCHAR NOT NULL,"
+            " last_name VARCHAR NOT NULL, email VARCHAR NOT NULL, instagram VARCHAR NOT NULL,"
+            " email_key VARCHAR, instagram_key VARCHAR, approved BOOLEAN NOT NULL,"
+            " created_at TIMESTAMP NOT NULL, approved_at TIMESTAMP)"
+        ))
+        connection.execute(text("CREATE UNIQUE INDEX ux_accessrequest_email_key ON accessrequest (email_key)"))
+        connection.execute(text(
+            "INSERT INTO accessrequest (id, first_name, last_name, email, instagram, email_key, instagram_key,"
+            " approved, created_at) VALUES (1, 'Ana', 'Doe', 'ana@example.com', 'ana', 'ana@example.com', 'ana',"
+            " FALSE, CURRENT_TIMESTAMP)"
+        ))
+
+    assert run_migrations(engine) == [version for version, _ in available()]
+    assert run_migrations(engine) == []
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("accessrequest")}
+    assert {"event_id", "legacy_id"} <= columns
+    indexes = {index["name"] for index in inspector.get_indexes("accessrequest")}
+    assert "ux_accessrequest_email_key" not in indexes
+    assert "ux_accessrequest_event_email_key" in indexes
+    assert inspector.has_table("event") and inspector.has_table("qrtoken")
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT first_name FROM accessrequest")).scalar() == "Ana"
+    engine.dispose()
@@ -1,17 +1,8 @@
 import pytest
-from sqlmodel import Session, create_engine
-from app.models import User, AccessRequest, QRToken, SQLModel
+from app.models import User, AccessRequest, QRToken
 from app.crud import get_password_hash
 from datetime import datetime
 
-@pytest.fixture
-def session():
-    """Create test database session"""
-    engine = create_engine("sqlite:///:memory:")
-    SQLModel.metadata.create_all(engine)
-    with Session(engine) as session:
-        yield session
-
 def test_create_user(session):
     """Test creating a user"""
     user = User(
@@ -0,0 +1,105 @@
+import pytest
+from sqlmodel import Session, select
+from app.models import AccessRequest, EmailOutbox
+from app.outbox import OutboxWorker
+from app import crud
+
+class FakeEmailService:
+    """Record deliveries and fail for addresses listed in `failing`"""
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.delivered = []
+
+    async def deliver_invitation_email(self, to_email, guest_name, qr_code_bytes, fallback_url, locale=None):
+        if to_email in self.failing:
+            raise ConnectionError("SMTP unavailable")
+        self.delivered.append((to_email, fallback_url))
+
+class FakeQRService:
+    def build_url(self, token):
+        return f"http://test/q/{token}"
+
+    async def generate_qr_codes(self, tokens):
+        return [b"png" for _ in tokens]
+
+def approve_guests(engine, emails):
+    with Session(engine) as session:
+        requests = [
+            AccessRequest(first_name="Guest", last_name=str(i), email=email, instagram=f"guest{i}")
+            for i, email in enumerate(emails)
+        ]
+        session.add_all(requests)
+        session.commit()
+        crud.approve_requests(session, [request.id for request in requests])
+
+@pytest.mark.asyncio
+async def test_approval_queues_and_worker_sends(engine):
+    """Test that approvals are queued and drained by the worker"""
+    approve_guests(engine, ["a@example.com", "b@example.com"])
+    email_service = FakeEmailService()
+    worker = OutboxWorker(engine, email_service, FakeQRService())
+    worker.domain_limiter.interval = 0
+
+    assert await worker.drain_once() == 2
+    assert await worker.drain_once() == 0
+
+    assert sorted(to for to, _ in email_service.delivered) == ["a@example.com", "b@example.com"]
+    with Session(engine) as session:
+        stats = crud.get_outbox_stats(session)
+    assert stats["sent"] == 2
+    assert stats["pending"] == 0
+    assert stats["latency_p50"] is not None
+
+@pytest.mark.asyncio
+async def test_failures_back_off_then_dead_letter(engine):
+    """Test retry scheduling and dead-lettering of failing messages"""
+    approve_guests(engine, ["down@example.com"])
+    worker = OutboxWorker(engine, FakeEmailService(failing={"down@example.com"}), FakeQRService())
+    worker.domain_limiter.interval = 0
+    worker.max_attempts = 2
+
+    assert await worker.drain_once() == 1
+    with Session(engine) as session:
+        entry = session.exec(select(EmailOutbox)).one()
+        assert entry.status == "pending"
+        assert entry.attempts == 1
+        assert entry.last_error == "SMTP unavailable"
+        assert entry.next_attempt_at > entry.created_at
+
+        # Not due yet, so nothing is claimed
+        assert crud.claim_outbox_batch(session, 10) == []
+
+        entry.next_attempt_at = entry.created_at
+        session.commit()
+
+    assert await worker.drain_once() == 1
+    with Session(engine) as session:
+        entry = session.exec(select(EmailOutbox)).one()
+        assert entry.status == "dead"
+
+        # A dead letter can be moved back to the queue
+        assert crud.retry_outbox_message(session, entry.id).status == "pending"
+
+@pytest.mark.asyncio
+async def test_starting_worker_leaves_live_claims_alone(engine):
+    """Test that a second worker only requeues claims whose lease ran out"""
+    approve_guests(engine, ["a@example.com"])
+    with Session(engine) as session:
+        claimed = crud.claim_outbox_batch(session, 10)
+        assert len(claimed) == 1 and claimed[0].claimed_at is not None
+
+    # Another worker (process or node) starts while the first is still sending
+    second = OutboxWorker(engine, FakeEmailService(), FakeQRService())
+    assert await second.recover() == 0
+    assert await second.drain_once() == 0
+    with Session(engine) as session:
+        assert session.exec(select(EmailOutbox)).one().status == "sending"
+
+        # The first worker died: once the lease is over, the message is requeued
+        entry = session.exec(select(EmailOutbox)).one()
+        entry.claimed_at -= second.lease * 2
+        session.commit()
+    assert await second.recover() == 1
+    second.domain_limiter.interval = 0
+    assert await second.drain_once() == 1
+    assert [to for to, _ in second.email_service.delivered] == ["a@example.com"]
@@ -0,0 +1,118 @@
+import base64
+import pytest
+from email import message_from_bytes
+from sqlmodel import Session, select
+from app.email_service import EmailService
+from app.models import AccessRequest, QRToken
+from app.outbox import OutboxWorker
+from app.prerender import InvitationPrerenderer
+from app import crud
+
+class FakeQRService:
+    def __init__(self):
+        self.rendered = 0
+
+    def build_url(self, token):
+        return f"http://test/q/{token}"
+
+    def generate_qr_code(self, token):
+        self.rendered += 1
+        return b"\x89PNG" + token.encode()
+
+    async def generate_qr_codes(self, tokens):
+        return [self.generate_qr_code(token) for token in tokens]
+
+class RecordingEmailService(EmailService):
+    """Build real messages but record them instead of sending"""
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    async def deliver_message(self, msg):
+        self.sent.append(msg)
+
+def add_guests(engine, count):
+    with Session(engine) as session:
+        requests = [
+            AccessRequest(first_name="Guest", last_name=str(i), email=f"guest{i}@example.com", instagram=f"guest{i}")
+            for i in range(count)
+        ]
+        session.add_all(requests)
+        session.commit()
+        return [request.id for request in requests]
+
+@pytest.mark.asyncio
+async def test_approval_uses_prepared_invitation(engine):
+    """Test that an approved request gets its prepared token and message"""
+    ids = add_guests(engine, 3)
+    qr_service, email_service = FakeQRService(), RecordingEmailService()
+    prerenderer = InvitationPrerenderer(engine, email_service, qr_service)
+    prerenderer.batch_size = 2
+
+    assert await prerenderer.prepare_batch() == 2
+    assert await prerenderer.prepare_batch() == 1
+    assert await prerenderer.prepare_batch() == 0
+    assert prerenderer.stats()["ready"] == 3
+    assert qr_service.rendered == 3
+
+    token = prerenderer.claim_token(ids[0])
+    assert token is not None
+    assert prerenderer.claim_token(ids[0]) is None
+    with Session(engine) as session:
+        crud.approve_request(session, ids[0], token)
+        assert session.exec(select(QRToken.token).where(QRToken.request_id == ids[0])).one() == token
+
+    worker = OutboxWorker(engine, email_service, qr_service, prerenderer)
+    worker.domain_limiter.interval = 0
+    assert await worker.drain_once() == 1
+
+    # Sent as prepared, nothing rendered at approval time
+    assert qr_service.rendered == 3
+    assert [msg.to_email for msg in email_service.sent] == ["guest0@example.com"]
+    assert token.encode() in base64.b64decode(message_from_bytes(email_service.sent[0].data).get_payload(1).get_payload())
+    assert prerenderer.stats()["used"] == 1
+
+@pytest.mark.asyncio
+async def test_budget_and_prune(engine):
+    """Test that preparing stops at the byte budget and approved requests are dropped"""
+    ids = add_guests(engine, 10)
+    prerenderer = InvitationPrerenderer(engine, RecordingEmailService(), FakeQRService())
+    prerenderer.batch_size = 1
+    prerenderer.max_bytes = 1
+
+    assert await prerenderer.prepare_batch() == 1
+    assert await prerenderer.prepare_batch() == 0
+    assert prerenderer.stats()["ready"] == 1
+
+    # Approved without the prepared token, e.g. by another worker
+    with Session(engine) as session:
+        crud.approve_request(session, ids[0])
+    await prerenderer.prune()
+    assert prerenderer.stats() == {"ready": 0, "claimed": 0, "bytes": 0, "max_bytes": 1, "prepared": 1, "used": 0}
+
+@pytest.mark.asyncio
+async def test_claims_during_prune_and_stale_claims(engine, monkeypatch):
+    """Test that a claim racing prune is kept, and a claim nobody takes expires"""
+    ids = add_guests(engine, 2)
+    prerenderer = InvitationPrerenderer(engine, RecordingEmailService(), FakeQRService())
+    assert await prerenderer.prepare_batch() == 2
+
+    # Both approved elsewhere; one is claimed while prune is looking them up
+    with Session(engine) as session:
+        crud.approve_requests(session, ids)
+    get_pending_ids = crud.get_pending_ids
+
+    def claim_then_lookup(session, chunk):
+        prerenderer.claim_token(ids[0])
+        return get_pending_ids(session, chunk)
+    monkeypatch.setattr(crud, "get_pending_ids", claim_then_lookup)
+    await prerenderer.prune()
+    assert prerenderer.stats()["ready"] == 0 and prerenderer.stats()["claimed"] == 1
+
+    # The claimed invitation was never taken by the outbox
+    monkeypatch.setattr(crud, "get_pending_ids", get_pending_ids)
+    await prerenderer.prune()
+    assert prerenderer.stats()["claimed"] == 1
+    prerenderer.claim_ttl = 0
+    await prerenderer.prune()
+    assert prerenderer.stats()["claimed"] == 0 and prerenderer.stats()["bytes"] == 0
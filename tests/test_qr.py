@@ -15,3 +15,51 @@ def test_generate_qr_code():
     
     # Check if it's a valid PNG (starts with PNG signature)
     assert qr_bytes.startswith(b'\x89PNG')
+
+@pytest.mark.asyncio
+async def test_generate_qr_codes_parallel():
+    """Test batch QR generation on the process pool"""
+    qr_service = QRService()
+    qr_service.workers = 2
+    qr_service.parallel_threshold = 0
+    tokens = [f"token-{i}" for i in range(4)]
+
+    try:
+        qr_codes = await qr_service.generate_qr_codes(tokens)
+    finally:
+        qr_service.shutdown()
+
+    assert qr_codes == [qr_service.generate_qr_code(token) for token in tokens]
+
+def test_qr_cache_hits_and_evictions():
+    """Test that repeated renders are served from the cache"""
+    qr_service = QRService()
+    first = qr_service.generate_qr_code("token-a")
+    assert qr_service.generate_qr_code("token-a") is first
+    assert qr_service.cache.stats()["hits"] == 1
+    assert qr_service.cache.stats()["misses"] == 1
+
+    # Room for a single image: rendering a second token evicts the first
+    qr_service.cache.clear()
+    qr_service.cache.max_bytes = len(first) * 3 // 2
+    qr_service.generate_qr_code("token-a")
+    qr_service.generate_qr_code("token-b")
+    assert qr_service.cache.stats()["evictions"] == 1
+    assert qr_service.cache.stats()["entries"] == 1
+
+def test_qr_cache_key_covers_render_options():
+    """Test that changing render options doesn't return a stale image"""
+    qr_service = QRService()
+    small = qr_service.generate_qr_code("token-a")
+    qr_service.box_size = 4
+    assert qr_service.generate_qr_code("token-a") != small
+
+def test_qr_cache_disk_tier(tmp_path):
+    """Test that the on-disk tier survives a fresh in-memory cache"""
+    qr_service = QRService()
+    qr_service.cache.disk_dir = str(tmp_path)
+    png = qr_service.generate_qr_code("token-a")
+
+    qr_service.cache.clear()
+    assert qr_service.generate_qr_code("token-a") == png
+    assert qr_service.cache.stats()["disk_hits"] == 1
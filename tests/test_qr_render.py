@@ -0,0 +1,52 @@
+import pytest
+import numpy as np
+from io import BytesIO
+from xml.etree import ElementTree
+from PIL import Image
+from app.qr_render import build_qr, render
+
+DATA = "http://localhost:8000/q/3f2b1c9e-8d7a-4e5f-9b0c-1a2b3c4d5e6f"
+
+def pixels(png_bytes):
+    return np.array(Image.open(BytesIO(png_bytes)).convert("L"))
+
+@pytest.mark.parametrize("box_size,border", [(10, 4), (3, 1), (1, 0)])
+def test_png_backend_matches_pil(box_size, border):
+    """Test that the direct PNG writer produces the same image as PIL"""
+    # Reference: the original qrcode.make_image() path
+    qr = build_qr(DATA, border, "L")
+    qr.box_size = box_size
+    buffer = BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer, format="PNG")
+    assert np.array_equal(pixels(render(DATA, "pil", box_size, border, "L", 6)), pixels(buffer.getvalue()))
+
+    fast = render(DATA, "png", box_size, border, "L", 6)
+    reference = render(DATA, "pil", box_size, border, "L", 6)
+
+    assert fast.startswith(b"\x89PNG")
+    assert np.array_equal(pixels(fast), pixels(reference))
+
+def test_png_backend_encodes_module_matrix():
+    """Test that sampling module centres gives back the QR matrix"""
+    box_size = 5
+    matrix = np.array(build_qr(DATA, 4, "M").get_matrix())
+    image = pixels(render(DATA, "png", box_size, 4, "M", 9))
+
+    sampled = image[box_size // 2::box_size, box_size // 2::box_size] == 0
+    assert np.array_equal(sampled, matrix)
+
+def test_svg_backend_covers_dark_modules():
+    """Test that the SVG path draws exactly the dark modules"""
+    matrix = build_qr(DATA, 4, "L").get_matrix()
+    svg = ElementTree.fromstring(render(DATA, "svg", 10, 4, "L", 6))
+
+    path = svg.find("{http://www.w3.org/2000/svg}path").get("d")
+    drawn = np.zeros((len(matrix), len(matrix)), dtype=bool)
+    for segment in path.split("z")[:-1]:
+        move, rest = segment[1:].split("h", 1)
+        x, y = map(int, move.split())
+        width = int(rest.split("v")[0])
+        drawn[y, x:x + width] = True
+
+    assert np.array_equal(drawn, np.array(matrix))
+    assert svg.get("width") == str(len(matrix) * 10)
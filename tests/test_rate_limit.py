@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from app.ratelimit import (
+    Limit, MemoryBackend, RateLimiter, RateLimitMiddleware, Rule, client_address, parse_limit
+)
+
+def test_parse_limit():
+    """Test limit strings"""
+    assert parse_limit("5/minute") == Limit(rate=5 / 60, burst=5)
+    assert parse_limit("2/second") == Limit(rate=2, burst=2)
+    with pytest.raises(KeyError):
+        parse_limit("5/fortnight")
+
+def test_bucket_burst_and_refill():
+    """Test that a bucket allows a burst, then one request per refill interval"""
+    backend = MemoryBackend()
+    limit = Limit(rate=1, burst=3)
+    hit = lambda now: asyncio.run(backend.hit("ip", limit, now=now))
+
+    assert [hit(100.0) for _ in range(3)] == [0, 0, 0]
+    assert hit(100.0) == pytest.approx(1.0)
+    assert hit(100.5) == pytest.approx(0.5)
+    assert hit(101.0) == 0
+    # Separate keys don't share tokens
+    assert asyncio.run(backend.hit("other", limit, now=101.0)) == 0
+
+def test_sweep_drops_full_buckets():
+    """Test that idle buckets are removed once refilled"""
+    backend = MemoryBackend(shards=2, sweep_interval=1.0)
+    limit = Limit(rate=1, burst=5)
+    for n in range(50):
+        asyncio.run(backend.hit(f"ip{n}", limit, now=10.0))
+    assert len(backend) == 50
+
+    # Two sweeps cover both shards
+    asyncio.run(backend.hit("late", limit, now=100.0))
+    asyncio.run(backend.hit("late", limit, now=101.0))
+    assert len(backend) == 1
+
+def run_asgi(app, method="POST", path="/request-access", client=("10.0.0.1", 1234), headers=()):
+    """Call an ASGI app once; returns the status and headers it sent"""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "client": client, "headers": list(headers)}
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    return start["status"], dict(start["headers"])
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+def test_middleware_limits_matching_routes():
+    """Test that only matching routes are limited, per client address"""
+    limiter = RateLimiter(MemoryBackend(), [Rule("signup", "POST", "/request-access", Limit(rate=0.1, burst=2))])
+    app = RateLimitMiddleware(ok_app, limiter, trust_proxy=False)
+
+    assert run_asgi(app)[0] == 200
+    assert run_asgi(app)[0] == 200
+    status, headers = run_asgi(app)
+    assert status == 429
+    assert headers[b"retry-after"] == b"10"
+    assert limiter.rejected == 1
+
+    # Other clients, methods and paths are unaffected
+    assert run_asgi(app, client=("10.0.0.2", 1234))[0] == 200
+    assert run_asgi(app, method="GET")[0] == 200
+    assert run_asgi(app, path="/admin")[0] == 200
+
+def test_client_address_from_proxy():
+    """Test that X-Forwarded-For is only used when the proxy is trusted"""
+    scope = {"client": ("127.0.0.1", 80), "headers": [(b"x-forwarded-for", b"203.0.113.9, 10.0.0.1")]}
+    assert client_address(scope) == "127.0.0.1"
+    assert client_address(scope, trust_proxy=True) == "203.0.113.9"
@@ -0,0 +1,86 @@
+import pytest
+import random
+import threading
+from collections import Counter
+from sqlmodel import Session, select
+from app.models import AccessRequest, QRToken
+from app.token_index import TokenIndex, redeem, ADMITTED, MISSING, USED
+from app import crud
+
+def approve_guests(engine, count):
+    with Session(engine) as session:
+        requests = [
+            AccessRequest(first_name="Guest", last_name=str(i), email=f"guest{i}@example.com", instagram=f"guest{i}")
+            for i in range(count)
+        ]
+        session.add_all(requests)
+        session.commit()
+        approved = crud.approve_requests(session, [request.id for request in requests])
+        return [qr_token.token for _, qr_token in approved]
+
+def test_redeem_returns_guest_once(engine):
+    """Test that the conditional update admits a token exactly once"""
+    token = approve_guests(engine, 1)[0]
+    with Session(engine) as session:
+        guest = crud.redeem_qr_token(session, token)
+        assert (guest.first_name, guest.last_name, guest.instagram) == ("Guest", "0", "guest0")
+        assert guest.used_at is not None
+        assert crud.redeem_qr_token(session, token) is None
+        assert crud.redeem_qr_token(session, "unknown") is None
+
+def test_index_rejects_without_database(engine):
+    """Test that unknown and used tokens are turned away by the index"""
+    token = approve_guests(engine, 1)[0]
+    index = TokenIndex(refresh_interval=3600)
+    with Session(engine) as session:
+        index.load(session)
+        assert redeem(session, token, index)[0] == ADMITTED
+
+    # No session at all: any database access would fail
+    assert redeem(None, token, index) == (USED, None)
+    assert redeem(None, "forged-token", index) == (MISSING, None)
+
+def test_index_picks_up_new_tokens(engine):
+    """Test that tokens approved after loading are found by a refresh"""
+    index = TokenIndex(refresh_interval=0)
+    with Session(engine) as session:
+        index.load(session)
+    token = approve_guests(engine, 1)[0]
+    with Session(engine) as session:
+        assert redeem(session, token, index)[0] == ADMITTED
+
+@pytest.mark.parametrize("use_index", [True, False])
+def test_concurrent_scans_admit_each_token_once(engine, use_index):
+    """Load test: many scanners hitting the same codes at once"""
+    tokens = approve_guests(engine, 50)
+    scanners = 8
+    # Without a loaded index every scan races on the conditional update
+    index = TokenIndex(refresh_interval=3600)
+    if use_index:
+        with Session(engine) as session:
+            index.load(session)
+
+    admitted = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(scanners)
+
+    def scanner(seed):
+        order = tokens * 2
+        random.Random(seed).shuffle(order)
+        barrier.wait()
+        with Session(engine) as session:
+            for token in order:
+                outcome, _ = redeem(session, token, index)
+                if outcome == ADMITTED:
+                    with lock:
+                        admitted[token] += 1
+
+    threads = [threading.Thread(target=scanner, args=(seed,)) for seed in range(scanners)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert admitted == Counter({token: 1 for token in tokens})
+    with Session(engine) as session:
+        assert all(qr_token.used for qr_token in session.exec(select(QRToken)))
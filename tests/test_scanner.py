@@ -0,0 +1,68 @@
+import pytest
+import json
+import msgpack
+from datetime import datetime, timedelta
+from sqlmodel import Session
+from app.models import AccessRequest
+from app.schemas import OfflineScan
+from app.scanner import iter_snapshot
+from app import crud
+
+def approve_guests(engine, count):
+    with Session(engine) as session:
+        requests = [
+            AccessRequest(first_name="Guest", last_name=str(i), email=f"guest{i}@example.com", instagram=f"guest{i}")
+            for i in range(count)
+        ]
+        session.add_all(requests)
+        session.commit()
+        approved = crud.approve_requests(session, [request.id for request in requests])
+        return [qr_token.token for _, qr_token in approved]
+
+def test_reconcile_first_scan_wins(engine):
+    """Test that the earliest scan of a token wins, online or offline"""
+    first, second, third = approve_guests(engine, 3)
+    start = datetime(2025, 8, 1, 0, 0)
+
+    with Session(engine) as session:
+        # `second` was scanned online at 00:10
+        crud.reconcile_offline_scans(session, [(second, start + timedelta(minutes=10))])
+
+        results = crud.reconcile_offline_scans(session, [
+            (first, start + timedelta(minutes=5)),
+            (first, start + timedelta(minutes=1)),   # same device saw it earlier
+            (second, start + timedelta(minutes=2)),  # offline scan beat the online one
+            (third, start + timedelta(minutes=30)),
+            ("forged", start),
+        ])
+
+        assert [result["status"] for result in results] == ["duplicate", "admitted", "admitted", "admitted", "invalid"]
+        assert results[0]["first_scanned_at"] == start + timedelta(minutes=1)
+        assert results[2]["conflict"] is True
+        assert crud.get_qr_token(session, second).used_at == start + timedelta(minutes=2)
+
+        # Uploading the same batch again changes nothing
+        again = crud.reconcile_offline_scans(session, [(third, start + timedelta(minutes=30))])
+        assert again[0]["status"] == "duplicate"
+
+def test_offline_scan_times_are_normalized():
+    """Test that device timestamps with an offset become naive UTC"""
+    scan = OfflineScan(token="t", scanned_at="2025-08-01T02:00:00+02:00")
+    assert scan.scanned_at == datetime(2025, 8, 1, 0, 0)
+
+@pytest.mark.parametrize("as_msgpack", [False, True])
+def test_snapshot_streams_every_token(engine, as_msgpack):
+    """Test that the snapshot lists every token with its guest"""
+    tokens = approve_guests(engine, 3)
+    body = b"".join(iter_snapshot(as_msgpack, engine=engine, batch_size=2))
+
+    if as_msgpack:
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(body)
+        records = list(unpacker)
+    else:
+        records = [json.loads(line) for line in body.splitlines()]
+
+    assert "generated_at" in records[0]
+    assert sorted(record[0] for record in records[1:]) == sorted(tokens)
+    assert all(record[3] is False for record in records[1:])
@@ -0,0 +1,90 @@
+import pytest
+from sqlmodel import Session, create_engine
+from app.models import AccessRequest, SQLModel
+from app.search import build_match_query, like_search, search_requests
+from app import crud
+
+@pytest.fixture
+def session():
+    """Create test database session"""
+    engine = create_engine("sqlite:///:memory:")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+def add_request(session, first_name, last_name, email, instagram):
+    request = AccessRequest(first_name=first_name, last_name=last_name, email=email, instagram=instagram)
+    session.add(request)
+    session.commit()
+    session.refresh(request)
+    return request
+
+def test_build_match_query():
+    """Test that user input becomes quoted prefix terms"""
+    assert build_match_query("nico ross") == '"nico"* AND "ross"*'
+    assert build_match_query('"AND" NEAR(x') == '"AND"* AND "NEAR"* AND "x"*'
+    assert build_match_query("  @_. ") is None
+
+def test_search_prefix_and_accents(session):
+    """Test prefix and accent-insensitive matching across columns"""
+    nicolo = add_request(session, "Nicolò", "Rossi", "nrossi@gmail.com", "nico_rossi")
+    add_request(session, "Giulia", "Bianchi", "giulia@example.com", "giuliab")
+
+    assert search_requests(session, "nicolo") == [nicolo]
+    assert search_requests(session, "NICOLÒ ros") == [nicolo]
+    assert search_requests(session, "gmail") == [nicolo]
+    assert search_requests(session, "nico_ro") == [nicolo]
+    assert search_requests(session, "marco") == []
+    assert search_requests(session, "") == []
+
+def test_search_follows_updates_and_deletes(session):
+    """Test that the triggers keep the index in sync with the table"""
+    request = add_request(session, "Luca", "Verdi", "luca@example.com", "lucav")
+    crud.approve_request(session, request.id)
+    assert search_requests(session, "luca") == [request]
+
+    request.last_name = "Esposito"
+    session.add(request)
+    session.commit()
+    assert search_requests(session, "verdi") == []
+    assert search_requests(session, "espo") == [request]
+
+    session.delete(request)
+    session.commit()
+    assert search_requests(session, "luca") == []
+
+def test_search_scoped_to_event(session):
+    """Test that a guest who signed up for two events is found once per event"""
+    first = crud.get_current_event(session)
+    spring = add_request(session, "Marta", "Ferri", "marta@example.com", "martaf")
+    spring.event_id = first.id
+    session.add(spring)
+    session.commit()
+    second = crud.create_event(session, "Summer Party")
+    summer = AccessRequest(
+        first_name="Marta", last_name="Ferri", email="marta@example.com", instagram="martaf", event_id=second.id
+    )
+    session.add(summer)
+    session.commit()
+
+    assert search_requests(session, "marta", event_id=first.id) == [spring]
+    assert search_requests(session, "marta", event_id=second.id) == [summer]
+    assert like_search(session, "ferri", event_id=second.id) == [summer]
+    assert len(search_requests(session, "marta")) == 2
+
+def test_index_rebuilt_for_existing_rows():
+    """Test that rows written before the index existed become searchable"""
+    engine = create_engine("sqlite:///:memory:")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        add_request(session, "Anna", "Conti", "anna@example.com", "annac")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE accessrequest_fts")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        assert [r.first_name for r in search_requests(session, "conti")] == ["Anna"]
+
+def test_like_search(session):
+    """Test the substring fallback"""
+    request = add_request(session, "Sofia", "Greco", "sofia@example.com", "sofiag")
+    assert like_search(session, "ofi gre") == [request]
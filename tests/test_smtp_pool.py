@@ -0,0 +1,120 @@
+import pytest
+import socket
+from email.message import EmailMessage
+from aiosmtpd.controller import Controller
+from app.smtp_pool import SMTPConnectionPool
+
+class CountingHandler:
+    """Accept every message and remember which connection delivered it"""
+    def __init__(self):
+        self.messages = 0
+        self.peers = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        self.peers.add(session.peer)
+        return "250 Message accepted"
+
+@pytest.fixture
+def smtp_server():
+    """Run a local SMTP server for the duration of a test"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    handler = CountingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler, port
+    controller.stop()
+
+def make_message(i):
+    msg = EmailMessage()
+    msg["From"] = "test@example.com"
+    msg["To"] = f"guest{i}@example.com"
+    msg["Subject"] = "Test"
+    msg.set_content("Hello")
+    return msg
+
+async def send(pool, i):
+    """Send a test message the way the email service does, already serialized"""
+    msg = make_message(i)
+    await pool.send_raw(msg["From"], [msg["To"]], msg.as_bytes())
+
+@pytest.mark.asyncio
+async def test_pool_reuses_connections(smtp_server):
+    """Test that many messages share a few connections"""
+    handler, port = smtp_server
+    pool = SMTPConnectionPool("127.0.0.1", port, start_tls=False, size=2)
+
+    for i in range(20):
+        await send(pool, i)
+    await pool.close()
+
+    assert handler.messages == 20
+    assert pool.connections_opened == 1
+    assert len(handler.peers) == 1
+
+@pytest.mark.asyncio
+async def test_pool_recycles_after_max_messages(smtp_server):
+    """Test that connections are replaced after max_messages sends"""
+    handler, port = smtp_server
+    pool = SMTPConnectionPool("127.0.0.1", port, start_tls=False, size=1, max_messages=5)
+
+    for i in range(20):
+        await send(pool, i)
+    await pool.close()
+
+    assert handler.messages == 20
+    assert pool.connections_opened == 4
+
+@pytest.mark.asyncio
+async def test_pool_reconnects_after_failure(smtp_server):
+    """Test that a dropped connection is replaced transparently"""
+    handler, port = smtp_server
+    pool = SMTPConnectionPool("127.0.0.1", port, start_tls=False, size=1)
+
+    await send(pool, 0)
+    # Simulate the server hanging up on the idle connection
+    pool._idle[0].smtp.close()
+    await send(pool, 1)
+    await pool.close()
+
+    assert handler.messages == 2
+    assert pool.connections_opened == 2
+
+@pytest.mark.asyncio
+async def test_ping_reuses_connection(smtp_server):
+    """Test that a readiness ping keeps its connection for the next send"""
+    handler, port = smtp_server
+    pool = SMTPConnectionPool("127.0.0.1", port, start_tls=False, size=1)
+
+    await pool.ping()
+    await send(pool, 0)
+    await pool.close()
+
+    assert pool.connections_opened == 1
+    assert pool.messages_sent == 1
+    assert handler.messages == 1
+
+@pytest.mark.asyncio
+async def test_ping_raises_without_server():
+    """Test that a ping fails when nothing listens"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    pool = SMTPConnectionPool("127.0.0.1", port, start_tls=False, timeout=2)
+
+    with pytest.raises(Exception):
+        await pool.ping()
+
+@pytest.mark.asyncio
+async def test_send_raw(smtp_server):
+    """Test sending pre-serialized message bytes"""
+    handler, port = smtp_server
+    pool = SMTPConnectionPool("127.0.0.1", port, start_tls=False, size=1)
+
+    await pool.send_raw("party@example.com", ["guest@example.com"], make_message(0).as_bytes())
+    await pool.close()
+
+    assert handler.messages == 1
+    assert pool.messages_sent == 1
@@ -0,0 +1,51 @@
+import base64
+import pytest
+import uuid
+from app.qr_render import build_qr
+from app.token_index import TokenIndex, redeem, MISSING
+from app.tokens import TokenSigner, TOKEN_LENGTH
+
+def test_issue_and_verify():
+    """Test that a token carries its request ID and is unique per issue"""
+    signer = TokenSigner("test-key")
+    token = signer.issue(1234)
+    assert len(token) == TOKEN_LENGTH and token.isupper()
+    assert signer.request_id(token) == 1234
+    assert signer.issue(1234) != token
+    assert signer.request_id(signer.issue(2 ** 32 - 1)) == 2 ** 32 - 1
+    for request_id in (2 ** 32, -1):
+        with pytest.raises(ValueError):
+            signer.issue(request_id)
+
+def test_first_layout_still_accepted():
+    """Test that tokens issued with the 2-byte nonce and 9-byte MAC still verify"""
+    signer = TokenSigner("test-key")
+    payload = (77).to_bytes(4, "big") + b"\x01\x02"
+    token = base64.b32encode(payload + signer._mac(payload)[:9]).decode()
+    assert signer.request_id(token) == 77
+
+def test_forgeries_rejected():
+    """Test tampered, foreign-key, malformed and legacy tokens"""
+    signer = TokenSigner("test-key", accept_legacy=True)
+    token = signer.issue(42)
+    tampered = token[:5] + ("A" if token[5] != "A" else "B") + token[6:]
+    assert signer.request_id(tampered) is None
+    assert signer.request_id(TokenSigner("other-key").issue(42)) is None
+    for junk in ["", "forged-token", token.lower(), token + "A", "1" * TOKEN_LENGTH]:
+        assert not signer.is_plausible(junk)
+
+    legacy = str(uuid.uuid4())
+    assert signer.is_plausible(legacy)
+    assert signer.is_plausible("qr_sofia_abc123")  # from the Node app's JSON store
+    assert not TokenSigner("test-key", accept_legacy=False).is_plausible(legacy)
+
+def test_forgery_rejected_before_lookup():
+    """Test that redeem turns a forgery away without the index or the database"""
+    index = TokenIndex()  # never loaded: a lookup would fall through to the session
+    assert redeem(None, TokenSigner("other-key").issue(1), index) == (MISSING, None)
+
+def test_signed_token_fits_smaller_qr():
+    """Test that the signed token's URL needs no larger a QR version than a UUID's"""
+    signed = build_qr(f"http://localhost:8000/q/{TokenSigner('test-key').issue(99999)}", 4, "L")
+    legacy = build_qr(f"http://localhost:8000/q/{uuid.uuid4()}", 4, "L")
+    assert signed.version < legacy.version
@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+import pytest
+from sqlmodel import Session, create_engine, select
+from app.models import AccessRequest
+from app.schemas import AccessRequestCreate
+from app import crud, transfer
+from app.migrations import run_migrations
+
+def seed(engine):
+    """Five requests, the first two approved"""
+    with Session(engine) as session:
+        for i in range(5):
+            crud.create_access_request(session, AccessRequestCreate(
+                first_name=f"Guest{i}", last_name="Doe", email=f"guest{i}@example.com", instagram=f"guest{i}"
+            ))
+        crud.approve_requests(session, [1, 2])
+
+def export(engine, kind, fmt, batch_size=2):
+    with engine.connect() as connection:
+        return list(transfer.iter_export(connection, kind, fmt, batch_size))
+
+def test_export_guests(engine):
+    """Test CSV and JSONL exports, one row per request and token"""
+    seed(engine)
+    chunks = export(engine, "guests", "csv")
+    assert len(chunks) == 3  # batches of two rows
+    rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+    assert [row["id"] for row in rows] == ["1", "2", "3", "4", "5"]
+    assert rows[0]["approved"] == "True" and rows[0]["token"]
+    assert rows[4]["token"] == "" and rows[4]["approved_at"] == ""
+
+    lines = "".join(export(engine, "guests", "jsonl")).splitlines()
+    records = [json.loads(line) for line in lines]
+    assert records[1]["email"] == "guest1@example.com"
+    assert records[4]["token"] is None
+
+def test_export_redemptions(engine):
+    """Test that the redemption log lists used tokens in arrival order"""
+    seed(engine)
+    with Session(engine) as session:
+        tokens = crud.approve_requests(session, [3])
+        crud.use_qr_token(session, tokens[0][1].token)
+    records = [json.loads(line) for line in "".join(export(engine, "redemptions", "jsonl")).splitlines()]
+    assert [(r["request_id"], r["first_name"]) for r in records] == [(3, "Guest2")]
+    assert records[0]["used_at"]
+
+def test_import_reports_errors_by_row(engine):
+    """Test chunked CSV import with invalid and duplicate rows"""
+    seed(engine)
+    data = io.StringIO(
+        "First Name,Last Name,Email,Instagram\n"
+        "Ann,Lee,ann@example.com,@ann\n"
+        "Bob,Ray,not-an-email,@bob\n"
+        "Cid,Moe,GUEST0@example.com,cid\n"   # taken email
+        ",Nil,nil@example.com,nil\n"          # missing first name
+        "Dee,Kay,dee@example.com,dee\n"
+    )
+    errors = []
+    report = transfer.import_guests(engine, data, "csv", chunk_size=2, on_error=lambda n, e: errors.append(n))
+
+    assert report.to_dict()["rows"] == 5
+    assert (report.inserted, report.duplicates, report.invalid) == (2, 1, 2)
+    assert [error["row"] for error in report.errors] == [2, 4] == errors
+    assert "email" in report.errors[0]["error"]
+    with Session(engine) as session:
+        emails = set(session.exec(select(AccessRequest.email)))
+    assert {"ann@example.com", "dee@example.com"} <= emails
+
+def test_import_jsonl_and_round_trip(engine, new_database_url):
+    """Test that an export imports cleanly into an empty database"""
+    seed(engine)
+    exported = "".join(export(engine, "guests", "jsonl")) + "\n{broken\n[1]\n"
+
+    target = create_engine(new_database_url())
+    run_migrations(target)
+    report = transfer.import_guests(target, io.StringIO(exported), "jsonl")
+    assert (report.inserted, report.invalid) == (5, 2)
+    assert [error["row"] for error in report.errors] == [7, 8]
+    assert not report.to_dict()["errors_truncated"]
+
+def test_format_from_name():
+    """Test format detection from file names"""
+    assert transfer.format_from_name("guests.JSONL") == "jsonl"
+    assert transfer.format_from_name("guests.csv") == "csv"
+    assert transfer.format_from_name(None) == "csv"